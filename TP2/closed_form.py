@@ -0,0 +1,275 @@
+"""
+Closed-form defuzzification modes for the house-rating rules
+
+Mamdani centroid defuzzification in skfuzzy (and batch.py) integrates the
+aggregated output set sampled on the rating universe, so its cost and its
+accuracy both depend on how finely that universe is sampled
+(np.arange(0, 11, 1) in main.py). Two modes keep the same antecedents and
+rule firing but drop the sampling:
+
+- AnalyticRuleBase integrates max_t min(cut_t, μ_t) over the continuous
+  consequent shapes. trimf and trapmf are linear, zmf and smf quadratic,
+  so between the shape knots, the cut crossings and the points where two
+  clipped terms meet, the aggregated set is one polynomial of degree ≤ 2
+  and Simpson's rule integrates it (and its first moment) exactly. This is
+  the limit of the Mamdani centroid as the universe step goes to zero.
+- SugenoRuleBase is a zero-order Sugeno system: each consequent term is
+  replaced by the exact centroid z_t of its shape and
+  rating = Σ_r w_r · z(term_r) / Σ_r w_r, O(rules) per row.
+
+Usage:
+ratings = rate_houses_analytic(sizes, prices, locations)
+ratings = rate_houses_sugeno(sizes, prices, locations)
+python closed_form.py    # accuracy and throughput against Mamdani
+"""
+
+from itertools import combinations
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from batch import BATCH_CHUNK, RATING_RULES, CompiledRuleBase
+from spec import Shape, load_spec, sample_shape, term_shapes
+
+Piece = Tuple[float, float, np.poly1d]
+
+# Consequent terms of rating_system.json
+RATING_SHAPES: Dict[str, Shape] = term_shapes(load_spec()['output'])
+
+
+def _line(x0: float, y0: float, x1: float, y1: float) -> np.poly1d:
+    slope = (y1 - y0) / (x1 - x0)
+    return np.poly1d([slope, y0 - slope * x0])
+
+
+def shape_pieces(shape: Shape, lo: float, hi: float) -> List[Piece]:
+    """Polynomial pieces (x0, x1, p) of a shape restricted to [lo, hi]"""
+    kind, params = shape
+    one = np.poly1d([1.0])
+    if kind == 'trimf':
+        a, b, c = params
+        pieces = [(a, b, _line(a, 0, b, 1)), (b, c, _line(b, 1, c, 0))]
+    elif kind == 'trapmf':
+        a, b, c, d = params
+        pieces = [(a, b, _line(a, 0, b, 1)), (b, c, one), (c, d, _line(c, 1, d, 0))]
+    elif kind in ('zmf', 'smf'):
+        a, b = params
+        mid = (a + b) / 2
+        rising = [(a, mid, 2 * np.poly1d([1, -a]) ** 2 / (b - a) ** 2),
+                  (mid, b, 1 - 2 * np.poly1d([1, -b]) ** 2 / (b - a) ** 2)]
+        if kind == 'smf':
+            pieces = rising + [(b, hi, one)]
+        else:
+            # zmf(x) = 1 - smf(x)
+            pieces = [(lo, a, one)] + [(x0, x1, 1 - p) for x0, x1, p in rising]
+    else:
+        raise ValueError(f"Unknown membership shape '{kind}'")
+    return [(max(x0, lo), min(x1, hi), p) for x0, x1, p in pieces if min(x1, hi) > max(x0, lo)]
+
+
+def shape_centroid(shape: Shape, lo: float, hi: float) -> float:
+    """Exact centroid ∫x·μ / ∫μ of a shape over [lo, hi]"""
+    area = moment = 0.0
+    for x0, x1, p in shape_pieces(shape, lo, hi):
+        area += p.integ()(x1) - p.integ()(x0)
+        first = (p * np.poly1d([1, 0])).integ()
+        moment += first(x1) - first(x0)
+    return moment / area
+
+
+def _check_shapes(rules: CompiledRuleBase, shapes: Dict[str, Shape]):
+    # The shapes must reproduce the compiled output terms on their universe,
+    # so the closed-form modes cannot drift from the Mamdani one
+    for term, mf in zip(rules.output_terms, rules.output_mfs):
+        if not np.allclose(sample_shape(shapes[term], rules.output_universe), mf):
+            raise ValueError(f"Shape of '{term}' does not match the compiled membership function")
+
+
+def resample_output(rules: CompiledRuleBase, shapes: Dict[str, Shape],
+                    step: float) -> CompiledRuleBase:
+    """The same rule base with the output universe sampled every `step`"""
+    lo, hi = rules.output_universe[0], rules.output_universe[-1]
+    universe = np.linspace(lo, hi, int(round((hi - lo) / step)) + 1)
+    mfs = np.array([sample_shape(shapes[term], universe) for term in rules.output_terms])
+    return rules._replace(output_universe=universe, output_mfs=mfs)
+
+
+def _evaluate_rows(rules: CompiledRuleBase, defuzzify, inputs: Sequence, chunk: int) -> np.ndarray:
+    columns = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in inputs))
+    shape = columns[0].shape
+    columns = [col.ravel() for col in columns]
+    out = np.empty(len(columns[0]))
+    for start in range(0, len(out), chunk):
+        rows = slice(start, start + chunk)
+        out[rows] = defuzzify(rules.firing(rules.fuzzify([col[rows] for col in columns])))
+    return out.reshape(shape)
+
+
+def _roots_within(a, b, c, lo, hi) -> Tuple[np.ndarray, np.ndarray]:
+    """Both roots of a·y² + b·y + c in (lo, hi), lo where there is none"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        disc = b * b - 4 * a * c
+        q = -0.5 * (b + np.copysign(np.sqrt(disc), b))
+        quadratic = np.abs(a) > 1e-12
+        r1 = np.where(quadratic, q / a, -c / b)
+        r2 = np.where(quadratic, c / q, lo)
+    inside = lambda r: np.where(np.isfinite(r) & (r > lo) & (r < hi), r, lo)
+    return inside(r1), inside(r2)
+
+
+class AnalyticRuleBase(NamedTuple):
+    """Compiled rules with the continuous consequent shapes, split at their knots
+
+    `coefficients[t, j]` holds (a, b, c) of μ_t(y) = a·y² + b·y + c on
+    [knots[j], knots[j+1]]; `terms[j]` lists the terms non-zero there,
+    padded where `present` is False.
+    """
+    rules: CompiledRuleBase
+    knots: np.ndarray
+    coefficients: np.ndarray
+    terms: np.ndarray
+    present: np.ndarray
+
+    @classmethod
+    def from_rule_base(cls, rules: CompiledRuleBase,
+                       shapes: Dict[str, Shape]) -> 'AnalyticRuleBase':
+        _check_shapes(rules, shapes)
+        lo, hi = float(rules.output_universe[0]), float(rules.output_universe[-1])
+        pieces = [shape_pieces(shapes[term], lo, hi) for term in rules.output_terms]
+        knots = np.unique([lo, hi] + [x for term in pieces for x0, x1, _ in term for x in (x0, x1)])
+
+        mids = (knots[:-1] + knots[1:]) / 2
+        coefficients = np.zeros((len(pieces), len(mids), 3))
+        for t, term in enumerate(pieces):
+            for x0, x1, p in term:
+                inside = (mids > x0) & (mids < x1)
+                coefficients[t, inside, 3 - len(p.coeffs):] = p.coeffs
+
+        active = np.any(coefficients != 0, axis=-1)                    # (T, S)
+        k = max(int(active.sum(axis=0).max()), 1)
+        terms = np.zeros((len(mids), k), dtype=np.intp)
+        present = np.zeros((len(mids), k), dtype=bool)
+        for j in range(len(mids)):
+            on = np.flatnonzero(active[:, j])
+            terms[j, :len(on)] = on
+            present[j, :len(on)] = True
+        return cls(rules, knots, coefficients, terms, present)
+
+    def defuzzify(self, strengths: np.ndarray) -> np.ndarray:
+        """Exact centroid of max_t min(cut_t, μ_t), NaN where nothing fires"""
+        cuts = self.rules.cuts(strengths)
+        lo, hi = self.knots[:-1], self.knots[1:]                        # (S,)
+        segments = np.arange(len(lo))[:, None]
+        poly = np.where(self.present[..., None],
+                        self.coefficients[self.terms, segments], 0.0)  # (S, K, 3)
+        c = np.where(self.present, cuts[..., self.terms], 0.0)         # (..., S, K)
+        a, b, c0 = poly[..., 0], poly[..., 1], poly[..., 2]
+
+        # Every point where the active piece of max_t min(cut_t, μ_t) can change
+        breaks = []
+        for k in range(self.terms.shape[1]):
+            breaks += _roots_within(a[:, k], b[:, k], c0[:, k] - c[..., k], lo, hi)
+        for k, l in combinations(range(self.terms.shape[1]), 2):
+            breaks += _roots_within(a[:, k] - a[:, l], b[:, k] - b[:, l], c0[:, k] - c0[:, l], lo, hi)
+            breaks += _roots_within(a[:, k], b[:, k], c0[:, k] - c[..., l], lo, hi)
+            breaks += _roots_within(a[:, l], b[:, l], c0[:, l] - c[..., k], lo, hi)
+        shape = c.shape[:-1]
+        y = np.sort(np.stack([np.broadcast_to(lo, shape)]
+                             + [np.broadcast_to(r, shape) for r in breaks]
+                             + [np.broadcast_to(hi, shape)], axis=-1), axis=-1)
+        mid = (y[..., :-1] + y[..., 1:]) / 2
+
+        def aggregated(x):
+            mu = np.zeros_like(x)
+            for k in range(self.terms.shape[1]):
+                line = (a[:, k, None] * x + b[:, k, None]) * x + c0[:, k, None]
+                np.maximum(mu, np.minimum(c[..., k, None], line), out=mu)
+            return mu
+
+        # Simpson's rule is exact for the cubic y·F(y) on every piece
+        f, fm = aggregated(y), aggregated(mid)
+        h = np.diff(y, axis=-1) / 6
+        area = h * (f[..., :-1] + 4 * fm + f[..., 1:])
+        moment = h * (y[..., :-1] * f[..., :-1] + 4 * mid * fm + y[..., 1:] * f[..., 1:])
+        rows = area.shape[:-2] + (-1,)
+        total_area = area.reshape(rows).sum(axis=-1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(total_area > 0, moment.reshape(rows).sum(axis=-1) / total_area, np.nan)
+
+    def __call__(self, *inputs, chunk: int = BATCH_CHUNK) -> np.ndarray:
+        """Continuous Mamdani centroid for every row, in `rules.input_labels` order"""
+        return _evaluate_rows(self.rules, self.defuzzify, inputs, chunk)
+
+
+class SugenoRuleBase(NamedTuple):
+    """Compiled rules whose consequent terms are crisp values"""
+    rules: CompiledRuleBase
+    outputs: np.ndarray
+
+    @classmethod
+    def from_rule_base(cls, rules: CompiledRuleBase,
+                       shapes: Dict[str, Shape]) -> 'SugenoRuleBase':
+        """Use the exact centroid of each consequent shape as its crisp value"""
+        _check_shapes(rules, shapes)
+        lo, hi = rules.output_universe[0], rules.output_universe[-1]
+        outputs = np.array([shape_centroid(shapes[term], lo, hi) for term in rules.output_terms])
+        return cls(rules, outputs)
+
+    def defuzzify(self, strengths: np.ndarray) -> np.ndarray:
+        """Firing-weighted average of the rule outputs, NaN where nothing fires"""
+        total = strengths.sum(axis=-1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(total > 0, strengths @ self.outputs[self.rules.consequents] / total,
+                            np.nan)
+
+    def __call__(self, *inputs, chunk: int = BATCH_CHUNK) -> np.ndarray:
+        """Sugeno output for every row, in `rules.input_labels` order"""
+        return _evaluate_rows(self.rules, self.defuzzify, inputs, chunk)
+
+
+RATING_ANALYTIC = AnalyticRuleBase.from_rule_base(RATING_RULES, RATING_SHAPES)
+RATING_SUGENO = SugenoRuleBase.from_rule_base(RATING_RULES, RATING_SHAPES)
+
+
+def rate_houses_analytic(sizes, prices, locations) -> np.ndarray:
+    """Continuous Mamdani rating of every house, NaN where no rule fires"""
+    return RATING_ANALYTIC(sizes, prices, locations)
+
+
+def rate_houses_sugeno(sizes, prices, locations) -> np.ndarray:
+    """Sugeno rating of every house, NaN where no rule fires"""
+    return RATING_SUGENO(sizes, prices, locations)
+
+
+def compare(n: int = 100_000, steps: Sequence[float] = (1.0, 0.1, 0.01),
+            seed: int = 0) -> List[Dict[str, float]]:
+    """Throughput and error of every mode against the analytic centroid"""
+    import time
+
+    rng = np.random.default_rng(seed)
+    inputs = [rng.uniform(u[0], u[-1], n) for u in RATING_RULES.input_universes]
+    modes = [(f"mamdani step={step:g}", resample_output(RATING_RULES, RATING_SHAPES, step))
+             for step in steps]
+    modes += [("analytic", RATING_ANALYTIC), ("sugeno", RATING_SUGENO)]
+
+    results = []
+    for name, evaluate in modes:
+        start = time.perf_counter()
+        ratings = evaluate(*inputs)
+        results.append((name, time.perf_counter() - start, ratings))
+
+    reference = results[len(steps)][2]
+    fired = ~np.isnan(reference)
+    rows = []
+    for name, seconds, ratings in results:
+        error = np.abs(ratings[fired] - reference[fired])
+        rows.append({'mode': name, 'rows_per_s': n / seconds,
+                     'mean_abs_error': float(error.mean()), 'max_abs_error': float(error.max())})
+    return rows
+
+
+if __name__ == "__main__":
+    print("Errors against the analytic (continuous) Mamdani centroid")
+    for row in compare():
+        print(f"{row['mode']:<22} {row['rows_per_s']:>12,.0f} rows/s  "
+              f"mean |err| {row['mean_abs_error']:.4f}  max |err| {row['max_abs_error']:.4f}")
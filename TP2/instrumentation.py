@@ -0,0 +1,194 @@
+"""
+Opt-in profiling of the fuzzy inference stages
+
+Pass a Profiler to CompiledRuleBase (or to profile_ratings) and every
+chunk it evaluates is split into the four Mamdani stages, each timed on
+its own:
+
+- fuzzify:   membership degree of every input term
+- rules:     AND (minimum) of every rule's antecedent, times its weight
+- aggregate: maximum activation per output term, i.e. the cut levels
+- defuzzify: centroid of the clipped and aggregated output terms
+
+Besides timings it counts, per rule, how many rows fire it and a
+histogram of its non-zero activation strengths, how many rules fire per
+row and how many rows fire nothing. Without a profiler the evaluator runs
+its usual path; the only cost is one `is None` test per chunk.
+
+report() is plain JSON with keys in a fixed order and rules named after
+their antecedents, so reports of two versions can be diffed directly or
+with compare().
+
+Usage:
+profiler = Profiler()
+ratings = rating_rules()(sizes, prices, locations, profiler=profiler)
+profiler.save('profile.json')
+python instrumentation.py --rows 100000 --out profile.json [--baseline old.json]
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+STAGES = ('fuzzify', 'rules', 'aggregate', 'defuzzify')
+
+
+class Profiler:
+    """Accumulates stage timings and rule firing statistics over evaluations"""
+
+    def __init__(self, bins: int = 10):
+        self.edges = np.linspace(0.0, 1.0, bins + 1)
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.rows = self.chunks = self.unfired_rows = 0
+        self._rules = None
+        self.fired = self.histograms = self.strength_sums = self.rules_per_row = None
+
+    def _bind(self, rules):
+        if self._rules is None:
+            self._rules = rules
+            n = len(rules.antecedents)
+            self.fired = np.zeros(n, dtype=np.int64)
+            self.strength_sums = np.zeros(n)
+            self.histograms = np.zeros((n, len(self.edges) - 1), dtype=np.int64)
+            self.rules_per_row = np.zeros(n + 1, dtype=np.int64)
+        elif self._rules is not rules:
+            raise ValueError("A Profiler records a single rule base")
+
+    def evaluate(self, rules, columns: Sequence[np.ndarray]) -> np.ndarray:
+        """Crisp outputs of one chunk, recording every stage"""
+        self._bind(rules)
+        start = time.perf_counter()
+        memberships = rules.fuzzify(columns)
+        fuzzified = time.perf_counter()
+        strengths = rules.firing(memberships)
+        fired = time.perf_counter()
+        cuts = rules.cuts(strengths)
+        aggregated = time.perf_counter()
+        out = rules.defuzzify(cuts)
+        done = time.perf_counter()
+
+        for stage, seconds in zip(STAGES, (fuzzified - start, fired - fuzzified,
+                                           aggregated - fired, done - aggregated)):
+            self.seconds[stage] += seconds
+        self.record_firing(strengths)
+        return out
+
+    def record_firing(self, strengths: np.ndarray):
+        """Count the (rows, rules) activations of one chunk"""
+        active = strengths > 0
+        per_row = active.sum(axis=1)
+        self.rows += len(strengths)
+        self.chunks += 1
+        self.unfired_rows += int(np.sum(per_row == 0))
+        self.rules_per_row += np.bincount(per_row, minlength=len(self.rules_per_row))
+        self.fired += active.sum(axis=0)
+        self.strength_sums += strengths.sum(axis=0)
+        # Bin index of every non-zero activation, one bincount per rule
+        bins = len(self.edges) - 1
+        index = np.clip(np.searchsorted(self.edges, strengths, side='left') - 1, 0, bins - 1)
+        for r in range(strengths.shape[1]):
+            self.histograms[r] += np.bincount(index[active[:, r], r], minlength=bins)
+
+    def rule_names(self) -> List[str]:
+        rules = self._rules
+        names = []
+        for antecedent, consequent in zip(rules.antecedents, rules.consequents):
+            terms = ' & '.join(f"{rules.input_labels[i]}[{rules.input_terms[i][t]}]"
+                               for i, t in antecedent)
+            names.append(f"{terms} -> {rules.output_label}[{rules.output_terms[consequent]}]")
+        return names
+
+    def report(self) -> Dict:
+        """JSON-ready summary of everything recorded so far"""
+        total = sum(self.seconds.values())
+        report = {
+            'rows': self.rows,
+            'chunks': self.chunks,
+            'stages': {stage: {'seconds': self.seconds[stage],
+                               'share': self.seconds[stage] / total if total else 0.0,
+                               'us_per_row': self.seconds[stage] / self.rows * 1e6 if self.rows else 0.0}
+                       for stage in STAGES},
+            'unfired_rows': self.unfired_rows,
+        }
+        if self._rules is None:
+            return report
+        report['rules_fired_per_row'] = self.rules_per_row.tolist()
+        report['histogram_edges'] = self.edges.tolist()
+        report['rules'] = [{'rule': name,
+                            'fired': int(self.fired[r]),
+                            'fire_rate': self.fired[r] / self.rows if self.rows else 0.0,
+                            'mean_strength_when_fired': (self.strength_sums[r] / self.fired[r]
+                                                         if self.fired[r] else 0.0),
+                            'histogram': self.histograms[r].tolist()}
+                           for r, name in enumerate(self.rule_names())]
+        return report
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+            f.write('\n')
+
+
+def profile_ratings(sizes, prices, locations, profiler: Optional[Profiler] = None) -> Profiler:
+    """Rate a batch of houses with main.py's controller under a profiler"""
+    from batch import rating_rules
+
+    profiler = profiler or Profiler()
+    rating_rules()(sizes, prices, locations, profiler=profiler)
+    return profiler
+
+
+def compare(baseline: Dict, current: Dict) -> List[str]:
+    """Lines describing how per-row stage times and firing rates moved"""
+    lines = []
+    for stage in STAGES:
+        old, new = baseline['stages'][stage]['us_per_row'], current['stages'][stage]['us_per_row']
+        change = f"{(new / old - 1) * 100:+.1f}%" if old else "n/a"
+        lines.append(f"{stage:<10} {old:9.3f} -> {new:9.3f} us/row  {change}")
+    old_rules = {rule['rule']: rule for rule in baseline.get('rules', [])}
+    for rule in current.get('rules', []):
+        old = old_rules.pop(rule['rule'], None)
+        if old is None:
+            lines.append(f"new rule   {rule['rule']}")
+        elif abs(rule['fire_rate'] - old['fire_rate']) > 1e-3:
+            lines.append(f"fire rate  {old['fire_rate']:.3f} -> {rule['fire_rate']:.3f}  {rule['rule']}")
+    lines += [f"removed    {name}" for name in old_rules]
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python instrumentation.py',
+                                     description="Profile the house-rating controller stages")
+    parser.add_argument('--rows', type=int, default=100_000, help="uniformly random houses")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="write the JSON report here")
+    parser.add_argument('--baseline', help="earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    from batch import rating_rules
+
+    rng = np.random.default_rng(args.seed)
+    inputs = [rng.uniform(u[0], u[-1], args.rows) for u in rating_rules().input_universes]
+    profiler = profile_ratings(*inputs)
+    report = profiler.report()
+    if args.out:
+        profiler.save(args.out)
+
+    for stage, row in report['stages'].items():
+        print(f"{stage:<10} {row['seconds'] * 1e3:9.1f} ms  {row['share']:6.1%}  "
+              f"{row['us_per_row']:7.3f} us/row")
+    print(f"rows firing no rule: {report['unfired_rows']} of {report['rows']}")
+    print(f"rules fired per row: {report['rules_fired_per_row']}")
+    for rule in sorted(report['rules'], key=lambda rule: -rule['fire_rate']):
+        print(f"{rule['fire_rate']:6.1%}  mean {rule['mean_strength_when_fired']:.2f}  {rule['rule']}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            print('\n'.join(compare(json.load(f), report)))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
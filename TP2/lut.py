@@ -0,0 +1,232 @@
+"""
+Precompiled lookup table for the house-rating controller
+
+compile_lut() samples rating_ctrl over a rectilinear size × price × location
+grid and refines it until multilinear interpolation between grid nodes
+stays within a tolerance of the exact controller output at the check
+points it samples, or a node budget is reached; the error actually
+measured is stored with the table as `estimated_error`, and a
+RuntimeWarning is issued when it is above the tolerance. Queries then cost a searchsorted and eight table
+reads per row instead of a full fuzzify / fire / aggregate / defuzzify
+pass.
+
+The stored error is empirical, not a guarantee: it is the largest error
+on the midpoints of the final grid, and validate() measures it again on
+random inputs, where it can come out somewhat higher. The rating is
+nearly discontinuous where a term's membership reaches zero, so the
+worst case shrinks slowly with refinement and stalls just under 1 rating
+point. With the defaults (tolerance 1.0, about 67k nodes) the midpoint
+error is 0.97, the worst of 500k random inputs 1.15, and 99% of them are
+within 0.45.
+
+Where no rule fires, skfuzzy has no output; those nodes are stored as NaN
+and a query returns NaN only when every surrounding node is undefined.
+
+Usage:
+lut = compile_lut()                      # tolerance 1.0, reached with ~67k nodes
+print(lut.estimated_error, validate(lut))
+lut.save('rating_lut.npz')
+ratings = RatingLUT.load('rating_lut.npz')(sizes, prices, locations)
+"""
+
+import itertools
+import warnings
+from typing import Callable, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+import skfuzzy as fuzz
+from skfuzzy import control as ctrl
+
+from batch import rate_houses
+from main import (
+    location_fuzzy_variable, price_fuzzy_variable, rating_ctrl, rules, size_fuzzy_variable,
+)
+
+INPUT_VARIABLES = (size_fuzzy_variable, price_fuzzy_variable, location_fuzzy_variable)
+
+# Rows per array-mode ControlSystemSimulation call
+EXACT_CHUNK = 1024
+
+Evaluator = Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+
+
+def _fires(sizes: np.ndarray, prices: np.ndarray, locations: np.ndarray) -> np.ndarray:
+    """Rows where at least one rule has a non-zero firing strength
+
+    Every rule in main.py is a conjunction, so a rule fires exactly where
+    all of its antecedent terms are non-zero.
+    """
+    inputs = {'size': sizes, 'price': prices, 'location': locations}
+    fires = np.zeros(len(sizes), dtype=bool)
+    for rule in rules:
+        active = np.ones(len(sizes), dtype=bool)
+        for term in rule.antecedent_terms:
+            universe = term.parent.universe
+            x = np.clip(inputs[term.parent.label], universe[0], universe[-1])
+            active &= fuzz.interp_membership(universe, term.mf, x) > 0
+        fires |= active
+    return fires
+
+
+def exact_ratings(sizes: np.ndarray, prices: np.ndarray, locations: np.ndarray) -> np.ndarray:
+    """rating_ctrl output for every row, NaN where no rule fires
+
+    Rows go through ControlSystemSimulation in array mode. Array mode
+    raises on a batch with a row that fires no rule, and returns the
+    previous batch's output when no row fires at all, so those rows are
+    screened out first.
+    """
+    sizes, prices, locations = (np.asarray(x, dtype=float).ravel()
+                                for x in (sizes, prices, locations))
+    out = np.full(len(sizes), np.nan)
+    rows = np.flatnonzero(_fires(sizes, prices, locations))
+    sim = ctrl.ControlSystemSimulation(rating_ctrl)
+    for start in range(0, len(rows), EXACT_CHUNK):
+        chunk = rows[start:start + EXACT_CHUNK]
+        sim.input['size'] = sizes[chunk]
+        sim.input['price'] = prices[chunk]
+        sim.input['location'] = locations[chunk]
+        sim.compute()
+        out[chunk] = sim.output['rating']
+    return out
+
+
+def _evaluate_grid(evaluate: Evaluator, axes: Sequence[np.ndarray]) -> np.ndarray:
+    mesh = np.meshgrid(*axes, indexing='ij')
+    return evaluate(*(m.ravel() for m in mesh)).reshape(mesh[0].shape)
+
+
+def _interpolate(axes: Sequence[np.ndarray], table: np.ndarray,
+                 points: Sequence[np.ndarray]) -> np.ndarray:
+    """NaN-aware multilinear interpolation of `table` at `points`
+
+    Undefined corners are dropped and the remaining weights renormalized.
+    """
+    indices, fractions = [], []
+    for axis, x in zip(axes, points):
+        x = np.clip(x, axis[0], axis[-1])
+        i = np.clip(np.searchsorted(axis, x, side='right') - 1, 0, len(axis) - 2)
+        indices.append(i)
+        fractions.append((x - axis[i]) / (axis[i + 1] - axis[i]))
+
+    total = np.zeros(np.shape(points[0]))
+    weights = np.zeros_like(total)
+    for corner in itertools.product((0, 1), repeat=len(axes)):
+        weight = np.ones_like(total)
+        for bit, t in zip(corner, fractions):
+            weight = weight * (t if bit else 1 - t)
+        values = table[tuple(i + bit for i, bit in zip(indices, corner))]
+        defined = ~np.isnan(values)
+        total += np.where(defined, weight * np.where(defined, values, 0.0), 0.0)
+        weights += np.where(defined, weight, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(weights > 0, total / weights, np.nan)
+
+
+def _errors(exact: np.ndarray, approx: np.ndarray) -> np.ndarray:
+    # Nodes where skfuzzy has no output carry no error
+    return np.where(np.isnan(exact), 0.0, np.abs(np.nan_to_num(approx, nan=np.inf) - exact))
+
+
+class RatingLUT(NamedTuple):
+    """Rating sampled on a rectilinear (size, price, location) grid
+
+    `estimated_error` is the largest |LUT - rating_ctrl| measured on the
+    verification lattice of the final grid (every cell, face and edge
+    midpoint). It is exact at those points only: an empirical estimate of
+    the worst case, not a bound; use validate() for the error on random
+    inputs.
+    """
+    axes: Tuple[np.ndarray, np.ndarray, np.ndarray]
+    table: np.ndarray
+    estimated_error: float
+
+    def __call__(self, sizes, prices, locations) -> np.ndarray:
+        """Interpolated rating for every row; inputs are clipped to the universes"""
+        points = np.broadcast_arrays(*(np.asarray(x, dtype=float)
+                                       for x in (sizes, prices, locations)))
+        return _interpolate(self.axes, self.table, points)
+
+    @property
+    def nodes(self) -> int:
+        return self.table.size
+
+    def save(self, path: str):
+        np.savez(path, size=self.axes[0], price=self.axes[1], location=self.axes[2],
+                 table=self.table, estimated_error=self.estimated_error)
+
+    @classmethod
+    def load(cls, path: str) -> 'RatingLUT':
+        with np.load(path) as data:
+            axes = (data['size'], data['price'], data['location'])
+            return cls(axes, data['table'], float(data['estimated_error']))
+
+
+def compile_lut(tolerance: float = 1.0, max_rounds: int = 6, max_nodes: int = 500_000,
+                evaluate: Evaluator = rate_houses) -> RatingLUT:
+    """Sample the controller and refine the grid until it is within `tolerance`
+
+    The grid starts at the antecedent universes: skfuzzy fuzzifies by linear
+    interpolation between universe samples, so every membership degree is
+    linear between those nodes and the surface only kinks on them. Each
+    round evaluates the controller on the grid with every interval halved,
+    and keeps the midpoints of the intervals where interpolation from the
+    current table misses by more than `tolerance`. Refinement stops when no
+    interval does, after `max_rounds`, or before the table would exceed
+    `max_nodes`; `estimated_error` reports what was actually reached.
+
+    Nodes are computed with the vectorized evaluator of batch.py, which
+    matches rating_ctrl to rounding; validate() checks against skfuzzy
+    itself.
+
+    The rating is steepest right next to nodes where a term's membership
+    reaches zero, because skfuzzy adds the points where each clipped term
+    crosses its cut to the rating universe. The error there shrinks slowly
+    with refinement, so `max_nodes` is what trades table size for accuracy;
+    the defaults reach their tolerance, while much below 1.0 is out of
+    reach of any practical table. A RuntimeWarning says when `tolerance` was not met.
+    """
+    axes: List[np.ndarray] = [np.asarray(var.universe, dtype=float) for var in INPUT_VARIABLES]
+    table = _evaluate_grid(evaluate, axes)
+
+    for round_ in range(max_rounds + 1):
+        # Halved grid: even indices are the current nodes, odd ones midpoints
+        fine_axes = []
+        for axis in axes:
+            fine = np.empty(2 * len(axis) - 1)
+            fine[0::2] = axis
+            fine[1::2] = (axis[:-1] + axis[1:]) / 2
+            fine_axes.append(fine)
+        fine_table = _evaluate_grid(evaluate, fine_axes)
+        approx = _interpolate(axes, table, np.meshgrid(*fine_axes, indexing='ij'))
+        errors = _errors(fine_table, approx)
+        estimated_error = float(errors.max())
+        if estimated_error <= tolerance or round_ == max_rounds:
+            break
+
+        # Split an interval when any check point on its midpoint plane misses
+        keep = []
+        for k in range(len(axes)):
+            worst = np.moveaxis(errors, k, 0).reshape(len(fine_axes[k]), -1).max(axis=1)
+            split = worst[1::2] > tolerance
+            selected = np.ones(len(fine_axes[k]), dtype=bool)
+            selected[1::2] = split
+            keep.append(selected)
+        if np.prod([s.sum() for s in keep]) > max_nodes:
+            break
+        axes = [fine[s] for fine, s in zip(fine_axes, keep)]
+        table = fine_table[np.ix_(*keep)]
+
+    if estimated_error > tolerance:
+        warnings.warn(f"Lookup table error {estimated_error:.3g} is above the tolerance {tolerance:g} "
+                      f"with {table.size} nodes; raise max_rounds/max_nodes or the tolerance",
+                      RuntimeWarning, stacklevel=2)
+    return RatingLUT(tuple(axes), table, estimated_error)
+
+
+def validate(lut: RatingLUT, n: int = 10_000, seed: int = 0,
+             evaluate: Evaluator = exact_ratings) -> float:
+    """Largest |LUT - rating_ctrl| over `n` uniformly random inputs"""
+    rng = np.random.default_rng(seed)
+    points = [rng.uniform(var.universe[0], var.universe[-1], n) for var in INPUT_VARIABLES]
+    return float(_errors(evaluate(*points), lut(*points)).max())
@@ -0,0 +1,185 @@
+"""
+Memoized house ratings keyed on quantized inputs
+
+Listing data repeats heavily (integer sizes, round prices, location
+scores on a 0–10 grid), yet every compute_output call reruns the whole
+controller. MemoCache sits in front of a rating function:
+
+- inputs are clipped to the antecedent universes and snapped to a grid of
+  `steps` (one step per input, None keeps the exact value); the key is the
+  grid point and the rating is computed at the grid point, so every input
+  of a cell gets the same value whichever arrived first
+- at most `max_entries` ratings are kept, evicting the least recently used
+  ('lru') or the oldest ('fifo') entry
+- hits, misses and evictions are counted, and replay() measures the hit
+  rate and quantization error of candidate settings on a sample of real
+  inputs
+
+rate() looks a whole batch up at once and computes all its misses in one
+vectorized call. Quantization trades accuracy for hits (the rating can move
+by more than 0.5 within 100 of price), so by default keys are exact and
+coarser steps should be chosen with replay().
+
+Usage:
+cache = MemoCache(steps=(5, 500, 1), max_entries=100_000)
+rating = cache(120, 6000, 4)
+ratings = cache.rate(sizes, prices, locations)
+print(cache.stats())
+cache = MemoCache.for_compute_output()    # in front of main.compute_output
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from spec import load_compiled
+
+Steps = Sequence[Optional[float]]
+Key = Tuple[float, ...]
+Evaluator = Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+
+EVICTION_POLICIES = ('lru', 'fifo')
+
+
+class MemoCache:
+    """Size-bounded cache of ratings on a quantized input grid"""
+
+    def __init__(self, evaluate: Optional[Evaluator] = None, steps: Steps = (None, None, None),
+                 max_entries: int = 100_000, eviction: str = 'lru'):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy '{eviction}', use one of {EVICTION_POLICIES}")
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        rules = load_compiled()
+        self.evaluate = evaluate or rules
+        self.universes = [(float(u[0]), float(u[-1])) for u in rules.rules.input_universes]
+        self.steps = tuple(steps)
+        if len(self.steps) != len(self.universes):
+            raise ValueError(f"Expected {len(self.universes)} steps, got {len(self.steps)}")
+        self.max_entries = max_entries
+        self.eviction = eviction
+        self._entries: 'OrderedDict[Key, float]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    @classmethod
+    def for_compute_output(cls, **kwargs) -> 'MemoCache':
+        """Cache in front of main.compute_output, serialized by a lock
+
+        compute_output drives main.py's single ControlSystemSimulation,
+        which is not safe to call from several threads at once.
+        """
+        from main import compute_output
+
+        lock = threading.Lock()
+
+        def evaluate(sizes, prices, locations) -> np.ndarray:
+            out = np.empty(len(sizes))
+            with lock:
+                for i, row in enumerate(zip(sizes, prices, locations)):
+                    try:
+                        out[i] = compute_output(*row)
+                    except KeyError:  # No rule fired
+                        out[i] = np.nan
+            return out
+
+        return cls(evaluate, **kwargs)
+
+    def quantize(self, columns: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """Clip every input column to its universe and snap it to its grid"""
+        snapped = []
+        for x, (lo, hi), step in zip(columns, self.universes, self.steps):
+            x = np.clip(np.asarray(x, dtype=float), lo, hi)
+            if step:
+                x = np.clip(np.round(x / step) * step, lo, hi)
+            snapped.append(x)
+        return snapped
+
+    def __call__(self, size: float, price: float, location: float) -> float:
+        return float(self.rate([size], [price], [location])[0])
+
+    def rate(self, sizes, prices, locations) -> np.ndarray:
+        """Ratings of a batch, computing each distinct missing key once"""
+        columns = np.broadcast_arrays(*(np.asarray(x, dtype=float)
+                                        for x in (sizes, prices, locations)))
+        shape = columns[0].shape
+        points = np.stack([x.ravel() for x in self.quantize(columns)], axis=1)
+        keys, inverse = np.unique(points, axis=0, return_inverse=True)
+        values = np.empty(len(keys))
+
+        missing = []
+        with self._lock:
+            for k, key in enumerate(map(tuple, keys.tolist())):
+                value = self._entries.get(key)
+                if value is None:
+                    missing.append(k)
+                    continue
+                values[k] = value
+                if self.eviction == 'lru':
+                    self._entries.move_to_end(key)
+            self.misses += len(missing)
+            self.hits += len(keys) - len(missing)
+            # Repeats of a key within the batch are hits too
+            self.hits += len(points) - len(keys)
+
+        if missing:
+            values[missing] = self.evaluate(*keys[missing].T)
+            with self._lock:
+                for k in missing:
+                    self._entries[tuple(keys[k].tolist())] = float(values[k])
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return values[inverse.ravel()].reshape(shape)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+def replay(columns: Sequence[np.ndarray], candidates: Sequence[Steps],
+           max_entries: int = 100_000, eviction: str = 'lru',
+           batch: int = 1) -> List[Dict[str, float]]:
+    """Hit rate and error against exact ratings of each candidate `steps`
+
+    `columns` are sizes, prices and locations of a sample of real requests,
+    replayed in order `batch` rows at a time.
+    """
+    rules = load_compiled()
+    exact = rules(*columns)
+    fired = ~np.isnan(exact)
+    rows = []
+    for steps in candidates:
+        cache = MemoCache(rules, steps, max_entries, eviction)
+        ratings = np.concatenate([cache.rate(*(x[start:start + batch] for x in columns))
+                                  for start in range(0, len(columns[0]), batch)])
+        error = np.abs(ratings - exact)[fired & ~np.isnan(ratings)]
+        rows.append({'steps': list(steps), **cache.stats(),
+                     'mean_abs_error': float(error.mean()) if len(error) else 0.0,
+                     'max_abs_error': float(error.max()) if len(error) else 0.0,
+                     'nan_mismatches': int(np.sum(np.isnan(ratings) != np.isnan(exact)))})
+    return rows
+
+
+if __name__ == "__main__":
+    # Listing-like traffic: sizes in steps of 5, prices rounded to 500, integer locations
+    rng = np.random.default_rng(0)
+    n = 50_000
+    sample = [np.round(rng.normal(120, 30, n) / 5) * 5,
+              np.round(rng.lognormal(np.log(6000), 0.5, n) / 500) * 500,
+              np.round(rng.uniform(0, 10, n))]
+    candidates = [(None, None, None), (5, 500, 1), (10, 1000, 1), (20, 2000, 2)]
+    print(f"{'steps':<22} {'hit rate':>9} {'entries':>8} {'mean |err|':>11} {'max |err|':>10}")
+    for row in replay(sample, candidates, batch=64):
+        print(f"{str(row['steps']):<22} {row['hit_rate']:>9.3f} {row['entries']:>8} "
+              f"{row['mean_abs_error']:>11.4f} {row['max_abs_error']:>10.4f}")
@@ -0,0 +1,229 @@
+"""
+Streaming bulk scoring of house listings
+
+score_file() reads a CSV or Parquet listing file in chunks of `chunk_rows`,
+scores every chunk in a pool of worker processes and appends the results
+to the output file in input order, so memory stays bounded by roughly
+`chunk_rows` × (2 × workers + 1) rows whatever the size of the file.
+
+Each worker memory-maps the compiled rule base of spec.py, then per chunk:
+
+- parses the size / price / location columns; rows with a missing or
+  non-numeric value (including CSV lines too short to reach the column)
+  get status 'invalid' and no rating
+- clips values to the antecedent universes (size 50–200, price 0–20000,
+  location 0–10) and marks those rows 'clipped'
+- rates the chunk with one vectorized call; rows where no rule fires get
+  status 'unrated' and no rating
+
+All input columns are passed through, followed by `rating` and `status`.
+Parquet needs pyarrow.
+
+Usage:
+summary = score_file('listings.csv', 'ratings.csv', chunk_rows=100_000)
+python pipeline.py listings.csv ratings.csv --workers 4
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from spec import CACHE_DIR, SPEC_PATH, load_compiled
+
+Chunk = Dict[str, list]
+
+STATUSES = ('ok', 'clipped', 'unrated', 'invalid')
+
+_worker_rules = None
+
+
+def _init_worker(spec_path: str, cache_dir: str):
+    global _worker_rules
+    _worker_rules = load_compiled(spec_path, cache_dir)
+
+
+def _is_parquet(path: str) -> bool:
+    return path.endswith(('.parquet', '.pq'))
+
+
+def read_chunks(path: str, chunk_rows: int) -> Iterator[Chunk]:
+    """Column dicts of at most `chunk_rows` rows each"""
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pydict()
+        return
+
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        width = len(header)
+        rows = []
+        for row in reader:
+            # Short rows are padded with None (invalid if an input is missing), long ones cut
+            if len(row) != width:
+                row = (row + [None] * width)[:width]
+            rows.append(row)
+            if len(rows) == chunk_rows:
+                yield _columns(header, rows)
+                rows = []
+        if rows:
+            yield _columns(header, rows)
+
+
+def _columns(header: List[str], rows: List[list]) -> Chunk:
+    return {label: [row[i] for row in rows] for i, label in enumerate(header)}
+
+
+def parse_column(values: Sequence) -> np.ndarray:
+    """Floats, NaN for missing or non-numeric values"""
+    try:
+        parsed = np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        parsed = np.empty(len(values))
+        for i, value in enumerate(values):
+            try:
+                parsed[i] = float(value)
+            except (TypeError, ValueError):
+                parsed[i] = np.nan
+    # float('inf') parses, but is no more a valid listing than 'abc'
+    parsed[~np.isfinite(parsed)] = np.nan
+    return parsed
+
+
+def score_chunk(chunk: Chunk) -> Chunk:
+    """Validate, clip and rate one chunk in a worker"""
+    rules = _worker_rules.rules
+    missing = [label for label in rules.input_labels if label not in chunk]
+    if missing:
+        raise ValueError(f"Missing input columns {missing}")
+
+    inputs, invalid, clipped = [], None, None
+    for label, universe in zip(rules.input_labels, rules.input_universes):
+        x = parse_column(chunk[label])
+        bad = np.isnan(x)
+        clip = np.clip(np.where(bad, universe[0], x), universe[0], universe[-1])
+        invalid = bad if invalid is None else invalid | bad
+        out_of_range = ~bad & (clip != x)
+        clipped = out_of_range if clipped is None else clipped | out_of_range
+        inputs.append(clip)
+
+    ratings = _worker_rules(*inputs)
+    status = np.full(len(ratings), 0)
+    status[clipped] = 1
+    status[np.isnan(ratings)] = 2
+    status[invalid] = 3
+    ratings[invalid] = np.nan
+
+    scored = dict(chunk)
+    scored['rating'] = [None if np.isnan(r) else r for r in ratings.tolist()]
+    scored['status'] = [STATUSES[s] for s in status.tolist()]
+    return scored
+
+
+class _Writer:
+    """Appends scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = self._csv = self._parquet = None
+
+    def write(self, chunk: Chunk):
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, self._schema(pa.table(chunk).schema))
+            self._parquet.write_table(pa.table(chunk, schema=self._parquet.schema))
+            return
+        if self._csv is None:
+            self._file = open(self.path, 'w', newline='')
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(chunk)
+        self._csv.writerows(zip(*(['' if v is None else v for v in column]
+                                  for column in chunk.values())))
+
+    @staticmethod
+    def _schema(inferred):
+        """Schema of every chunk, whatever the values of the first one
+
+        A column that is all None in the first chunk would be inferred as
+        null-typed and later chunks could not be written against it.
+        """
+        import pyarrow as pa
+
+        fields = []
+        for field in inferred:
+            if field.name == 'rating':
+                field = field.with_type(pa.float64())
+            elif field.name == 'status' or pa.types.is_null(field.type):
+                field = field.with_type(pa.string())
+            fields.append(field)
+        return pa.schema(fields)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def score_file(source: str, destination: str, chunk_rows: int = 100_000,
+               workers: Optional[int] = None, spec_path: str = SPEC_PATH,
+               cache_dir: str = CACHE_DIR) -> Dict[str, float]:
+    """Score `source` into `destination` chunk by chunk; returns row counts per status"""
+    workers = workers or os.cpu_count() or 1
+    load_compiled(spec_path, cache_dir)    # compile once, workers only memory-map
+    counts = dict.fromkeys(STATUSES, 0)
+    start = time.perf_counter()
+    writer = _Writer(destination)
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(spec_path, cache_dir)) as pool:
+            # A bounded window of chunks in flight keeps reads from running ahead
+            pending = deque()
+            for chunk in read_chunks(source, chunk_rows):
+                pending.append(pool.submit(score_chunk, chunk))
+                if len(pending) >= 2 * workers:
+                    _drain(pending.popleft().result(), writer, counts)
+            while pending:
+                _drain(pending.popleft().result(), writer, counts)
+    finally:
+        writer.close()
+    rows = sum(counts.values())
+    seconds = time.perf_counter() - start
+    return {'rows': rows, **counts, 'seconds': seconds, 'rows_per_s': rows / seconds if seconds else 0.0}
+
+
+def _drain(scored: Chunk, writer: _Writer, counts: Dict[str, int]):
+    writer.write(scored)
+    for status, n in Counter(scored['status']).items():
+        counts[status] += n
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python pipeline.py',
+                                     description="Rate a CSV/Parquet listing file in chunks")
+    parser.add_argument('source', help="CSV or Parquet file with size, price and location columns")
+    parser.add_argument('destination', help="CSV or Parquet file to write, by extension")
+    parser.add_argument('--chunk-rows', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+    summary = score_file(args.source, args.destination, args.chunk_rows, args.workers)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
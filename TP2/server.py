@@ -0,0 +1,351 @@
+"""
+Local scoring service for the house-rating controller
+
+main.compute_output drives one module-level ControlSystemSimulation, whose
+inputs are shared mutable state, so concurrent callers overwrite each
+other. BatchingScorer instead keeps a pool of worker processes, each with
+its own rule base memory-mapped from the compiled artifact of spec.py (the
+tables are shared between workers through the page cache):
+
+- callers submit rows and get a Future back
+- a dispatcher thread coalesces whatever arrives within `max_wait` seconds
+  (up to `max_batch` rows) into one vectorized batch per worker call
+- at most two batches per worker are in flight, so a burst queues in the
+  dispatcher instead of piling up in the pool
+- stats() reports request latencies, batch sizes and throughput
+- a batch that cannot be scored fails its own futures only; when a worker
+  dies the pool is replaced, so later requests are served again
+
+serve() exposes a scorer over HTTP: POST /score with
+{"size": ..., "price": ..., "location": ...} (numbers or equal-length
+lists) answers {"rating": [...]}, null where no rule fires; GET /stats
+returns the stats.
+
+Usage:
+with BatchingScorer(workers=4) as scorer:
+    rating = scorer.score(120, 6000, 4)
+python server.py serve --port 8000
+python server.py bench --clients 32 --requests 5000 [--url http://127.0.0.1:8000]
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.request import Request, urlopen
+
+import numpy as np
+
+from spec import CACHE_DIR, SPEC_PATH, load_compiled
+
+# Latencies kept for the percentiles in stats()
+STATS_WINDOW = 100_000
+
+_worker_rules = None
+
+
+def _init_worker(spec_path: str, cache_dir: str):
+    global _worker_rules
+    _worker_rules = load_compiled(spec_path, cache_dir)
+
+
+def _score_batch(sizes: np.ndarray, prices: np.ndarray, locations: np.ndarray) -> np.ndarray:
+    return _worker_rules(sizes, prices, locations)
+
+
+class ServiceStats:
+    """Thread-safe request and batch counters"""
+
+    def __init__(self, window: int = STATS_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._started = time.perf_counter()
+        self.requests = self.rows = self.batches = self.errors = 0
+
+    def record_batch(self, requests: int, rows: int, latencies: List[float], failed: bool):
+        with self._lock:
+            self.batches += 1
+            self.requests += requests
+            self.rows += rows
+            self.errors += requests if failed else 0
+            self._latencies.extend(latencies)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            latencies = np.array(self._latencies)
+            elapsed = time.perf_counter() - self._started
+            stats = {'requests': self.requests, 'rows': self.rows, 'batches': self.batches,
+                     'errors': self.errors, 'uptime_s': elapsed,
+                     'rows_per_s': self.rows / elapsed,
+                     'mean_batch_rows': self.rows / self.batches if self.batches else 0.0}
+        for q in (50, 99):
+            stats[f'p{q}_ms'] = float(np.percentile(latencies, q)) * 1e3 if len(latencies) else 0.0
+        return stats
+
+
+class BatchingScorer:
+    """Worker pool behind a queue that merges concurrent requests into batches"""
+
+    def __init__(self, workers: Optional[int] = None, max_batch: int = 4096,
+                 max_wait: float = 0.002, spec_path: str = SPEC_PATH, cache_dir: str = CACHE_DIR):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.spec_path = spec_path
+        self.cache_dir = cache_dir
+        # Compile once here so that workers only memory-map the artifact
+        load_compiled(spec_path, cache_dir)
+        self._pool = self._new_pool()
+        self._queue: queue.Queue = queue.Queue()
+        self._in_flight = threading.BoundedSemaphore(2 * self.workers)
+        self._stats = ServiceStats()
+        self._dispatcher = threading.Thread(target=self._dispatch, name='scorer-dispatch',
+                                            daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, sizes, prices, locations) -> Future:
+        """Future of the ratings of one request; scalars give a 0-d array"""
+        columns = np.broadcast_arrays(*(np.asarray(x, dtype=float)
+                                        for x in (sizes, prices, locations)))
+        future = Future()
+        self._queue.put(([col.ravel() for col in columns], columns[0].shape, future,
+                         time.perf_counter()))
+        return future
+
+    def score(self, sizes, prices, locations, timeout: Optional[float] = None):
+        """Ratings of one request, NaN where no rule fires"""
+        ratings = self.submit(sizes, prices, locations).result(timeout)
+        return float(ratings) if ratings.ndim == 0 else ratings
+
+    def stats(self) -> Dict[str, float]:
+        return {'workers': self.workers, **self._stats.snapshot()}
+
+    def close(self):
+        self._queue.put(None)
+        self._dispatcher.join()
+        self._pool.shutdown()
+
+    def __enter__(self) -> 'BatchingScorer':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                   initargs=(self.spec_path, self.cache_dir))
+
+    def _dispatch(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch, rows = [item], len(item[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            while rows < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                rows += len(item[0][0])
+
+            self._in_flight.acquire()
+            try:
+                columns = [np.concatenate([columns[i] for columns, *_ in batch]) for i in range(3)]
+                try:
+                    future = self._pool.submit(_score_batch, *columns)
+                except BrokenProcessPool:
+                    # A worker died: replace the pool and try once more
+                    self._pool.shutdown(wait=False)
+                    self._pool = self._new_pool()
+                    future = self._pool.submit(_score_batch, *columns)
+            except Exception as error:
+                # Only this batch fails; the dispatcher keeps serving the queue
+                failed = Future()
+                failed.set_exception(error)
+                self._resolve(batch, failed)
+                continue
+            future.add_done_callback(lambda done, batch=batch: self._resolve(batch, done))
+
+    def _resolve(self, batch: list, done: Future):
+        self._in_flight.release()
+        now = time.perf_counter()
+        error = done.exception()
+        offset = 0
+        for columns, shape, future, _ in batch:
+            n = len(columns[0])
+            if error is None:
+                future.set_result(done.result()[offset:offset + n].reshape(shape))
+            else:
+                future.set_exception(error)
+            offset += n
+        self._stats.record_batch(len(batch), offset, [now - queued for *_, queued in batch],
+                                 error is not None)
+
+
+def _handler(scorer: BatchingScorer):
+    class ScoreHandler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: Dict):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self._reply(200, scorer.stats())
+            else:
+                self._reply(404, {'error': f"Unknown path '{self.path}'"})
+
+        def do_POST(self):
+            if self.path != '/score':
+                self._reply(404, {'error': f"Unknown path '{self.path}'"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                pending = scorer.submit(request['size'], request['price'], request['location'])
+            except KeyError as e:
+                self._reply(400, {'error': f"Missing field {e}"})
+                return
+            except (TypeError, ValueError) as e:
+                self._reply(400, {'error': str(e)})
+                return
+            try:
+                ratings = pending.result()
+            except Exception as e:
+                self._reply(500, {'error': f"Scoring failed: {type(e).__name__}: {e}"})
+                return
+            ratings = np.atleast_1d(ratings).tolist()
+            self._reply(200, {'rating': [None if np.isnan(r) else r for r in ratings]})
+
+        def log_message(self, format, *args):
+            pass
+
+    return ScoreHandler
+
+
+def serve(scorer: BatchingScorer, host: str = '127.0.0.1', port: int = 8000) -> ThreadingHTTPServer:
+    """HTTP server for `scorer`; call serve_forever() on it"""
+    server = ThreadingHTTPServer((host, port), _handler(scorer))
+    server.daemon_threads = True
+    return server
+
+
+def http_client(url: str) -> Callable:
+    """score(sizes, prices, locations) against a running server"""
+    def score(sizes, prices, locations):
+        body = json.dumps({'size': sizes, 'price': prices, 'location': locations}).encode()
+        request = Request(url.rstrip('/') + '/score', data=body,
+                          headers={'Content-Type': 'application/json'})
+        with urlopen(request) as response:
+            return json.load(response)['rating']
+    return score
+
+
+def load_test(score: Callable, clients: int = 16, requests: int = 2000,
+              rows_per_request: int = 1, seed: int = 0) -> Dict[str, float]:
+    """Closed-loop load: `clients` threads send `requests` random requests in total"""
+    rules = load_compiled().rules
+    rng = np.random.default_rng(seed)
+    inputs = [rng.uniform(u[0], u[-1], (requests, rows_per_request)).tolist()
+              for u in rules.input_universes]
+    latencies = [0.0] * requests
+    counter = iter(range(requests))
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            score(*(column[i] for column in inputs))
+            latencies[i] = time.perf_counter() - start
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {'clients': clients, 'requests': requests, 'rows_per_request': rows_per_request,
+            'requests_per_s': requests / elapsed, 'rows_per_s': requests * rows_per_request / elapsed,
+            'p50_ms': float(np.percentile(latencies, 50)) * 1e3,
+            'p99_ms': float(np.percentile(latencies, 99)) * 1e3}
+
+
+def run_serve(args: argparse.Namespace) -> int:
+    with BatchingScorer(args.workers, args.max_batch, args.max_wait_ms / 1e3) as scorer:
+        server = serve(scorer, args.host, args.port)
+        print(f"Scoring on http://{args.host}:{server.server_port} with {scorer.workers} workers")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    return 0
+
+
+def run_bench(args: argparse.Namespace) -> int:
+    if args.url:
+        report = load_test(http_client(args.url), args.clients, args.requests, args.rows, args.seed)
+    else:
+        with BatchingScorer(args.workers, args.max_batch, args.max_wait_ms / 1e3) as scorer:
+            report = load_test(scorer.score, args.clients, args.requests, args.rows, args.seed)
+            report['server'] = scorer.stats()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python server.py',
+                                     description="Batched house-rating scoring service")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def pool_options(command: argparse.ArgumentParser):
+        command.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+        command.add_argument('--max-batch', type=int, default=4096, help="rows per batch")
+        command.add_argument('--max-wait-ms', type=float, default=2.0,
+                             help="how long a batch waits for more requests")
+
+    serve_ = commands.add_parser('serve', help="serve POST /score and GET /stats over HTTP")
+    serve_.add_argument('--host', default='127.0.0.1')
+    serve_.add_argument('--port', type=int, default=8000)
+    pool_options(serve_)
+    serve_.set_defaults(run=run_serve)
+
+    bench = commands.add_parser('bench', help="closed-loop load generator")
+    bench.add_argument('--url', help="benchmark a running server instead of an in-process pool")
+    bench.add_argument('--clients', type=int, default=16)
+    bench.add_argument('--requests', type=int, default=2000)
+    bench.add_argument('--rows', type=int, default=1, help="rows per request")
+    bench.add_argument('--seed', type=int, default=0)
+    pool_options(bench)
+    bench.set_defaults(run=run_bench)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,201 @@
+"""
+Sparse rule activation for compiled rule bases
+
+CompiledRuleBase.firing evaluates every rule for every row, although for
+one house only a couple of terms per variable are non-zero. Since skfuzzy
+fuzzifies by linear interpolation between universe samples, the terms that
+can be non-zero are fixed on each universe interval. SparseRuleBase
+precomputes them per interval and indexes the rules by antecedent terms:
+
+- an input value only evaluates the (usually 2) terms active on its interval
+- rules are grouped by the inputs their antecedent mentions, and each group
+  is a dense table from one term per mentioned input to the rules with
+  exactly that antecedent
+- a row only looks up the combinations of its active terms, so the work per
+  row is Π (active terms per input) instead of the number of rules, which
+  grows combinatorially with a full size × price × location grid
+
+The resulting cut levels are defuzzified by the Mamdani centroid of
+batch.py, so outputs are identical to the dense evaluation.
+
+Usage:
+ratings = SPARSE_RATING_RULES(sizes, prices, locations)
+python sparse_rules.py    # dense vs sparse on growing rule grids
+"""
+
+from functools import lru_cache
+from itertools import product
+from typing import List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from batch import BATCH_CHUNK, CompiledRuleBase, rating_rules
+
+
+class TermIndex(NamedTuple):
+    """Terms of one input that are non-zero on each universe interval
+
+    On interval j, slot s holds term `terms[j, s]` whose degree is
+    `starts[j, s] + slopes[j, s] * (x - universe[j])`; padding slots have
+    zero start and slope.
+    """
+    universe: np.ndarray
+    terms: np.ndarray
+    starts: np.ndarray
+    slopes: np.ndarray
+
+    @classmethod
+    def from_mfs(cls, universe: np.ndarray, mfs: np.ndarray) -> 'TermIndex':
+        y0, y1 = mfs[:, :-1], mfs[:, 1:]
+        active = (y0 > 0) | (y1 > 0)
+        k = max(int(active.sum(axis=0).max()), 1)
+        intervals = len(universe) - 1
+        terms = np.zeros((intervals, k), dtype=np.intp)
+        starts = np.zeros((intervals, k))
+        slopes = np.zeros((intervals, k))
+        for j in range(intervals):
+            on = np.flatnonzero(active[:, j])
+            terms[j, :len(on)] = on
+            starts[j, :len(on)] = y0[on, j]
+            slopes[j, :len(on)] = (y1[on, j] - y0[on, j]) / (universe[j + 1] - universe[j])
+        return cls(universe, terms, starts, slopes)
+
+    def fuzzify(self, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, slots) active term ids and their degrees, x clipped to the universe"""
+        u = self.universe
+        x = np.clip(x, u[0], u[-1])
+        j = np.clip(np.searchsorted(u, x, side='right') - 1, 0, len(u) - 2)
+        degrees = self.starts[j] + self.slopes[j] * (x - u[j])[:, None]
+        return self.terms[j], degrees
+
+
+class RuleGroup(NamedTuple):
+    """Rules whose antecedents mention exactly `inputs`
+
+    `table[t_1, ..., t_n, m]` is the m-th rule with antecedent terms
+    (t_1, ..., t_n) on those inputs, -1 when there is none.
+    """
+    inputs: Tuple[int, ...]
+    table: np.ndarray
+
+
+def _group_rules(rules: CompiledRuleBase) -> List[RuleGroup]:
+    by_inputs = {}
+    for r, antecedent in enumerate(rules.antecedents):
+        terms = dict(antecedent)
+        if len(terms) != len(antecedent):
+            raise ValueError(f"Rule {r} uses the same input twice")
+        inputs = tuple(sorted(terms))
+        by_inputs.setdefault(inputs, {}).setdefault(tuple(terms[i] for i in inputs), []).append(r)
+
+    groups = []
+    for inputs, antecedents in sorted(by_inputs.items()):
+        depth = max(len(ids) for ids in antecedents.values())
+        table = np.full(tuple(len(rules.input_terms[i]) for i in inputs) + (depth,), -1,
+                        dtype=np.intp)
+        for terms, ids in antecedents.items():
+            table[terms][:len(ids)] = ids
+        groups.append(RuleGroup(inputs, table))
+    return groups
+
+
+class SparseRuleBase(NamedTuple):
+    """CompiledRuleBase with per-interval term indexes and rule lookup tables"""
+    rules: CompiledRuleBase
+    term_indexes: Tuple[TermIndex, ...]
+    groups: Tuple[RuleGroup, ...]
+
+    @classmethod
+    def compile(cls, rules: CompiledRuleBase) -> 'SparseRuleBase':
+        indexes = tuple(TermIndex.from_mfs(u, mfs)
+                        for u, mfs in zip(rules.input_universes, rules.input_mfs))
+        return cls(rules, indexes, tuple(_group_rules(rules)))
+
+    def cuts(self, inputs: Sequence[np.ndarray]) -> np.ndarray:
+        """(rows, output terms) cut levels, firing only rules with active terms"""
+        active = [index.fuzzify(x) for index, x in zip(self.term_indexes, inputs)]
+        n = len(inputs[0])
+        rows = np.arange(n)
+        cuts = np.zeros((n, len(self.rules.output_terms)))
+        weights, consequents = self.rules.weights, self.rules.consequents
+        for group in self.groups:
+            slots = [range(active[i][0].shape[1]) for i in group.inputs]
+            for combo in product(*slots):
+                terms = tuple(active[i][0][:, s] for i, s in zip(group.inputs, combo))
+                degree = active[group.inputs[0]][1][:, combo[0]]
+                for i, s in zip(group.inputs[1:], combo[1:]):
+                    degree = np.minimum(degree, active[i][1][:, s])
+                matches = group.table[terms]                           # (rows, depth)
+                for m in range(matches.shape[1]):
+                    rule = matches[:, m]
+                    activation = np.where(rule >= 0, degree * weights[rule], 0.0)
+                    target = consequents[rule]
+                    cuts[rows, target] = np.maximum(cuts[rows, target], activation)
+        return cuts
+
+    def __call__(self, *inputs, chunk: int = BATCH_CHUNK) -> np.ndarray:
+        """Mamdani output for every row, in `rules.input_labels` order"""
+        columns = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in inputs))
+        shape = columns[0].shape
+        columns = [col.ravel() for col in columns]
+        out = np.empty(len(columns[0]))
+        for start in range(0, len(out), chunk):
+            rows = slice(start, start + chunk)
+            out[rows] = self.rules.defuzzify(self.cuts([col[rows] for col in columns]))
+        return out.reshape(shape)
+
+
+@lru_cache(maxsize=None)
+def sparse_rating_rules() -> SparseRuleBase:
+    """main.py's rating_ctrl with sparse activation, compiled on first use"""
+    return SparseRuleBase.compile(rating_rules())
+
+
+def __getattr__(name: str):
+    # Built lazily like batch.RATING_RULES, so importing this module stays cheap
+    if name == 'SPARSE_RATING_RULES':
+        return sparse_rating_rules()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def grid_rule_base(n_inputs: int, n_terms: int, seed: int = 0) -> CompiledRuleBase:
+    """Synthetic full-grid rule base: n_terms triangles per input, one rule per combination"""
+    rng = np.random.default_rng(seed)
+    universe = np.linspace(0, 10, 4 * (n_terms - 1) + 1)
+    peaks = np.linspace(0, 10, n_terms)
+    spacing = peaks[1] - peaks[0]
+    mfs = np.maximum(0, 1 - np.abs(universe[None, :] - peaks[:, None]) / spacing)
+    combos = list(product(range(n_terms), repeat=n_inputs))
+    rating = rating_rules()
+    return rating._replace(
+        input_labels=tuple(f"x{i}" for i in range(n_inputs)),
+        input_universes=(universe,) * n_inputs,
+        input_terms=(tuple(f"t{t}" for t in range(n_terms)),) * n_inputs,
+        input_mfs=(mfs,) * n_inputs,
+        antecedents=tuple(tuple(enumerate(combo)) for combo in combos),
+        consequents=rng.integers(0, len(rating.output_terms), len(combos)),
+        weights=np.ones(len(combos)),
+    )
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    n = 100_000
+    cases = [("house rules", rating_rules())]
+    cases += [(f"grid {k} inputs x {t} terms", grid_rule_base(k, t)) for k, t in
+              ((3, 3), (3, 5), (4, 5), (5, 5))]
+    print(f"{'rule base':<24} {'rules':>6} {'dense s':>9} {'sparse s':>9} {'max |diff|':>11}")
+    for name, rules in cases:
+        sparse = SparseRuleBase.compile(rules)
+        inputs = [rng.uniform(u[0], u[-1], n) for u in rules.input_universes]
+        start = time.perf_counter()
+        dense_out = rules(*inputs)
+        dense_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        sparse_out = sparse(*inputs)
+        sparse_seconds = time.perf_counter() - start
+        diff = np.nanmax(np.abs(dense_out - sparse_out))
+        print(f"{name:<24} {len(rules.antecedents):>6} {dense_seconds:>9.3f} "
+              f"{sparse_seconds:>9.3f} {diff:>11.2e}")
@@ -0,0 +1,309 @@
+"""
+Declarative spec and cached compiled artifacts for fuzzy rule bases
+
+rating_system.json defines the house-rating system that main.py builds:
+input and output variables with their universes (np.arange start, stop,
+step) and terms (skfuzzy shape name and parameters), and AND rules mapping
+one term per mentioned input to an output term, with an optional weight
+and an optional free-text note explaining the rule.
+YAML specs (.yaml / .yml) hold the same structure and need PyYAML.
+
+compile_spec() samples the terms with skfuzzy once into a CompiledRuleBase.
+save_artifact() writes it, together with the sparse term indexes and rule
+tables of sparse_rules.py, as plain .npy files plus a manifest. A worker's
+load_compiled() finds the artifact by the spec's hash and memory-maps it,
+so it imports neither skfuzzy nor main.py (nor matplotlib) and shares the
+pages with every other worker on the host. Only the first call for a new
+spec compiles.
+
+Usage:
+rules = load_compiled()               # SparseRuleBase, rules.rules is dense
+ratings = rules(sizes, prices, locations)
+antecedents, consequent, rules = control_system(load_spec())   # skfuzzy objects, as in main.py
+python spec.py                        # compile, check against main.py, time startup
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from batch import CompiledRuleBase
+from sparse_rules import RuleGroup, SparseRuleBase, TermIndex
+
+Shape = Tuple[str, Tuple[float, ...]]
+Spec = Dict[str, Any]
+
+SPEC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rating_system.json')
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.fuzzy_cache')
+
+# Bump when the artifact layout changes so stale caches are not read
+ARTIFACT_VERSION = 1
+
+
+def load_spec(path: str = SPEC_PATH) -> Spec:
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml
+
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def spec_hash(spec: Spec) -> str:
+    """Digest of the spec and artifact version; key order is significant"""
+    canonical = json.dumps([ARTIFACT_VERSION, spec], separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def sample_shape(shape: Shape, x: np.ndarray) -> np.ndarray:
+    """Membership degrees of a shape at `x`, computed by skfuzzy"""
+    import skfuzzy as fuzz
+
+    kind, params = shape
+    if kind in ('trimf', 'trapmf'):
+        return getattr(fuzz, kind)(x, list(params))
+    return getattr(fuzz, kind)(x, *params)
+
+
+def term_shapes(variable: Dict[str, Any]) -> Dict[str, Shape]:
+    """{term: (shape, params)} of one spec variable"""
+    return {name: (term['shape'], tuple(term['params'])) for name, term in variable['terms'].items()}
+
+
+def _universe(variable: Dict[str, Any]) -> np.ndarray:
+    start, stop, step = variable['universe']
+    return np.arange(start, stop, step).astype(float)
+
+
+def _sample_terms(variable: Dict[str, Any], universe: np.ndarray) -> np.ndarray:
+    return np.array([sample_shape(shape, universe) for shape in term_shapes(variable).values()],
+                    dtype=float)
+
+
+def control_system(spec: Spec) -> Tuple[Dict[str, Any], Any, list]:
+    """skfuzzy antecedents by label, consequent and rules of a spec
+
+    main.py builds its controller with this, so the spec is the only
+    definition of the rating system.
+    """
+    from skfuzzy import control as ctrl
+
+    def variable(kind, label: str, definition: Dict[str, Any]):
+        fuzzy = kind(np.arange(*definition['universe']), label)
+        for name, shape in term_shapes(definition).items():
+            fuzzy[name] = sample_shape(shape, fuzzy.universe)
+        return fuzzy
+
+    antecedents = {label: variable(ctrl.Antecedent, label, definition)
+                   for label, definition in spec['inputs'].items()}
+    output = spec['output']
+    consequent = variable(ctrl.Consequent, output['label'], output)
+    rules = []
+    for r, rule in enumerate(spec['rules']):
+        try:
+            terms = [antecedents[label][term] for label, term in rule['if'].items()]
+            then = consequent[rule['then']]
+        except (KeyError, ValueError):
+            raise ValueError(f"Rule {r} uses an undefined variable or term: {rule}") from None
+        antecedent = terms[0]
+        for term in terms[1:]:
+            antecedent = antecedent & term
+        weight = float(rule.get('weight', 1.0))
+        rules.append(ctrl.Rule(antecedent, then if weight == 1.0 else then % weight))
+    return antecedents, consequent, rules
+
+
+def compile_spec(spec: Spec) -> CompiledRuleBase:
+    """Sample every term on its universe and index the rules"""
+    labels = tuple(spec['inputs'])
+    variables = [spec['inputs'][label] for label in labels]
+    universes = tuple(_universe(var) for var in variables)
+    input_terms = tuple(tuple(var['terms']) for var in variables)
+    output = spec['output']
+    output_universe = _universe(output)
+    output_terms = tuple(output['terms'])
+
+    antecedents, consequents, weights = [], [], []
+    for r, rule in enumerate(spec['rules']):
+        try:
+            antecedents.append(tuple((labels.index(label), input_terms[labels.index(label)].index(term))
+                                     for label, term in rule['if'].items()))
+            consequents.append(output_terms.index(rule['then']))
+        except ValueError:
+            raise ValueError(f"Rule {r} uses an undefined variable or term: {rule}") from None
+        weights.append(float(rule.get('weight', 1.0)))
+
+    return CompiledRuleBase(
+        input_labels=labels,
+        input_universes=universes,
+        input_terms=input_terms,
+        input_mfs=tuple(_sample_terms(var, u) for var, u in zip(variables, universes)),
+        output_label=output['label'],
+        output_universe=output_universe,
+        output_terms=output_terms,
+        output_mfs=_sample_terms(output, output_universe),
+        antecedents=tuple(antecedents),
+        consequents=np.array(consequents, dtype=np.intp),
+        weights=np.array(weights, dtype=float),
+    )
+
+
+def save_artifact(sparse: SparseRuleBase, path: str):
+    """Write a compiled rule base as a manifest and .npy files under `path`
+
+    The directory is built next to `path` and renamed into place, so
+    concurrent workers never see a partial artifact.
+    """
+    rules = sparse.rules
+    arrays = {
+        'output_universe': rules.output_universe,
+        'output_mfs': rules.output_mfs,
+        'consequents': rules.consequents,
+        'weights': rules.weights,
+    }
+    # Antecedents as a (rules, inputs) table of term ids, -1 for unused inputs
+    antecedents = np.full((len(rules.antecedents), len(rules.input_labels)), -1, dtype=np.intp)
+    for r, antecedent in enumerate(rules.antecedents):
+        for i, t in antecedent:
+            antecedents[r, i] = t
+    arrays['antecedents'] = antecedents
+    for i, (universe, mfs, index) in enumerate(zip(rules.input_universes, rules.input_mfs,
+                                                  sparse.term_indexes)):
+        arrays[f'input{i}_universe'] = universe
+        arrays[f'input{i}_mfs'] = mfs
+        arrays[f'input{i}_terms'] = index.terms
+        arrays[f'input{i}_starts'] = index.starts
+        arrays[f'input{i}_slopes'] = index.slopes
+    for g, group in enumerate(sparse.groups):
+        arrays[f'group{g}_table'] = group.table
+
+    manifest = {
+        'version': ARTIFACT_VERSION,
+        'input_labels': list(rules.input_labels),
+        'input_terms': [list(terms) for terms in rules.input_terms],
+        'output_label': rules.output_label,
+        'output_terms': list(rules.output_terms),
+        'groups': [list(group.inputs) for group in sparse.groups],
+    }
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix='.partial-')
+    try:
+        # mkdtemp makes the directory 0700; give it the mode makedirs would
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(staging, 0o777 & ~umask)
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f'{name}.npy'), np.ascontiguousarray(array))
+        with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        try:
+            os.rename(staging, path)
+        except OSError:
+            # Another process published the same artifact first
+            if not os.path.exists(os.path.join(path, 'manifest.json')):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def load_artifact(path: str, mmap_mode: Optional[str] = 'r') -> SparseRuleBase:
+    """Memory-map an artifact written by save_artifact"""
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    if manifest['version'] != ARTIFACT_VERSION:
+        raise ValueError(f"Artifact version {manifest['version']} is not {ARTIFACT_VERSION}")
+
+    def array(name: str) -> np.ndarray:
+        return np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+
+    inputs = range(len(manifest['input_labels']))
+    table = array('antecedents')
+    rules = CompiledRuleBase(
+        input_labels=tuple(manifest['input_labels']),
+        input_universes=tuple(array(f'input{i}_universe') for i in inputs),
+        input_terms=tuple(tuple(terms) for terms in manifest['input_terms']),
+        input_mfs=tuple(array(f'input{i}_mfs') for i in inputs),
+        output_label=manifest['output_label'],
+        output_universe=array('output_universe'),
+        output_terms=tuple(manifest['output_terms']),
+        output_mfs=array('output_mfs'),
+        antecedents=tuple(tuple((int(i), int(t)) for i, t in enumerate(row) if t >= 0)
+                          for row in table.tolist()),
+        consequents=array('consequents'),
+        weights=array('weights'),
+    )
+    indexes = tuple(TermIndex(rules.input_universes[i], array(f'input{i}_terms'),
+                              array(f'input{i}_starts'), array(f'input{i}_slopes'))
+                    for i in inputs)
+    groups = tuple(RuleGroup(tuple(group), array(f'group{g}_table'))
+                   for g, group in enumerate(manifest['groups']))
+    return SparseRuleBase(rules, indexes, groups)
+
+
+def artifact_path(spec: Spec, cache_dir: str = CACHE_DIR) -> str:
+    return os.path.join(cache_dir, spec_hash(spec))
+
+
+def load_compiled(spec_path: str = SPEC_PATH, cache_dir: str = CACHE_DIR) -> SparseRuleBase:
+    """Rule base of a spec file, compiled and cached on first use"""
+    spec = load_spec(spec_path)
+    path = artifact_path(spec, cache_dir)
+    if not os.path.exists(os.path.join(path, 'manifest.json')):
+        save_artifact(SparseRuleBase.compile(compile_spec(spec)), path)
+    return load_artifact(path)
+
+
+def rule_set(rules: CompiledRuleBase) -> set:
+    """Rules as (input label → term) antecedents, consequent and weight, order-free"""
+    return {(frozenset((rules.input_labels[i], rules.input_terms[i][t]) for i, t in antecedent),
+             rules.output_terms[c], float(w))
+            for antecedent, c, w in zip(rules.antecedents, rules.consequents, rules.weights)}
+
+
+if __name__ == "__main__":
+    import subprocess
+    import sys
+    import time
+
+    from batch import rating_rules
+
+    start = time.perf_counter()
+    spec = load_spec()
+    compiled = compile_spec(spec)
+    with tempfile.TemporaryDirectory() as scratch:
+        save_artifact(SparseRuleBase.compile(compiled), os.path.join(scratch, 'artifact'))
+        print(f"compile + save: {(time.perf_counter() - start) * 1e3:8.1f} ms")
+
+        reference = rating_rules()
+        assert compiled.input_labels == reference.input_labels
+        for ours, theirs in zip(compiled.input_mfs + (compiled.output_mfs,),
+                                reference.input_mfs + (reference.output_mfs,)):
+            assert np.array_equal(ours, theirs), "Membership tables differ from main.py"
+        assert rule_set(compiled) == rule_set(reference), "Rules differ from main.py"
+
+        loaded = load_artifact(os.path.join(scratch, 'artifact'))
+        rng = np.random.default_rng(0)
+        inputs = [rng.uniform(u[0], u[-1], 100_000) for u in reference.input_universes]
+        assert np.array_equal(loaded(*inputs), reference(*inputs), equal_nan=True)
+        print("spec and artifact match main.py")
+
+        # Cold start of a worker: fresh interpreter, load the artifact, rate one house
+        worker = "\n".join([
+            "import json, sys, time",
+            "start = time.perf_counter()",
+            f"sys.path.insert(0, {os.path.dirname(SPEC_PATH)!r})",
+            "from spec import load_artifact",
+            f"load_artifact({os.path.join(scratch, 'artifact')!r})([120], [6000], [4])",
+            "print(json.dumps([time.perf_counter() - start,",
+            "                  sorted({'skfuzzy', 'matplotlib', 'main'} & set(sys.modules))]))",
+        ])
+        run = subprocess.run([sys.executable, '-c', worker], capture_output=True, text=True, check=True)
+        seconds, heavy = json.loads(run.stdout)
+        print(f"worker startup:  {seconds * 1e3:8.1f} ms, heavy modules imported: {heavy or 'none'}")
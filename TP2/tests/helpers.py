@@ -0,0 +1,23 @@
+"""
+Random houses and the per-row skfuzzy reference shared by the TP2 tests
+"""
+
+import numpy as np
+
+from batch import rating_rules
+from main import compute_output
+
+
+def random_houses(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.uniform(u[0], u[-1], n) for u in rating_rules().input_universes]
+
+
+def skfuzzy_ratings(sizes, prices, locations):
+    out = np.empty(len(sizes))
+    for i, row in enumerate(zip(sizes, prices, locations)):
+        try:
+            out[i] = compute_output(*row)
+        except KeyError:  # No rule fired
+            out[i] = np.nan
+    return out
@@ -0,0 +1,27 @@
+"""
+Vectorized rule base against main.py's skfuzzy controller
+"""
+
+import numpy as np
+
+from batch import rate_houses, rating_rules
+from helpers import random_houses, skfuzzy_ratings
+
+
+def test_compiled_matches_skfuzzy():
+    houses = random_houses(300)
+    assert np.allclose(rating_rules()(*houses), skfuzzy_ratings(*houses), atol=1e-9, equal_nan=True)
+
+
+def test_chunks_and_shapes():
+    houses = random_houses(1000, seed=1)
+    whole = rate_houses(*houses)
+    assert np.array_equal(rating_rules()(*houses, chunk=7), whole, equal_nan=True)
+    grid = [h.reshape(10, 100) for h in houses]
+    assert np.array_equal(rate_houses(*grid), whole.reshape(10, 100), equal_nan=True)
+
+
+def test_no_rule_fired_is_nan():
+    # A small, expensive house between the average and good locations fires no rule
+    assert np.isnan(skfuzzy_ratings([60.0], [15000.0], [6.3])[0])
+    assert np.isnan(rate_houses(60.0, 15000.0, 6.3))
@@ -0,0 +1,55 @@
+"""
+Closed-form defuzzification modes against the sampled Mamdani centroid
+"""
+
+import numpy as np
+import pytest
+
+from batch import rate_houses, rating_rules
+from closed_form import (
+    RATING_SHAPES, AnalyticRuleBase, SugenoRuleBase, rate_houses_analytic, rate_houses_sugeno,
+    resample_output, shape_centroid,
+)
+from helpers import random_houses
+
+
+def test_mamdani_converges_to_analytic():
+    houses = random_houses(2000, seed=3)
+    analytic = rate_houses_analytic(*houses)
+    fired = ~np.isnan(analytic)
+    errors = []
+    for step in (1.0, 0.1, 0.01):
+        mamdani = resample_output(rating_rules(), RATING_SHAPES, step)(*houses)
+        assert np.array_equal(np.isnan(mamdani), ~fired)
+        errors.append(np.abs(mamdani[fired] - analytic[fired]).max())
+    assert errors[0] > errors[1] > errors[2] and errors[2] < 1e-3
+
+
+def test_analytic_is_the_step_one_rating_on_the_default_universe():
+    houses = random_houses(2000, seed=4)
+    assert np.allclose(rate_houses_analytic(*houses), rate_houses(*houses), atol=0.2, equal_nan=True)
+
+
+def test_shape_centroids():
+    assert shape_centroid(('trimf', (1, 3, 5)), 0, 10) == pytest.approx(3.0)
+    assert shape_centroid(('trapmf', (4, 5, 6, 7)), 0, 10) == pytest.approx(5.5)
+    # zmf and smf mirror each other on [0, 10]
+    assert shape_centroid(('zmf', (0, 2)), 0, 10) == pytest.approx(
+        10 - shape_centroid(('smf', (8, 10)), 0, 10))
+
+
+def test_sugeno_is_a_weighted_average_of_centroids():
+    houses = random_houses(500, seed=5)
+    rules = rating_rules()
+    strengths = rules.firing(rules.fuzzify(houses))
+    centroids = np.array([shape_centroid(RATING_SHAPES[t], 0, 10) for t in rules.output_terms])
+    with np.errstate(invalid='ignore'):  # No rule fired
+        expected = strengths @ centroids[rules.consequents] / strengths.sum(axis=-1)
+    assert np.allclose(rate_houses_sugeno(*houses), expected, equal_nan=True)
+
+
+def test_shapes_must_match_the_rule_base():
+    shapes = dict(RATING_SHAPES, medium=('trimf', (4, 5.5, 7)))
+    for cls in (AnalyticRuleBase, SugenoRuleBase):
+        with pytest.raises(ValueError, match="'medium'"):
+            cls.from_rule_base(rating_rules(), shapes)
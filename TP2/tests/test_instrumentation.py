@@ -0,0 +1,59 @@
+"""
+Stage profiler: outputs unchanged and firing statistics against the rule base
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from batch import rating_rules
+from helpers import random_houses
+from instrumentation import STAGES, Profiler, compare, profile_ratings
+
+
+@pytest.fixture(scope='module')
+def houses():
+    return random_houses(5000, seed=10)
+
+
+def test_profiled_ratings_are_unchanged(houses):
+    profiler = Profiler()
+    rules = rating_rules()
+    assert np.array_equal(rules(*houses, chunk=1000, profiler=profiler), rules(*houses), equal_nan=True)
+    assert profiler.rows == 5000 and profiler.chunks == 5
+    assert all(profiler.seconds[stage] > 0 for stage in STAGES)
+
+
+def test_firing_statistics(houses):
+    report = profile_ratings(*houses).report()
+    rules = rating_rules()
+    strengths = rules.firing(rules.fuzzify(houses))
+    active = strengths > 0
+    assert [rule['fired'] for rule in report['rules']] == active.sum(axis=0).tolist()
+    assert report['unfired_rows'] == int(np.isnan(rules(*houses)).sum())
+    assert sum(report['rules_fired_per_row']) == report['rows']
+    for rule, fired in zip(report['rules'], active.sum(axis=0)):
+        assert sum(rule['histogram']) == fired
+    assert report['rules'][0]['rule'] == 'location[poor] & price[expensive] -> rating[very_low]'
+
+
+def test_report_is_json_and_compares(houses, tmp_path):
+    profiler = profile_ratings(*houses)
+    path = tmp_path / 'profile.json'
+    profiler.save(str(path))
+    baseline = json.loads(path.read_text())
+    assert baseline == json.loads(json.dumps(profiler.report()))
+
+    current = profile_ratings(*(h[:1000] for h in houses)).report()
+    current['rules'] = current['rules'][1:]
+    lines = compare(baseline, current)
+    assert [line.split()[0] for line in lines[:len(STAGES)]] == list(STAGES)
+    assert lines[-1].startswith('removed') and 'rating[very_low]' in lines[-1]
+
+
+def test_profiler_records_one_rule_base(houses):
+    profiler = profile_ratings(*houses)
+    other = rating_rules()._replace(weights=rating_rules().weights * 0.5)
+    with pytest.raises(ValueError, match='single rule base'):
+        other(*houses, profiler=profiler)
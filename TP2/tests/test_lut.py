@@ -0,0 +1,50 @@
+"""
+Lookup table against the exact controller
+"""
+
+import numpy as np
+import pytest
+
+from lut import RatingLUT, compile_lut, exact_ratings, validate
+
+
+@pytest.fixture(scope='module')
+def lut():
+    return compile_lut()
+
+
+def test_defaults_reach_their_tolerance(lut, recwarn):
+    # Regression: the default tolerance was out of reach of the node budget
+    assert lut.estimated_error <= 1.0
+    assert not [w for w in recwarn if issubclass(w.category, RuntimeWarning)]
+
+
+def test_matches_controller(lut):
+    rng = np.random.default_rng(1)
+    points = [rng.uniform(axis[0], axis[-1], 2000) for axis in lut.axes]
+    exact = exact_ratings(*points)
+    approx = lut(*points)
+    fired = ~np.isnan(exact)
+    errors = np.abs(approx[fired] - exact[fired])
+    assert np.quantile(errors, 0.99) < 0.5
+    assert errors.max() < 1.5
+    assert validate(lut, n=500) < 1.5
+
+
+def test_exact_on_nodes(lut):
+    mesh = np.meshgrid(*lut.axes, indexing='ij')
+    assert np.array_equal(lut(*mesh), lut.table, equal_nan=True)
+
+
+def test_unreachable_tolerance_warns():
+    with pytest.warns(RuntimeWarning, match='above the tolerance'):
+        coarse = compile_lut(tolerance=0.05, max_rounds=1)
+    assert coarse.estimated_error > 0.05
+
+
+def test_save_load(lut, tmp_path):
+    path = str(tmp_path / 'lut.npz')
+    lut.save(path)
+    loaded = RatingLUT.load(path)
+    assert loaded.estimated_error == lut.estimated_error
+    assert np.array_equal(loaded.table, lut.table, equal_nan=True)
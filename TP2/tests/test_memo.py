@@ -0,0 +1,75 @@
+"""
+Memoized ratings: quantized keys, eviction and replay
+"""
+
+import numpy as np
+import pytest
+
+from batch import rate_houses
+from helpers import random_houses
+from memo import MemoCache, replay
+
+
+class Counting:
+    """rate_houses, remembering how many rows it was asked for"""
+
+    def __init__(self):
+        self.rows = 0
+
+    def __call__(self, sizes, prices, locations):
+        self.rows += len(sizes)
+        return rate_houses(sizes, prices, locations)
+
+
+def test_exact_keys_match_rate_houses():
+    houses = random_houses(500, seed=6)
+    cache = MemoCache(rate_houses)
+    assert np.array_equal(cache.rate(*houses), rate_houses(*houses), equal_nan=True)
+    assert cache(120, 6000, 4) == pytest.approx(rate_houses([120], [6000], [4])[0])
+
+
+def test_each_distinct_key_is_computed_once():
+    evaluate = Counting()
+    cache = MemoCache(evaluate, steps=(10, 1000, 1))
+    sizes, prices, locations = [121, 119, 124, 121], [6100, 5900, 6400, 6100], [4.2, 3.8, 4, 4.2]
+    ratings = cache.rate(sizes, prices, locations)
+    assert evaluate.rows == 1
+    assert np.all(ratings == rate_houses(120, 6000, 4))
+    cache.rate([160], [12000], [6])
+    cache.rate([158], [12000], [6])
+    assert evaluate.rows == 2
+    assert cache.stats()['hits'] == 4 and cache.stats()['misses'] == 2
+
+
+@pytest.mark.parametrize('eviction, kept', [('lru', (1, 3)), ('fifo', (2, 3))])
+def test_eviction(eviction, kept):
+    cache = MemoCache(rate_houses, max_entries=2, eviction=eviction)
+    for location in (1, 2, 1, 3):
+        cache(120, 6000, location)
+    assert sorted(key[2] for key in cache._entries) == list(kept)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_quantize_clips_to_the_universes():
+    cache = MemoCache(rate_houses, steps=(10, None, 1))
+    sizes, prices, locations = cache.quantize([[10, 123], [-5, 20500], [3.4, 11]])
+    assert sizes.tolist() == [50, 120]
+    assert prices.tolist() == [0, 20000]
+    assert locations.tolist() == [3, 10]
+
+
+def test_replay_reports_hits_and_error():
+    rng = np.random.default_rng(7)
+    sample = [np.round(rng.uniform(50, 200, 2000) / 5) * 5, np.round(rng.uniform(0, 20000, 2000) / 500) * 500,
+              np.round(rng.uniform(0, 10, 2000))]
+    exact, coarse = replay(sample, [(None, None, None), (20, 2000, 2)], batch=64)
+    assert exact['mean_abs_error'] == 0.0 and exact['nan_mismatches'] == 0
+    assert coarse['hit_rate'] > exact['hit_rate'] and coarse['entries'] < exact['entries']
+    assert coarse['mean_abs_error'] > 0.0
+
+
+def test_rejects_bad_settings():
+    with pytest.raises(ValueError, match='eviction policy'):
+        MemoCache(rate_houses, eviction='random')
+    with pytest.raises(ValueError, match='Expected 3 steps'):
+        MemoCache(rate_houses, steps=(1, 1))
@@ -0,0 +1,43 @@
+"""
+Bulk CSV/Parquet scoring pipeline
+"""
+
+import csv
+
+import pytest
+
+from batch import rate_houses
+from pipeline import read_chunks, score_file
+
+
+def test_read_chunks_pads_ragged_rows(tmp_path):
+    path = tmp_path / 'listings.csv'
+    path.write_text("id,size,price,location\n1,120,6000,4\n2,80\n3,90,2500,2,extra\n")
+    chunks = list(read_chunks(str(path), 2))
+    assert [len(chunk['id']) for chunk in chunks] == [2, 1]
+    assert chunks[0]['price'] == ['6000', None]
+    assert chunks[1]['location'] == ['2']
+
+
+def test_score_file_csv(tmp_path):
+    source, destination = tmp_path / 'listings.csv', tmp_path / 'ratings.csv'
+    source.write_text("size,price,location\n120,6000,4\n80\n500,6000,4\nabc,1,1\n")
+    summary = score_file(str(source), str(destination), chunk_rows=2, workers=1,
+                         cache_dir=str(tmp_path / 'cache'))
+    assert {key: summary[key] for key in ('rows', 'ok', 'clipped', 'invalid')} == \
+        {'rows': 4, 'ok': 1, 'clipped': 1, 'invalid': 2}
+    with open(destination, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['status'] for row in rows] == ['ok', 'invalid', 'clipped', 'invalid']
+    assert float(rows[0]['rating']) == pytest.approx(rate_houses([120], [6000], [4])[0])
+
+
+def test_score_file_parquet_schema(tmp_path):
+    # Regression: a first chunk with no rating typed the column as null
+    pq = pytest.importorskip('pyarrow.parquet')
+    source, destination = tmp_path / 'listings.csv', tmp_path / 'ratings.parquet'
+    source.write_text("size,price,location\nabc,1,1\n120,6000,4\n")
+    score_file(str(source), str(destination), chunk_rows=1, workers=1, cache_dir=str(tmp_path / 'cache'))
+    table = pq.read_table(destination)
+    assert str(table.schema.field('rating').type) == 'double'
+    assert table.column('status').to_pylist() == ['invalid', 'ok']
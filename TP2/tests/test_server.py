@@ -0,0 +1,68 @@
+"""
+Batching scorer and HTTP server against rate_houses, including failures
+"""
+
+import json
+import threading
+from concurrent.futures import Future
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import numpy as np
+import pytest
+
+from batch import rate_houses
+from server import BatchingScorer, http_client, serve
+
+
+@pytest.fixture(scope='module')
+def scorer():
+    with BatchingScorer(workers=1) as scorer:
+        yield scorer
+
+
+def test_scorer_matches_rate_houses(scorer):
+    rng = np.random.default_rng(0)
+    houses = [rng.uniform(50, 200, 100), rng.uniform(0, 20000, 100), rng.uniform(0, 10, 100)]
+    assert np.allclose(scorer.score(*houses), rate_houses(*houses), equal_nan=True)
+    assert scorer.score(120, 6000, 4) == pytest.approx(rate_houses([120], [6000], [4])[0])
+
+
+def test_failed_submit_fails_only_its_batch(scorer, monkeypatch):
+    # Regression: an exception in submit killed the dispatcher thread and
+    # left every later request waiting forever
+    pool = scorer._pool
+
+    def broken(*args):
+        raise RuntimeError("pool unavailable")
+
+    monkeypatch.setattr(pool, 'submit', broken)
+    with pytest.raises(RuntimeError, match='pool unavailable'):
+        scorer.score(120, 6000, 4, timeout=5)
+    monkeypatch.undo()
+    assert scorer.score(120, 6000, 4, timeout=5) == pytest.approx(rate_houses([120], [6000], [4])[0])
+    assert scorer.stats()['errors'] >= 1
+
+
+def test_http_errors(scorer, monkeypatch):
+    server = serve(scorer, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    score = http_client(url)
+    try:
+        assert score([120], [6000], [4]) == [pytest.approx(rate_houses([120], [6000], [4])[0])]
+        request = Request(url + '/score', data=json.dumps({'size': [120], 'price': [6000]}).encode())
+        with pytest.raises(HTTPError) as missing:
+            urlopen(request)
+        assert missing.value.code == 400
+
+        failed = Future()
+        failed.set_exception(RuntimeError("worker crashed"))
+        monkeypatch.setattr(scorer, 'submit', lambda *args: failed)
+        with pytest.raises(HTTPError) as error:
+            score([120], [6000], [4])
+        assert error.value.code == 500
+        assert 'worker crashed' in json.load(error.value)['error']
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,52 @@
+"""
+Sparse rule activation against the dense compiled rule base
+"""
+
+import numpy as np
+import pytest
+
+from batch import rating_rules
+from helpers import random_houses
+from sparse_rules import SparseRuleBase, TermIndex, grid_rule_base
+
+
+def test_sparse_matches_dense():
+    houses = random_houses(20_000, seed=1)
+    dense = rating_rules()
+    assert np.allclose(SparseRuleBase.compile(dense)(*houses), dense(*houses), atol=1e-12, equal_nan=True)
+
+
+def test_cuts_match_dense_firing():
+    houses = random_houses(2000, seed=2)
+    dense = rating_rules()
+    expected = dense.cuts(dense.firing(dense.fuzzify(houses)))
+    assert np.allclose(SparseRuleBase.compile(dense).cuts(houses), expected, atol=1e-12)
+
+
+def test_term_index_matches_interpolation():
+    rules = rating_rules()
+    rng = np.random.default_rng(3)
+    for universe, mfs in zip(rules.input_universes, rules.input_mfs):
+        x = rng.uniform(universe[0], universe[-1], 500)
+        terms, degrees = TermIndex.from_mfs(universe, mfs).fuzzify(x)
+        dense = np.array([np.interp(x, universe, mf) for mf in mfs]).T
+        sparse = np.zeros_like(dense)
+        np.maximum.at(sparse, (np.arange(len(x))[:, None], terms), degrees)
+        assert np.allclose(sparse, dense, atol=1e-12)
+
+
+@pytest.mark.parametrize('n_inputs, n_terms', [(3, 3), (4, 5)])
+def test_grid_rule_bases(n_inputs, n_terms):
+    rules = grid_rule_base(n_inputs, n_terms)
+    rng = np.random.default_rng(4)
+    inputs = [rng.uniform(u[0], u[-1], 3000) for u in rules.input_universes]
+    assert np.allclose(SparseRuleBase.compile(rules)(*inputs), rules(*inputs), atol=1e-12, equal_nan=True)
+
+
+def test_rejects_an_input_used_twice():
+    rules = rating_rules()
+    rules = rules._replace(antecedents=rules.antecedents + (((0, 0), (0, 1)),),
+                           consequents=np.append(rules.consequents, 0),
+                           weights=np.append(rules.weights, 1.0))
+    with pytest.raises(ValueError, match='same input twice'):
+        SparseRuleBase.compile(rules)
@@ -0,0 +1,53 @@
+"""
+Declarative spec and cached artifacts against main.py's skfuzzy controller
+"""
+
+import os
+import stat
+
+import numpy as np
+import pytest
+
+from batch import CompiledRuleBase
+from helpers import random_houses
+from main import rating_ctrl
+from sparse_rules import SparseRuleBase
+from spec import compile_spec, load_artifact, load_compiled, load_spec, rule_set, save_artifact
+
+
+def test_spec_matches_main():
+    # main.py builds its controller from the spec; both compilations agree
+    ours = compile_spec(load_spec())
+    reference = CompiledRuleBase.from_control_system(rating_ctrl, ('size', 'price', 'location'))
+    assert ours.input_labels == reference.input_labels
+    assert ours.input_terms == reference.input_terms
+    for a, b in zip(ours.input_mfs + (ours.output_mfs,), reference.input_mfs + (reference.output_mfs,)):
+        assert np.array_equal(a, b)
+    assert rule_set(ours) == rule_set(reference)
+
+
+def test_spec_rejects_undefined_terms():
+    spec = load_spec()
+    spec['rules'] = spec['rules'] + [{'if': {'size': 'huge'}, 'then': 'high'}]
+    with pytest.raises(ValueError, match='undefined'):
+        compile_spec(spec)
+
+
+def test_artifact_round_trip(tmp_path):
+    path = str(tmp_path / 'artifact')
+    sparse = SparseRuleBase.compile(compile_spec(load_spec()))
+    save_artifact(sparse, path)
+    houses = random_houses(5000, seed=2)
+    assert np.array_equal(load_artifact(path)(*houses), sparse(*houses), equal_nan=True)
+    assert load_compiled(cache_dir=str(tmp_path / 'cache')).rules.input_labels == ('size', 'price', 'location')
+
+
+def test_artifact_directory_mode(tmp_path):
+    # Regression: the mkdtemp staging directory kept its 0700 mode
+    umask = os.umask(0o022)
+    try:
+        path = str(tmp_path / 'artifact')
+        save_artifact(SparseRuleBase.compile(compile_spec(load_spec())), path)
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o755
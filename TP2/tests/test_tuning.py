@@ -0,0 +1,61 @@
+"""
+Membership-parameter fitting against ratings of known parameters
+"""
+
+import numpy as np
+import pytest
+
+from spec import compile_spec, load_spec
+from tuning import Objective, ParameterSpace, demo, documented_spec, fit
+
+
+@pytest.fixture(scope='module')
+def space():
+    return ParameterSpace.from_spec(load_spec(), ('location', 'rating'))
+
+
+def test_vector_round_trip(space):
+    theta = space.vector()
+    assert np.array_equal(ParameterSpace.from_spec(space.to_spec(theta), ('location', 'rating')).vector(),
+                          theta)
+    # average's and good's peaks
+    assert np.flatnonzero(space.vector(documented_spec()) != theta).tolist() == [3, 6]
+
+
+def test_repair_keeps_valid_shapes(space):
+    rng = np.random.default_rng(8)
+    thetas = space.repair(rng.uniform(-5, 15, (50, len(space.lower))))
+    assert np.all(thetas >= space.lower) and np.all(thetas <= space.upper)
+    offset = 0
+    for section, label, term, n in space.entries:
+        block = thetas[:, offset:offset + n]
+        assert np.all(np.diff(block, axis=1) >= 0)
+        offset += n
+
+
+def test_objective_matches_compiled_spec(space):
+    rng = np.random.default_rng(9)
+    rules = compile_spec(load_spec())
+    columns = [rng.uniform(u[0], u[-1], 300) for u in rules.input_universes]
+    labels = rng.uniform(0, 10, 300)
+    objective = Objective(space, columns, labels)
+    # to_spec rounds parameters to 6 decimals
+    thetas = np.round(space.repair(space.vector() + rng.normal(0, 0.5, (4, len(space.lower)))), 6)
+    for theta, loss in zip(thetas, objective(thetas)):
+        ratings = compile_spec(space.to_spec(theta))(*columns)
+        errors = np.where(np.isnan(ratings), objective.penalty, (ratings - labels) ** 2)
+        assert loss == pytest.approx(errors.mean(), rel=1e-9)
+
+
+def test_fit_improves_on_the_coded_breakpoints():
+    # The integer location universe only samples each triangle at a few
+    # points, so the documented peaks are not identifiable; the loss is
+    result = demo(n=500, population=48, generations=40, workers=1)
+    assert result.history == sorted(result.history, reverse=True)
+    assert result.loss < 0.8 * result.initial_loss
+    assert result.evaluations == 48 * 41
+
+
+def test_unknown_variable():
+    with pytest.raises(ValueError, match="Unknown variable 'view'"):
+        fit([], [], variables=('view',))
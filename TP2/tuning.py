@@ -0,0 +1,332 @@
+"""
+Fitting the membership-function parameters to labeled house ratings
+
+The breakpoints in rating_system.json are hand-picked. fit() searches them
+with differential evolution against a dataset of (size, price, location,
+rating) rows, minimizing the mean squared error of the Mamdani rating:
+
+- ParameterSpace flattens the parameters of the chosen variables' terms
+  into one vector, bounded by each variable's universe; repair() keeps the
+  parameters of every term sorted, so each candidate is a valid shape
+- Objective scores a whole population at once: the universes are fixed,
+  so each dataset row is located on them once and every candidate's
+  membership degrees are a gather from its sampled tables, then firing,
+  aggregation and the centroid of batch.py run over (candidates, rows)
+- rows where a candidate fires no rule cost the squared width of the
+  output universe, so the search cannot discard rows by switching rules off
+- each generation is split across a process pool; the dataset is sent to
+  the workers once
+
+Usage:
+columns, labels = load_dataset('labeled.csv')
+result = fit(columns, labels, variables=('location',), population=512)
+json.dump(result.spec, open('tuned.json', 'w'), indent=2)
+python tuning.py labeled.csv --out tuned.json --workers 4
+python tuning.py --demo    # recover the documented breakpoints of main.py
+"""
+
+import argparse
+import copy
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from batch import BATCH_CHUNK, CompiledRuleBase
+from spec import Spec, compile_spec, load_spec, sample_shape
+
+# (section, variable, term, number of parameters) for each tuned term
+Entry = Tuple[str, str, str, int]
+
+# zmf and smf divide by b - a; keep that gap at least this fraction of the universe
+MIN_GAP = 1e-3
+
+
+class ParameterSpace(NamedTuple):
+    """Membership parameters of some spec variables as one bounded vector"""
+    spec: Spec
+    entries: Tuple[Entry, ...]
+    lower: np.ndarray
+    upper: np.ndarray
+
+    @classmethod
+    def from_spec(cls, spec: Spec, variables: Optional[Sequence[str]] = None) -> 'ParameterSpace':
+        """All terms of `variables` (input labels or the output label), inputs by default"""
+        sections = {label: ('inputs', label) for label in spec['inputs']}
+        sections[spec['output']['label']] = ('output', None)
+        entries, lower, upper = [], [], []
+        for label in variables or list(spec['inputs']):
+            if label not in sections:
+                raise ValueError(f"Unknown variable '{label}'")
+            section, key = sections[label]
+            variable = spec[section][key] if key else spec[section]
+            start, stop, step = variable['universe']
+            hi = np.arange(start, stop, step)[-1]
+            for term, definition in variable['terms'].items():
+                entries.append((section, label, term, len(definition['params'])))
+                lower += [start] * len(definition['params'])
+                upper += [hi] * len(definition['params'])
+        return cls(spec, tuple(entries), np.array(lower, dtype=float), np.array(upper, dtype=float))
+
+    def variable(self, spec: Spec, section: str, label: str) -> dict:
+        """Spec entry of an input label, or of the output"""
+        return spec[section][label] if section == 'inputs' else spec[section]
+
+    def vector(self, spec: Optional[Spec] = None) -> np.ndarray:
+        """Parameters of `spec` (default: the base spec) in vector order"""
+        spec = spec or self.spec
+        return np.array([p for section, label, term, _ in self.entries
+                         for p in self.variable(spec, section, label)['terms'][term]['params']],
+                        dtype=float)
+
+    def to_spec(self, theta: np.ndarray) -> Spec:
+        """Copy of the base spec with the parameters of `theta`"""
+        spec = copy.deepcopy(self.spec)
+        offset = 0
+        for section, label, term, n in self.entries:
+            params = [round(float(p), 6) for p in theta[offset:offset + n]]
+            self.variable(spec, section, label)['terms'][term]['params'] = params
+            offset += n
+        return spec
+
+    def repair(self, thetas: np.ndarray) -> np.ndarray:
+        """Clip to the universes and sort the parameters of every term"""
+        thetas = np.clip(thetas, self.lower, self.upper)
+        offset = 0
+        for section, label, term, n in self.entries:
+            block = np.sort(thetas[:, offset:offset + n], axis=1)
+            if self.variable(self.spec, section, label)['terms'][term]['shape'] in ('zmf', 'smf'):
+                gap = MIN_GAP * (self.upper[offset] - self.lower[offset])
+                block[:, 0] = np.minimum(block[:, 0], self.upper[offset] - gap)
+                block[:, 1] = np.maximum(block[:, 1], block[:, 0] + gap)
+            thetas[:, offset:offset + n] = block
+            offset += n
+        return thetas
+
+
+class Objective:
+    """Mean squared rating error of candidate parameter vectors on a dataset"""
+
+    def __init__(self, space: ParameterSpace, columns: Sequence[np.ndarray], labels: np.ndarray):
+        self.space = space
+        self.rules: CompiledRuleBase = compile_spec(space.spec)
+        self.labels = np.asarray(labels, dtype=float)
+        lo, hi = self.rules.output_universe[0], self.rules.output_universe[-1]
+        self.penalty = float(hi - lo) ** 2
+        # Each row's interval and position on every input universe
+        self.positions = []
+        for x, universe in zip(columns, self.rules.input_universes):
+            x = np.clip(np.asarray(x, dtype=float), universe[0], universe[-1])
+            j = np.clip(np.searchsorted(universe, x, side='right') - 1, 0, len(universe) - 2)
+            self.positions.append((j, (x - universe[j]) / (universe[j + 1] - universe[j])))
+
+    def tables(self, thetas: np.ndarray) -> Tuple[List[np.ndarray], Optional[np.ndarray]]:
+        """(candidates, terms, samples) membership tables of every input, and of
+        the output when it is tuned (else None)"""
+        rules = self.rules
+        inputs = [np.broadcast_to(mfs, (len(thetas),) + mfs.shape).copy() for mfs in rules.input_mfs]
+        output = None
+        offset = 0
+        for section, label, term, n in self.space.entries:
+            kind = self.space.variable(self.space.spec, section, label)['terms'][term]['shape']
+            if section == 'inputs':
+                i = rules.input_labels.index(label)
+                target, t, universe = inputs[i], rules.input_terms[i].index(term), rules.input_universes[i]
+            else:
+                if output is None:
+                    output = np.broadcast_to(rules.output_mfs,
+                                             (len(thetas),) + rules.output_mfs.shape).copy()
+                target, t, universe = output, rules.output_terms.index(term), rules.output_universe
+            for k, theta in enumerate(thetas):
+                target[k, t] = sample_shape((kind, tuple(theta[offset:offset + n])), universe)
+            offset += n
+        return inputs, output
+
+    def predict(self, thetas: np.ndarray) -> np.ndarray:
+        """(candidates, rows) ratings, NaN where a candidate fires no rule"""
+        inputs, output = self.tables(thetas)
+        memberships = []
+        for mfs, (j, f) in zip(inputs, self.positions):
+            # (candidates, terms, rows) -> (candidates, rows, terms)
+            degrees = mfs[:, :, j] * (1 - f) + mfs[:, :, j + 1] * f
+            memberships.append(np.moveaxis(degrees, 1, -1))
+        cuts = self.rules.cuts(self.rules.firing(memberships))
+        if output is None:
+            return self.rules.defuzzify(cuts)
+        return np.stack([self.rules._replace(output_mfs=mfs).defuzzify(c)
+                         for mfs, c in zip(output, cuts)])
+
+    def __call__(self, thetas: np.ndarray) -> np.ndarray:
+        """Loss of every candidate"""
+        losses = np.empty(len(thetas))
+        # Bound the (candidates, rows, ...) temporaries
+        step = max(1, 4 * BATCH_CHUNK // len(self.labels))
+        for k in range(0, len(thetas), step):
+            ratings = self.predict(thetas[k:k + step])
+            errors = np.where(np.isnan(ratings), self.penalty, (ratings - self.labels) ** 2)
+            losses[k:k + step] = errors.mean(axis=1)
+        return losses
+
+
+_worker_objective: Optional[Objective] = None
+
+
+def _init_worker(space: ParameterSpace, columns: Sequence[np.ndarray], labels: np.ndarray):
+    global _worker_objective
+    _worker_objective = Objective(space, columns, labels)
+
+
+def _worker_losses(thetas: np.ndarray) -> np.ndarray:
+    return _worker_objective(thetas)
+
+
+class FitResult(NamedTuple):
+    spec: Spec
+    loss: float
+    initial_loss: float
+    history: List[float]
+    evaluations: int
+    seconds: float
+
+
+def fit(columns: Sequence[np.ndarray], labels: np.ndarray, spec: Optional[Spec] = None,
+        variables: Optional[Sequence[str]] = None, population: int = 256,
+        generations: int = 50, mutation: float = 0.7, crossover: float = 0.9,
+        spread: float = 0.1, workers: Optional[int] = None, seed: int = 0,
+        verbose: bool = False) -> FitResult:
+    """Differential evolution (rand/1/bin) over the membership parameters
+
+    The initial population is the base spec plus Gaussian noise of `spread`
+    times each universe width; the base spec itself is kept as one member,
+    so the result is never worse than the starting point.
+    """
+    spec = spec or load_spec()
+    space = ParameterSpace.from_spec(spec, variables)
+    workers = workers or os.cpu_count() or 1
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+
+    base = space.vector()
+    width = space.upper - space.lower
+    members = space.repair(base + rng.normal(0, spread, (population, len(base))) * width)
+    members[0] = base
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                   initargs=(space, columns, labels))
+        evaluate = lambda thetas: np.concatenate(list(pool.map(
+            _worker_losses, np.array_split(thetas, workers))))
+    else:
+        evaluate = Objective(space, columns, labels)
+
+    try:
+        losses = evaluate(members)
+        initial_loss = float(losses[0])
+        history = [float(losses.min())]
+        for generation in range(generations):
+            # Three distinct partners per member, none of them the member itself
+            partners = np.argsort(rng.random((population, population - 1)), axis=1)[:, :3]
+            partners += partners >= np.arange(population)[:, None]
+            a, b, c = (members[partners[:, i]] for i in range(3))
+            mutant = a + mutation * (b - c)
+            cross = rng.random(members.shape) < crossover
+            cross[np.arange(population), rng.integers(0, len(base), population)] = True
+            trials = space.repair(np.where(cross, mutant, members))
+
+            trial_losses = evaluate(trials)
+            better = trial_losses < losses
+            members[better], losses[better] = trials[better], trial_losses[better]
+            history.append(float(losses.min()))
+            if verbose:
+                print(f"generation {generation + 1:>4}: best {history[-1]:.5f} "
+                      f"mean {losses.mean():.5f}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    best = int(np.argmin(losses))
+    return FitResult(space.to_spec(members[best]), float(losses[best]), initial_loss, history,
+                     population * (generations + 1), time.perf_counter() - start)
+
+
+def load_dataset(path: str, spec: Optional[Spec] = None,
+                 target: Optional[str] = None) -> Tuple[List[np.ndarray], np.ndarray]:
+    """Input columns and labels from a CSV with one column per variable"""
+    spec = spec or load_spec()
+    target = target or spec['output']['label']
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    columns = [np.array([float(row[label]) for row in rows]) for label in spec['inputs']]
+    return columns, np.array([float(row[target]) for row in rows])
+
+
+def documented_spec() -> Spec:
+    """The spec with the location breakpoints main.py's docstring documents"""
+    spec = load_spec()
+    terms = spec['inputs']['location']['terms']
+    terms['average']['params'] = [2, 4.5, 6]
+    terms['good']['params'] = [5, 6.5, 9]
+    return spec
+
+
+def demo(n: int = 2000, noise: float = 0.05, **kwargs) -> FitResult:
+    """Fit the coded location terms to ratings of the documented ones"""
+    truth = documented_spec()
+    rng = np.random.default_rng(1)
+    rules = compile_spec(truth)
+    columns = [rng.uniform(u[0], u[-1], n) for u in rules.input_universes]
+    labels = rules(*columns)
+    keep = ~np.isnan(labels)
+    columns = [x[keep] for x in columns]
+    labels = labels[keep] + rng.normal(0, noise, keep.sum())
+    return fit(columns, labels, variables=('location',), **kwargs)
+
+
+def _report(result: FitResult, variables: Sequence[str]):
+    print(f"loss {result.initial_loss:.5f} -> {result.loss:.5f} "
+          f"({result.evaluations} candidates in {result.seconds:.1f} s, "
+          f"{result.evaluations / result.seconds:,.0f} candidates/s)")
+    space = ParameterSpace.from_spec(result.spec, variables)
+    for section, label, term, _ in space.entries:
+        params = space.variable(result.spec, section, label)['terms'][term]['params']
+        print(f"  {label}.{term}: {params}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python tuning.py',
+                                     description="Fit membership parameters to labeled ratings")
+    parser.add_argument('dataset', nargs='?', help="CSV with size, price, location and rating columns")
+    parser.add_argument('--demo', action='store_true',
+                        help="fit the location terms to ratings of the documented breakpoints")
+    parser.add_argument('--variables', nargs='+', help="variables to tune (default: all inputs)")
+    parser.add_argument('--out', help="write the fitted spec here")
+    parser.add_argument('--population', type=int, default=256)
+    parser.add_argument('--generations', type=int, default=50)
+    parser.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    options = dict(population=args.population, generations=args.generations,
+                   workers=args.workers, seed=args.seed, verbose=True)
+    if args.demo:
+        result, variables = demo(**options), ('location',)
+    elif args.dataset:
+        columns, labels = load_dataset(args.dataset)
+        result = fit(columns, labels, variables=args.variables, **options)
+        variables = args.variables
+    else:
+        parser.error("give a dataset or --demo")
+    _report(result, variables)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(result.spec, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,12 +4,15 @@ Real Example: Autonomous Vehicle Obstacle Detection
 
 Requirements:
 pip install tkinter (usually comes with Python)
+pip install numpy
 """
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from typing import Dict, Set
-import itertools
+
+from dempster_shafer import (
+    DECISION_RULES, RULES, DecisionPolicy, MassFunction, belief, combine, plausibility, to_dense,
+)
 
 
 class DempsterShaferGUI:
@@ -21,6 +24,14 @@ class DempsterShaferGUI:
         # Frame of discernment
         self.frame_elements = ['Pedestrian', 'Cyclist', 'Vehicle', 'Animal']
         
+        # Action table used by the decision layer
+        self.decision_policy = DecisionPolicy({
+            'Pedestrian': "FREINAGE D'URGENCE ET ARRÊT COMPLET",
+            'Cyclist': "FREINAGE D'URGENCE ET ARRÊT COMPLET",
+            'Vehicle': "RALENTISSEMENT ET CONTOURNEMENT",
+            'Animal': "RALENTISSEMENT ET CONTOURNEMENT",
+        }, default_action="RALENTISSEMENT ET CONTOURNEMENT")
+        
         # Create main notebook for tabs
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(fill='both', expand=True, padx=10, pady=10)
@@ -160,11 +171,26 @@ Objectif: Combiner les trois sources pour identifier l'obstacle
         tab = ttk.Frame(self.notebook)
         self.notebook.add(tab, text="Fusion & Résultats")
         
-        # Calculate button
-        calc_btn = tk.Button(tab, text="🔄 Calculer la fusion", 
+        # Combination rule and calculate button
+        controls = tk.Frame(tab)
+        controls.pack(pady=20)
+        
+        tk.Label(controls, text="Règle de combinaison:", font=('Arial', 10, 'bold')).pack(side='left')
+        self.rule_var = tk.StringVar(value='dempster')
+        rule_box = ttk.Combobox(controls, textvariable=self.rule_var, values=list(RULES),
+                                state='readonly', width=14)
+        rule_box.pack(side='left', padx=(5, 20))
+        
+        tk.Label(controls, text="Décision:", font=('Arial', 10, 'bold')).pack(side='left')
+        self.decision_rule_var = tk.StringVar(value='max_betp')
+        decision_box = ttk.Combobox(controls, textvariable=self.decision_rule_var,
+                                    values=DECISION_RULES, state='readonly', width=10)
+        decision_box.pack(side='left', padx=(5, 20))
+        
+        calc_btn = tk.Button(controls, text="🔄 Calculer la fusion", 
                             command=self.calculate_fusion,
                             font=('Arial', 12, 'bold'), bg='lightgreen', padx=20, pady=10)
-        calc_btn.pack(pady=20)
+        calc_btn.pack(side='left')
         
         # Step 1
         step1_frame = tk.LabelFrame(tab, text="Étape 1: Caméra ⊕ LIDAR",
@@ -212,6 +238,17 @@ Conflit K (mesure du désaccord):
 
 ═══════════════════════════════════════════════════════════════════
 
+AUTRES RÈGLES (conflit élevé)
+═══════════════════════════════════════════════════════════════════
+
+Conjonctive:  m∩(A) = Σ m₁(B)·m₂(C) où B∩C = A, le conflit reste sur ∅
+Yager:        le conflit K est transféré à Θ (ignorance)
+Dubois-Prade: m₁(B)·m₂(C) avec B∩C = ∅ est transféré à B∪C
+PCR5:         m₁(B)·m₂(C) avec B∩C = ∅ est redistribué à B et C
+              proportionnellement à m₁(B) et m₂(C)
+
+═══════════════════════════════════════════════════════════════════
+
 BELIEF ET PLAUSIBILITY
 ═══════════════════════════════════════════════════════════════════
 
@@ -260,24 +297,24 @@ AVANTAGES DE LA THÉORIE DS
     
     def load_example(self):
         """Load example sensor data"""
-        self.camera_data = {
+        self.camera_data = MassFunction.from_dict(self.frame_elements, {
             frozenset(['Pedestrian']): 0.65,
             frozenset(['Cyclist']): 0.15,
             frozenset(['Pedestrian', 'Cyclist']): 0.20
-        }
+        })
         
-        self.lidar_data = {
+        self.lidar_data = MassFunction.from_dict(self.frame_elements, {
             frozenset(['Pedestrian']): 0.50,
             frozenset(['Vehicle']): 0.10,
             frozenset(['Pedestrian', 'Cyclist']): 0.30,
             frozenset(self.frame_elements): 0.10
-        }
+        })
         
-        self.radar_data = {
+        self.radar_data = MassFunction.from_dict(self.frame_elements, {
             frozenset(['Pedestrian']): 0.60,
             frozenset(['Cyclist']): 0.25,
             frozenset(['Cyclist', 'Vehicle']): 0.15
-        }
+        })
         
         self.display_sensor_data()
         self.calculate_belief_plausibility_avant()
@@ -296,7 +333,7 @@ AVANTAGES DE LA THÉORIE DS
         self.radar_text.delete('1.0', tk.END)
         self.radar_text.insert('1.0', self.format_mass_function(self.radar_data, "RADAR"))
     
-    def format_mass_function(self, mass_func: Dict, sensor_name: str) -> str:
+    def format_mass_function(self, mass_func: MassFunction, sensor_name: str) -> str:
         """Format mass function for display"""
         result = f"{'Hypothèse':<30} | Masse  | Interprétation\n"
         result += "-" * 80 + "\n"
@@ -321,48 +358,13 @@ AVANTAGES DE LA THÉORIE DS
         
         return result
     
-    def dempster_combination(self, m1: Dict, m2: Dict) -> tuple:
-        """Combine two mass functions using Dempster's rule"""
-        combined = {}
-        conflict = 0.0
-        
-        for focal1, mass1 in m1.items():
-            for focal2, mass2 in m2.items():
-                intersection = focal1 & focal2
-                
-                if len(intersection) == 0:  # Empty set
-                    conflict += mass1 * mass2
-                else:
-                    if intersection not in combined:
-                        combined[intersection] = 0.0
-                    combined[intersection] += mass1 * mass2
-        
-        # Normalize
-        normalizer = 1 - conflict
-        if normalizer > 0:
-            normalized = {k: v / normalizer for k, v in combined.items()}
-        else:
-            normalized = combined
-        
-        return normalized, conflict
+    def singleton_intervals(self, mass_func: MassFunction) -> list:
+        """Bel and Pl of every singleton, from one transform over the power set"""
+        dense = to_dense([mass_func])[0]
+        bel, pl = belief(dense), plausibility(dense)
+        return [(elem, bel[1 << i], pl[1 << i]) for i, elem in enumerate(self.frame_elements)]
     
-    def calculate_belief(self, mass_func: Dict, hypothesis: frozenset) -> float:
-        """Calculate belief for a hypothesis"""
-        belief = 0.0
-        for focal, mass in mass_func.items():
-            if focal.issubset(hypothesis):
-                belief += mass
-        return belief
-    
-    def calculate_plausibility(self, mass_func: Dict, hypothesis: frozenset) -> float:
-        """Calculate plausibility for a hypothesis"""
-        plausibility = 0.0
-        for focal, mass in mass_func.items():
-            if len(focal & hypothesis) > 0:
-                plausibility += mass
-        return plausibility
-    
-    def format_belief_plausibility(self, mass_func: Dict, source_name: str) -> str:
+    def format_belief_plausibility(self, intervals: list, source_name: str) -> str:
         """Format belief and plausibility for display"""
         result = f"\n{'='*70}\n"
         result += f"  {source_name}\n"
@@ -370,10 +372,7 @@ AVANTAGES DE LA THÉORIE DS
         result += f"{'Hypothèse':<20} | {'Bel(A)':<10} | {'Pl(A)':<10} | Intervalle\n"
         result += "-" * 70 + "\n"
         
-        for elem in self.frame_elements:
-            hypothesis = frozenset([elem])
-            bel = self.calculate_belief(mass_func, hypothesis)
-            pl = self.calculate_plausibility(mass_func, hypothesis)
+        for elem, bel, pl in intervals:
             result += f"{elem:<20} | {bel:>8.4f}   | {pl:>8.4f}   | [{bel:.4f}, {pl:.4f}]\n"
         
         return result
@@ -386,17 +385,20 @@ AVANTAGES DE LA THÉORIE DS
         result += "="*70 + "\n"
         
         # Camera
-        result += self.format_belief_plausibility(self.camera_data, "🎥 CAMÉRA")
+        result += self.format_belief_plausibility(
+            self.singleton_intervals(self.camera_data), "🎥 CAMÉRA")
         
         # LIDAR
-        result += self.format_belief_plausibility(self.lidar_data, "📡 LIDAR")
+        result += self.format_belief_plausibility(
+            self.singleton_intervals(self.lidar_data), "📡 LIDAR")
         
         # Radar
-        result += self.format_belief_plausibility(self.radar_data, "📶 RADAR")
+        result += self.format_belief_plausibility(
+            self.singleton_intervals(self.radar_data), "📶 RADAR")
         
         self.belief_avant_text.insert('1.0', result)
     
-    def calculate_belief_plausibility_apres(self, final_mass: Dict):
+    def calculate_belief_plausibility_apres(self, final_mass: MassFunction):
         """Calculate and display Belief and Plausibility after fusion"""
         self.belief_apres_text.delete('1.0', tk.END)
         
@@ -404,17 +406,15 @@ AVANTAGES DE LA THÉORIE DS
         result += "="*70 + "\n"
         result += "(Caméra ⊕ LIDAR ⊕ Radar)\n"
         
-        result += self.format_belief_plausibility(final_mass, "🎯 RÉSULTAT FINAL")
+        intervals = self.singleton_intervals(final_mass)
+        result += self.format_belief_plausibility(intervals, "🎯 RÉSULTAT FINAL")
         
         # Add interpretation
         result += "\n" + "="*70 + "\n"
         result += "INTERPRÉTATION:\n"
         result += "-"*70 + "\n"
         
-        for elem in self.frame_elements:
-            hypothesis = frozenset([elem])
-            bel = self.calculate_belief(final_mass, hypothesis)
-            pl = self.calculate_plausibility(final_mass, hypothesis)
+        for elem, bel, pl in intervals:
             width = pl - bel
             
             result += f"\n{elem}:\n"
@@ -435,8 +435,9 @@ AVANTAGES DE LA THÉORIE DS
         """Perform fusion calculation"""
         try:
             # Step 1: Camera ⊕ LIDAR
-            step1_combined, step1_conflict = self.dempster_combination(
-                self.camera_data, self.lidar_data
+            rule = self.rule_var.get()
+            step1_combined, step1_conflict = combine(
+                self.camera_data, self.lidar_data, rule
             )
             
             # Display step 1
@@ -451,8 +452,8 @@ AVANTAGES DE LA THÉORIE DS
             self.step1_text.insert('1.0', result1)
             
             # Step 2: (Camera ⊕ LIDAR) ⊕ Radar
-            final_combined, final_conflict = self.dempster_combination(
-                step1_combined, self.radar_data
+            final_combined, final_conflict = combine(
+                step1_combined, self.radar_data, rule
             )
             
             # Display step 2
@@ -473,19 +474,16 @@ AVANTAGES DE LA THÉORIE DS
             self.calculate_belief_plausibility_apres(final_combined)
             
             # Display decision
-            best_hypothesis = max(final_combined.items(), key=lambda x: x[1])
-            decision_msg = f"🎯 DÉCISION: L'obstacle est un {', '.join(sorted(best_hypothesis[0]))}\n"
-            decision_msg += f"   Confiance: {best_hypothesis[1]*100:.1f}%\n\n"
-            
-            if any(elem in best_hypothesis[0] for elem in ['Pedestrian', 'Cyclist']):
-                decision_msg += "⚠️  ACTION: FREINAGE D'URGENCE ET ARRÊT COMPLET"
-            else:
-                decision_msg += "⚠️  ACTION: RALENTISSEMENT ET CONTOURNEMENT"
+            decision = self.decision_policy.decide(final_combined, self.decision_rule_var.get())
+            measure = {'max_bel': 'Bel', 'max_pl': 'Pl', 'max_betp': 'BetP'}[decision.rule]
+            decision_msg = f"🎯 DÉCISION: L'obstacle est un {decision.hypothesis}\n"
+            decision_msg += f"   Confiance ({measure}): {decision.score*100:.1f}%\n\n"
+            decision_msg += f"⚠️  ACTION: {decision.action}"
             
             self.decision_text.config(text=decision_msg)
             
             messagebox.showinfo("Calcul terminé", 
-                              f"Fusion complétée!\nMeilleure hypothèse: {', '.join(sorted(best_hypothesis[0]))} ({best_hypothesis[1]*100:.1f}%)")
+                              f"Fusion complétée!\nMeilleure hypothèse: {decision.hypothesis} ({decision.score*100:.1f}%)")
             
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors du calcul:\n{str(e)}")
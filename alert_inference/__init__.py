@@ -0,0 +1,22 @@
+"""
+Compiled inference for the security-alert Bayesian networks of Tp3.ipynb
+
+The networks are built with pgmpy as in the notebook; everything after
+compilation runs on numpy arrays.
+"""
+
+from .batch import BatchPosteriors, codes_for_states, evidence_codes, query_batch, state_codes
+from .cache import CachedInference
+from .junction_tree import CompiledNetwork, product_marginal
+from .learning import CPDLearner, read_events
+from .models import MODELS, multiply_connected_security, polytree_security
+from .sampling import SamplingNetwork, SamplingResult, gibbs, likelihood_weighting
+
+__all__ = [
+    'BatchPosteriors', 'codes_for_states', 'evidence_codes', 'query_batch', 'state_codes',
+    'CachedInference',
+    'CompiledNetwork', 'product_marginal',
+    'CPDLearner', 'read_events',
+    'MODELS', 'multiply_connected_security', 'polytree_security',
+    'SamplingNetwork', 'SamplingResult', 'gibbs', 'likelihood_weighting',
+]
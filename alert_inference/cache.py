@@ -0,0 +1,204 @@
+"""
+Memoized posteriors of a Bayesian network, keyed on evidence
+
+Over a handful of binary variables there are only a few hundred distinct
+evidence sets, yet every query of the notebook recomputes from scratch.
+CachedInference sits in front of a pgmpy model:
+
+- the key is the sorted query variables and the sorted (variable, state
+  name) evidence pairs; a state given by index is keyed by its name, so
+  {'Logs_Suspects': 'Suspects'} and {'Logs_Suspects': 1} share an entry
+- at most `max_entries` results are kept, evicting the least recently
+  used one
+- warm_up() fills the cache with every evidence configuration (each
+  variable observed in any state or unobserved) in one batched pass
+- every query compares the model's CPD objects with those the network
+  was compiled from, so add_cpds and remove_cpds empty the cache and
+  recompile on the next miss; CPDs edited in place are not seen, so such
+  edits should be followed by invalidate()
+
+Misses are answered by the compiled junction tree. Results are read-only
+arrays shared by every hit.
+
+Usage:
+inference = CachedInference(multiply_connected_security())
+inference.warm_up(['Alerte_Sécurité'])
+inference.query(['Alerte_Sécurité'], {'Logs_Suspects': 'Suspects'})
+print(inference.stats())
+"""
+
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .batch import query_batch
+from .junction_tree import CompiledNetwork, State
+
+Key = Tuple[Tuple[str, ...], Tuple[Tuple[str, State], ...]]
+
+
+class CachedInference:
+    """Size-bounded LRU cache of posterior marginals of a pgmpy model"""
+
+    def __init__(self, model, max_entries: int = 4096):
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        self.model = model
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Key, Dict[str, np.ndarray]]' = OrderedDict()
+        self._network: Optional[CompiledNetwork] = None
+        self._lock = threading.RLock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        self._cpds = tuple(model.get_cpds())
+
+    def _check_model(self):
+        """Invalidate when the model's CPDs are not the ones last seen
+
+        add_cpds and remove_cpds replace or drop CPD objects, so comparing
+        them by identity catches both; holding the old ones keeps their
+        identities from being reused.
+        """
+        cpds = tuple(self.model.get_cpds())
+        if len(cpds) != len(self._cpds) or any(a is not b for a, b in zip(cpds, self._cpds)):
+            self.invalidate()
+            self._cpds = cpds
+
+    @property
+    def network(self) -> CompiledNetwork:
+        with self._lock:
+            self._check_model()
+            if self._network is None:
+                self._network = CompiledNetwork.from_model(self.model)
+            return self._network
+
+    def invalidate(self):
+        """Forget every result and the compiled network"""
+        with self._lock:
+            self._entries.clear()
+            self._network = None
+            self.invalidations += 1
+
+    def key(self, variables: Sequence[str], evidence: Optional[Mapping[str, State]] = None) -> Key:
+        network = self.network
+        unknown = [name for name in variables if name not in network.variables]
+        if unknown:
+            raise ValueError(f"Not variables of the network: {unknown}")
+        observed = []
+        for name, state in (evidence or {}).items():
+            states = network.states[network.variables.index(name)]
+            observed.append((name, states[network.state_index(name, state)]))
+        # State names may mix types; variable names are unique and sort alone
+        return tuple(sorted(variables)), tuple(sorted(observed, key=lambda pair: pair[0]))
+
+    def _store(self, key: Key, posteriors: Dict[str, np.ndarray]):
+        for table in posteriors.values():
+            table.setflags(write=False)
+        self._entries[key] = posteriors
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def query(self, variables: Sequence[str],
+              evidence: Optional[Mapping[str, State]] = None) -> Dict[str, np.ndarray]:
+        """Posterior marginal of each of `variables` given `evidence`"""
+        with self._lock:
+            key = self.key(variables, evidence)
+            posteriors = self._entries.get(key)
+            if posteriors is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return dict(posteriors)
+            self.misses += 1
+            network = self.network
+            posteriors = network.query(dict(key[1]), list(key[0]))
+            self._store(key, posteriors)
+            return dict(posteriors)
+
+    def warm_up(self, variables: Sequence[str], observed: Optional[Sequence[str]] = None) -> int:
+        """Cache `variables` under every configuration of `observed`
+
+        `observed` defaults to every other variable. Returns the number of
+        configurations computed; with more of them than max_entries, only
+        the last ones stay cached.
+        """
+        with self._lock:
+            network = self.network
+            observed = [name for name in network.variables if name not in variables] \
+                if observed is None else list(observed)
+            cards = [network.cards[network.variables.index(name)] for name in observed]
+            # Code -1 leaves the variable unobserved
+            configurations = np.array(list(itertools.product(*(range(-1, card) for card in cards))),
+                                      dtype=float).reshape(-1, len(observed))
+            configurations[configurations < 0] = np.nan
+            result = query_batch(network, pd.DataFrame(configurations, columns=observed), variables,
+                                 deduplicate=False)
+            names = tuple(sorted(variables))
+            states = [network.states[network.variables.index(name)] for name in observed]
+            order = sorted(range(len(observed)), key=lambda i: observed[i])
+            for row, configuration in enumerate(configurations):
+                evidence = tuple((observed[i], states[i][int(configuration[i])]) for i in order
+                                 if not np.isnan(configuration[i]))
+                self._store((names, evidence), {name: table[row].copy()
+                                                for name, table in result.posteriors.items()})
+            return len(configurations)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'invalidations': self.invalidations, 'entries': len(self._entries),
+                    'max_entries': self.max_entries,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+if __name__ == "__main__":
+    import time
+
+    from pgmpy.factors.discrete import TabularCPD
+    from pgmpy.inference import VariableElimination
+
+    from .batch import random_evidence
+    from .models import ACCES, MODELS
+
+    target = 'Alerte_Sécurité'
+    for name, build in MODELS.items():
+        model = build()
+        inference = CachedInference(model)
+        start = time.perf_counter()
+        configurations = inference.warm_up([target])
+        warm_ms = (time.perf_counter() - start) * 1e3
+
+        network = inference.network
+        others = [v for v in network.variables if v != target]
+        events = random_evidence(network, others, 20_000).to_dict('records')
+        evidence_sets = [{k: v for k, v in row.items() if not pd.isna(v)} for row in events]
+        start = time.perf_counter()
+        for evidence in evidence_sets:
+            inference.query([target], evidence)
+        cached_us = (time.perf_counter() - start) / len(evidence_sets) * 1e6
+
+        ve = VariableElimination(model)
+        start = time.perf_counter()
+        for evidence in evidence_sets[:300]:
+            ve.query([target], evidence=evidence or None, show_progress=False)
+        ve_us = (time.perf_counter() - start) / 300 * 1e6
+
+        print(f"{name}: warmed {configurations} configurations in {warm_ms:.1f} ms")
+        print(f"  cached query {cached_us:8.1f} us   VariableElimination {ve_us:8.1f} us")
+        print(f"  {inference.stats()}")
+
+        before = inference.query([target])[target]
+        model.add_cpds(TabularCPD('Accès_Réseau', 2, [[0.5], [0.5]], state_names=ACCES))
+        after = inference.query([target])[target]
+        print(f"  P({target}=Oui) {before[1]:.4f} -> {after[1]:.4f} after add_cpds; "
+              f"{inference.stats()['entries']} entries left")
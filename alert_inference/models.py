@@ -0,0 +1,85 @@
+"""
+The security-alert Bayesian networks of Tp3.ipynb
+
+Both networks are built exactly as the notebook builds them: the polytree
+of étape 2 and the multiply-connected graph of étape 3, with the same
+CPDs and state names.
+"""
+
+from pgmpy.factors.discrete import TabularCPD
+from pgmpy.models import DiscreteBayesianNetwork
+
+ACCES = {'Accès_Réseau': ['Normal', 'Suspect']}
+LOGS = {'Logs_Suspects': ['Normal', 'Suspects']}
+TRAFIC = {'Trafic_Anormal': ['Normal', 'Anormal']}
+ALERTE = {'Alerte_Sécurité': ['Non', 'Oui']}
+ANOMALIE = {'Anomalie_Système': ['Non', 'Oui']}
+TENTATIVE = {'Tentative_Intrusion': ['Non', 'Oui']}
+
+POLYTREE_EDGES = [
+    ('Accès_Réseau', 'Logs_Suspects'),
+    ('Accès_Réseau', 'Trafic_Anormal'),
+    ('Logs_Suspects', 'Alerte_Sécurité'),
+    ('Trafic_Anormal', 'Alerte_Sécurité'),
+]
+
+MULTIPLY_CONNECTED_EDGES = [
+    ('Accès_Réseau', 'Logs_Suspects'),
+    ('Accès_Réseau', 'Trafic_Anormal'),
+    ('Accès_Réseau', 'Anomalie_Système'),
+    ('Accès_Réseau', 'Tentative_Intrusion'),
+    ('Logs_Suspects', 'Tentative_Intrusion'),
+    ('Anomalie_Système', 'Logs_Suspects'),
+    ('Anomalie_Système', 'Trafic_Anormal'),
+    ('Logs_Suspects', 'Alerte_Sécurité'),
+    ('Trafic_Anormal', 'Alerte_Sécurité'),
+    ('Tentative_Intrusion', 'Alerte_Sécurité'),
+]
+
+
+def polytree_security() -> DiscreteBayesianNetwork:
+    """polyarbre_securite"""
+    model = DiscreteBayesianNetwork(POLYTREE_EDGES)
+    model.add_cpds(
+        TabularCPD('Accès_Réseau', 2, [[0.85], [0.15]], state_names=ACCES),
+        TabularCPD('Logs_Suspects', 2, [[0.95, 0.30], [0.05, 0.70]],
+                   evidence=['Accès_Réseau'], evidence_card=[2], state_names={**LOGS, **ACCES}),
+        TabularCPD('Trafic_Anormal', 2, [[0.90, 0.20], [0.10, 0.80]],
+                   evidence=['Accès_Réseau'], evidence_card=[2], state_names={**TRAFIC, **ACCES}),
+        TabularCPD('Alerte_Sécurité', 2, [[0.99, 0.60, 0.70, 0.10], [0.01, 0.40, 0.30, 0.90]],
+                   evidence=['Logs_Suspects', 'Trafic_Anormal'], evidence_card=[2, 2],
+                   state_names={**ALERTE, **LOGS, **TRAFIC}),
+    )
+    return model
+
+
+def multiply_connected_security() -> DiscreteBayesianNetwork:
+    """connexions_multiples"""
+    model = DiscreteBayesianNetwork(MULTIPLY_CONNECTED_EDGES)
+    model.add_cpds(
+        TabularCPD('Accès_Réseau', 2, [[0.85], [0.15]], state_names=ACCES),
+        TabularCPD('Anomalie_Système', 2, [[0.97, 0.40], [0.03, 0.60]],
+                   evidence=['Accès_Réseau'], evidence_card=[2],
+                   state_names={**ANOMALIE, **ACCES}),
+        TabularCPD('Logs_Suspects', 2, [[0.98, 0.60, 0.70, 0.20], [0.02, 0.40, 0.30, 0.80]],
+                   evidence=['Accès_Réseau', 'Anomalie_Système'], evidence_card=[2, 2],
+                   state_names={**LOGS, **ACCES, **ANOMALIE}),
+        TabularCPD('Trafic_Anormal', 2, [[0.95, 0.50, 0.60, 0.15], [0.05, 0.50, 0.40, 0.85]],
+                   evidence=['Accès_Réseau', 'Anomalie_Système'], evidence_card=[2, 2],
+                   state_names={**TRAFIC, **ACCES, **ANOMALIE}),
+        TabularCPD('Tentative_Intrusion', 2, [[0.99, 0.70, 0.60, 0.10], [0.01, 0.30, 0.40, 0.90]],
+                   evidence=['Accès_Réseau', 'Logs_Suspects'], evidence_card=[2, 2],
+                   state_names={**TENTATIVE, **ACCES, **LOGS}),
+        TabularCPD('Alerte_Sécurité', 2,
+                   [[0.999, 0.90, 0.95, 0.70, 0.80, 0.40, 0.60, 0.10],
+                    [0.001, 0.10, 0.05, 0.30, 0.20, 0.60, 0.40, 0.90]],
+                   evidence=['Logs_Suspects', 'Trafic_Anormal', 'Tentative_Intrusion'],
+                   evidence_card=[2, 2, 2], state_names={**ALERTE, **LOGS, **TRAFIC, **TENTATIVE}),
+    )
+    return model
+
+
+MODELS = {
+    'polytree': polytree_security,
+    'multiply_connected': multiply_connected_security,
+}
@@ -0,0 +1,447 @@
+"""
+Approximate inference by sampling, for networks too wide for a junction tree
+
+Exact inference costs grow with the treewidth of the graph. On real alert
+topologies with hundreds of hosts and sensors the cliques get too large,
+so these samplers work on per-variable CPD arrays and never build a
+clique:
+
+- likelihood_weighting: draws every unobserved variable from its CPD in
+  topological order, with a batch of samples per numpy operation, and
+  weighs each sample by the likelihood of the evidence
+- gibbs: a bank of chains, each resampling every unobserved variable from
+  its Markov-blanket conditional; all chains move in the same numpy
+  operations
+
+Both run in rounds until the estimate is good enough or the time budget
+is spent. `accuracy` is the largest standard error allowed on any
+posterior probability, and `time_budget` is in seconds. Every round is
+split across a process pool, which receives the compiled network once.
+The result reports its diagnostics:
+
+- the effective sample size, from the weights (likelihood weighting) or
+  from the autocorrelation of the chains (Gibbs)
+- the standard error of every posterior probability
+- the split-chain potential scale reduction R-hat (Gibbs)
+- whether the accuracy target was reached
+
+Usage:
+network = SamplingNetwork.from_model(multiply_connected_security())
+result = gibbs(network, ['Alerte_Sécurité'], {'Logs_Suspects': 'Suspects'}, accuracy=0.005)
+result.posteriors['Alerte_Sécurité'], result.standard_errors['Alerte_Sécurité'], result.rhat
+python -m alert_inference.sampling    # against the junction tree, then a 300-node graph
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .junction_tree import State
+
+# Chains count as mixed once every R-hat is below this
+RHAT_THRESHOLD = 1.01
+
+
+class SamplingNetwork(NamedTuple):
+    """CPDs of a discrete Bayesian network as (parent configuration, state) tables
+
+    Row `rows(v, samples)` of `tables[v]` is the distribution of variable v
+    given the parent states in `samples`; `order` is topological.
+    """
+    variables: Tuple[str, ...]
+    cards: Tuple[int, ...]
+    states: Tuple[Tuple, ...]
+    parents: Tuple[Tuple[int, ...], ...]
+    strides: Tuple[np.ndarray, ...]
+    children: Tuple[Tuple[int, ...], ...]
+    tables: Tuple[np.ndarray, ...]
+    order: Tuple[int, ...]
+
+    @classmethod
+    def from_model(cls, model) -> 'SamplingNetwork':
+        """Compile a pgmpy DiscreteBayesianNetwork with all its CPDs"""
+        import networkx as nx
+
+        model.check_model()
+        variables = tuple(model.nodes())
+        index = {name: i for i, name in enumerate(variables)}
+        cpds = {cpd.variable: cpd for cpd in model.get_cpds()}
+        cards = tuple(int(cpds[name].cardinality[0]) for name in variables)
+        states = tuple(tuple(cpds[name].state_names[name]) for name in variables)
+
+        parents, strides, tables = [], [], []
+        children: List[List[int]] = [[] for _ in variables]
+        for v, name in enumerate(variables):
+            cpd = cpds[name]
+            family = [index[parent] for parent in cpd.variables[1:]]
+            parent_cards = [cards[p] for p in family]
+            # C order: the last parent varies fastest
+            stride = np.cumprod([1] + parent_cards[:0:-1])[::-1] if family else np.zeros(0)
+            parents.append(tuple(family))
+            strides.append(stride.astype(np.int64))
+            tables.append(np.asarray(cpd.values, dtype=float).reshape(cards[v], -1).T.copy())
+            for p in family:
+                children[p].append(v)
+        order = tuple(index[name] for name in nx.topological_sort(model))
+        return cls(variables, cards, states, tuple(parents), tuple(strides),
+                   tuple(map(tuple, children)), tuple(tables), order)
+
+    def rows(self, v: int, samples: np.ndarray) -> np.ndarray:
+        """Row of tables[v] selected by the parents of v in every sample"""
+        if not self.parents[v]:
+            return np.zeros(len(samples), dtype=np.int64)
+        return samples[:, self.parents[v]] @ self.strides[v]
+
+    def evidence_ids(self, evidence: Optional[Mapping[str, State]]) -> Dict[int, int]:
+        """Variable id -> state index of every observation"""
+        ids = {}
+        for name, state in (evidence or {}).items():
+            v = self.variables.index(name)
+            states = self.states[v]
+            ids[v] = int(state) if state not in states and isinstance(state, (int, np.integer)) \
+                else states.index(state)
+        return ids
+
+
+def _draw(probabilities: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """One state per row of a (rows, states) array of probabilities"""
+    cumulative = np.cumsum(probabilities, axis=1)
+    u = rng.random(len(probabilities)) * cumulative[:, -1]
+    return np.minimum((u[:, None] >= cumulative).sum(axis=1), probabilities.shape[1] - 1)
+
+
+def forward_sample(network: SamplingNetwork, evidence: Mapping[int, int], n: int,
+                   rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """`n` samples with the evidence clamped, and their log-likelihood weights"""
+    samples = np.zeros((n, len(network.variables)), dtype=np.int64)
+    log_weights = np.zeros(n)
+    with np.errstate(divide='ignore'):
+        for v in network.order:
+            table = network.tables[v][network.rows(v, samples)]
+            if v in evidence:
+                samples[:, v] = evidence[v]
+                log_weights += np.log(table[:, evidence[v]])
+            else:
+                samples[:, v] = _draw(table, rng)
+    return samples, log_weights
+
+
+class Tally(NamedTuple):
+    """Weighted state counts of the query variables
+
+    The weights are stored divided by exp(shift) so that they neither
+    overflow nor underflow; merge() brings two tallies to a common shift.
+    """
+    counts: Tuple[np.ndarray, ...]
+    weight: float
+    weight_squares: float
+    shift: float
+    samples: int
+
+    def merge(self, other: 'Tally') -> 'Tally':
+        if other.samples == 0 or not np.isfinite(other.shift):
+            return self._replace(samples=self.samples + other.samples)
+        if self.samples == 0 or not np.isfinite(self.shift):
+            return other._replace(samples=self.samples + other.samples)
+        shift = max(self.shift, other.shift)
+        a, b = np.exp(self.shift - shift), np.exp(other.shift - shift)
+        return Tally(tuple(x * a + y * b for x, y in zip(self.counts, other.counts)),
+                     self.weight * a + other.weight * b,
+                     self.weight_squares * a * a + other.weight_squares * b * b, shift,
+                     self.samples + other.samples)
+
+
+def _weighted_tally(network: SamplingNetwork, evidence: Mapping[int, int], query: Sequence[int],
+                    n: int, seed) -> Tally:
+    samples, log_weights = forward_sample(network, evidence, n, np.random.default_rng(seed))
+    shift = float(log_weights.max())
+    if not np.isfinite(shift):
+        return Tally(tuple(np.zeros(network.cards[v]) for v in query), 0.0, 0.0, shift, n)
+    weights = np.exp(log_weights - shift)
+    counts = tuple(np.bincount(samples[:, v], weights=weights, minlength=network.cards[v])
+                   for v in query)
+    return Tally(counts, float(weights.sum()), float(np.square(weights).sum()), shift, n)
+
+
+def _gibbs_sweeps(network: SamplingNetwork, evidence: Mapping[int, int], query: Sequence[int],
+                  chains: np.ndarray, sweeps: int, record: bool, seed) -> Tuple[np.ndarray, np.ndarray]:
+    """Advance `chains` (chains, variables) by `sweeps` full sweeps
+
+    Returns the new chain states and, when `record`, the query states
+    after every sweep, shaped (sweeps, chains, len(query)).
+    """
+    rng = np.random.default_rng(seed)
+    chains = chains.copy()
+    free = [v for v in network.order if v not in evidence]
+    log_tables = [np.log(table) for table in network.tables] if free else []
+    trace = np.zeros((sweeps if record else 0, len(chains), len(query)), dtype=np.int16)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for sweep in range(sweeps):
+            for v in free:
+                card = network.cards[v]
+                current = chains[:, v]
+                # Rows of v's own CPD and of each child's CPD with v in state 0
+                logp = log_tables[v][network.rows(v, chains)]
+                for c in network.children[v]:
+                    stride = network.strides[c][network.parents[c].index(v)]
+                    base = network.rows(c, chains) - current * stride
+                    rows = base[:, None] + np.arange(card) * stride
+                    logp = logp + log_tables[c][rows, chains[:, c][:, None]]
+                logp -= logp.max(axis=1, keepdims=True)
+                probabilities = np.exp(logp)
+                # Chains stuck on a zero-probability state keep it
+                stuck = ~np.isfinite(probabilities).all(axis=1)
+                probabilities[stuck] = np.eye(card)[current[stuck]]
+                chains[:, v] = _draw(probabilities, rng)
+            if record:
+                trace[sweep] = chains[:, query]
+    return chains, trace
+
+
+def effective_sample_size(x: np.ndarray) -> float:
+    """ESS of draws x shaped (draws, chains), by Geyer's initial positive sequence"""
+    n, m = x.shape
+    if n < 4:
+        return float(n * m)
+    centered = x - x.mean(axis=0)
+    spectrum = np.fft.rfft(centered, n=2 * n, axis=0)
+    autocovariance = np.fft.irfft(spectrum * np.conj(spectrum), axis=0)[:n].mean(axis=1) / n
+    within = x.var(axis=0, ddof=1).mean()
+    pooled = (n - 1) / n * within + x.mean(axis=0).var(ddof=1) * (m > 1)
+    if pooled <= 0:
+        return float(n * m)
+    rho = 1 - (within - autocovariance) / pooled
+    rho[0] = 1.0
+    pairs = rho[:n - n % 2].reshape(-1, 2).sum(axis=1)
+    positive = np.argmax(pairs <= 0) if (pairs <= 0).any() else len(pairs)
+    tau = -1 + 2 * pairs[:positive].sum()
+    return float(n * m / max(tau, 1 / np.log10(max(n * m, 10))))
+
+
+def split_chains(x: np.ndarray) -> np.ndarray:
+    """Draws (draws, chains) as twice the chains of half the length
+
+    Comparing the halves of every chain makes a chain still drifting away
+    from its start show up in R-hat and ESS.
+    """
+    n = len(x) // 2
+    return np.concatenate([x[:n], x[len(x) - n:]], axis=1)
+
+
+def rhat(x: np.ndarray) -> float:
+    """Potential scale reduction of draws x shaped (draws, chains)"""
+    n, m = x.shape
+    within = x.var(axis=0, ddof=1).mean()
+    between = x.mean(axis=0).var(ddof=1)
+    if within <= 0:
+        return 1.0 if between <= 0 else float('inf')
+    return float(np.sqrt(((n - 1) / n * within + between) / within))
+
+
+class SamplingResult(NamedTuple):
+    """Posterior estimates with their convergence diagnostics
+
+    `ess` is the smallest effective sample size over the query states and
+    `rhat` the largest R-hat (always 1 for likelihood weighting).
+    """
+    posteriors: Dict[str, np.ndarray]
+    standard_errors: Dict[str, np.ndarray]
+    samples: int
+    ess: float
+    rhat: float
+    converged: bool
+    rounds: int
+    seconds: float
+
+
+_worker_network: Optional[SamplingNetwork] = None
+
+
+def _init_worker(network: SamplingNetwork):
+    global _worker_network
+    _worker_network = network
+
+
+def _worker_tally(args) -> Tally:
+    return _weighted_tally(_worker_network, *args)
+
+
+def _worker_sweeps(args) -> Tuple[np.ndarray, np.ndarray]:
+    return _gibbs_sweeps(_worker_network, *args)
+
+
+class _Workers:
+    """Runs one job per worker, in a process pool when there are several"""
+
+    def __init__(self, network: SamplingNetwork, workers: Optional[int]):
+        self.count = workers or os.cpu_count() or 1
+        self.network = network
+        self.pool = ProcessPoolExecutor(self.count, initializer=_init_worker,
+                                        initargs=(network,)) if self.count > 1 else None
+
+    def map(self, function, local, jobs) -> list:
+        if self.pool is None:
+            return [local(self.network, *job) for job in jobs]
+        return list(self.pool.map(function, jobs))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+def likelihood_weighting(network: SamplingNetwork, variables: Sequence[str],
+                         evidence: Optional[Mapping[str, State]] = None, accuracy: float = 0.01,
+                         time_budget: float = 10.0, batch: int = 100_000,
+                         workers: Optional[int] = None, seed: int = 0) -> SamplingResult:
+    """Posterior marginals of `variables` by likelihood weighting
+
+    Every round draws `batch` samples per worker. The standard error of a
+    probability p is sqrt(p (1 - p) / ESS), with ESS = (sum w)^2 / sum w^2.
+    """
+    start = time.perf_counter()
+    observed = network.evidence_ids(evidence)
+    query = [network.variables.index(name) for name in variables]
+    seeds = np.random.SeedSequence(seed)
+    pool = _Workers(network, workers)
+    tally = Tally(tuple(np.zeros(network.cards[v]) for v in query), 0.0, 0.0, -np.inf, 0)
+    rounds = 0
+    try:
+        while True:
+            jobs = [(observed, query, batch, s) for s in seeds.spawn(pool.count)]
+            for part in pool.map(_worker_tally, _weighted_tally, jobs):
+                tally = tally.merge(part)
+            rounds += 1
+            ess = tally.weight ** 2 / tally.weight_squares if tally.weight_squares else 0.0
+            with np.errstate(invalid='ignore', divide='ignore'):
+                posteriors = [counts / tally.weight for counts in tally.counts]
+                errors = [np.sqrt(p * (1 - p) / ess) for p in posteriors]
+            worst = max(float(np.max(e)) for e in errors) if ess else np.inf
+            if worst <= accuracy or time.perf_counter() - start >= time_budget:
+                break
+    finally:
+        pool.close()
+    return SamplingResult(dict(zip(variables, posteriors)), dict(zip(variables, errors)),
+                          tally.samples, ess, 1.0, bool(worst <= accuracy), rounds,
+                          time.perf_counter() - start)
+
+
+def gibbs(network: SamplingNetwork, variables: Sequence[str],
+          evidence: Optional[Mapping[str, State]] = None, accuracy: float = 0.01,
+          time_budget: float = 10.0, chains: int = 64, sweeps: int = 200, burn_in: int = 200,
+          workers: Optional[int] = None, seed: int = 0) -> SamplingResult:
+    """Posterior marginals of `variables` by Gibbs sampling
+
+    `chains` chains, split across the workers, start from forward samples
+    with the evidence clamped. The first `burn_in` sweeps are discarded.
+    Every later round runs `sweeps` more. A standard error is the larger
+    of the ESS-based one and the spread of the chain means over
+    sqrt(chains). The estimate counts as converged once every standard
+    error is within `accuracy`, no probability moved by more than
+    `accuracy` over the last round, and every R-hat is below
+    RHAT_THRESHOLD. So at least two rounds are run, and at least two
+    chains, since R-hat and the spread of the means compare chains.
+    """
+    if chains < 2:
+        raise ValueError(f"Gibbs sampling needs at least 2 chains, got {chains}")
+    start = time.perf_counter()
+    observed = network.evidence_ids(evidence)
+    query = [network.variables.index(name) for name in variables]
+    seeds = np.random.SeedSequence(seed)
+    pool = _Workers(network, workers)
+    initial, _ = forward_sample(network, observed, chains, np.random.default_rng(seeds.spawn(1)[0]))
+    banks = np.array_split(initial, pool.count)
+    traces: List[np.ndarray] = []
+    rounds = 0
+    previous = None
+    try:
+        jobs = [(observed, query, bank, burn_in, False, s) for bank, s in zip(banks, seeds.spawn(pool.count))]
+        banks = [bank for bank, _ in pool.map(_worker_sweeps, _gibbs_sweeps, jobs)]
+        while True:
+            jobs = [(observed, query, bank, sweeps, True, s) for bank, s in zip(banks, seeds.spawn(pool.count))]
+            results = pool.map(_worker_sweeps, _gibbs_sweeps, jobs)
+            banks = [bank for bank, _ in results]
+            traces.append(np.concatenate([trace for _, trace in results], axis=1))
+            rounds += 1
+
+            trace = np.concatenate(traces)
+            posteriors, errors, sizes, reductions = [], [], [], []
+            for q, v in enumerate(query):
+                indicators = trace[:, :, q, None] == np.arange(network.cards[v])
+                p = indicators.mean(axis=(0, 1))
+                halves = [split_chains(indicators[:, :, s].astype(float)) for s in range(network.cards[v])]
+                ess = [effective_sample_size(x) for x in halves]
+                # The spread of the chain means bounds the error independently of the ESS estimate
+                between = indicators.mean(axis=0).std(axis=0, ddof=1) / np.sqrt(indicators.shape[1])
+                posteriors.append(p)
+                errors.append(np.maximum(np.sqrt(p * (1 - p) / np.array(ess)), between))
+                sizes += ess
+                reductions += [rhat(x) for x in halves]
+            worst = max(float(np.max(e)) for e in errors)
+            drift = np.inf if previous is None else max(float(np.abs(p - q).max())
+                                                        for p, q in zip(posteriors, previous))
+            previous = posteriors
+            converged = (worst <= accuracy and drift <= accuracy
+                         and max(reductions) < RHAT_THRESHOLD)
+            if converged or time.perf_counter() - start >= time_budget:
+                break
+    finally:
+        pool.close()
+    return SamplingResult(dict(zip(variables, posteriors)), dict(zip(variables, errors)),
+                          int(trace.shape[0] * trace.shape[1]), min(sizes), max(reductions),
+                          converged, rounds, time.perf_counter() - start)
+
+
+def random_network(nodes: int = 300, max_parents: int = 3, window: int = 30, seed: int = 0):
+    """Random binary pgmpy network; each node's parents are among the `window` before it"""
+    from pgmpy.factors.discrete import TabularCPD
+    from pgmpy.models import DiscreteBayesianNetwork
+
+    rng = np.random.default_rng(seed)
+    names = [f"X{i:03d}" for i in range(nodes)]
+    model = DiscreteBayesianNetwork()
+    model.add_nodes_from(names)
+    cpds = []
+    for i, name in enumerate(names):
+        candidates = range(max(0, i - window), i)
+        family = sorted(rng.choice(candidates, size=min(len(candidates), rng.integers(0, max_parents + 1)),
+                                   replace=False)) if i else []
+        model.add_edges_from((names[p], name) for p in family)
+        columns = rng.dirichlet([0.7, 0.7], size=2 ** len(family)).T
+        cpds.append(TabularCPD(name, 2, columns, evidence=[names[p] for p in family] or None,
+                               evidence_card=[2] * len(family) or None))
+    model.add_cpds(*cpds)
+    return model
+
+
+if __name__ == "__main__":
+    from .junction_tree import CompiledNetwork
+    from .models import multiply_connected_security
+
+    target = 'Alerte_Sécurité'
+    evidence = {'Logs_Suspects': 'Suspects', 'Anomalie_Système': 'Non'}
+    model = multiply_connected_security()
+    network = SamplingNetwork.from_model(model)
+    exact = CompiledNetwork.from_model(model).query(evidence, [target])[target]
+    print(f"multiply_connected, P({target} | {evidence})")
+    print(f"  exact                {exact}")
+    for name, method in (('likelihood weighting', likelihood_weighting), ('gibbs', gibbs)):
+        result = method(network, [target], evidence, accuracy=0.002)
+        print(f"  {name:<20} {result.posteriors[target]}  |error| "
+              f"{np.abs(result.posteriors[target] - exact).max():.4f}  "
+              f"se {result.standard_errors[target].max():.4f}  ess {result.ess:9.0f}  "
+              f"rhat {result.rhat:.3f}  {result.samples} samples  {result.seconds:.2f} s")
+
+    model = random_network()
+    network = SamplingNetwork.from_model(model)
+    query = [network.variables[-1], network.variables[len(network.variables) // 2]]
+    evidence = {network.variables[-2]: 1, network.variables[-10]: 0}
+    print(f"random_network, {len(network.variables)} nodes, P({query} | {evidence})")
+    for name, method in (('likelihood weighting', likelihood_weighting), ('gibbs', gibbs)):
+        result = method(network, query, evidence, accuracy=0.005, time_budget=30.0)
+        print(f"  {name:<20} " + "  ".join(f"{result.posteriors[v][1]:.4f}±{result.standard_errors[v][1]:.4f}"
+                                           for v in query)
+              + f"  ess {result.ess:9.0f}  rhat {result.rhat:.3f}  converged {result.converged}  "
+                f"{result.samples} samples  {result.seconds:.2f} s")
@@ -0,0 +1,8 @@
+import pytest
+
+from alert_inference import MODELS
+
+
+@pytest.fixture(params=sorted(MODELS))
+def model(request):
+    return MODELS[request.param]()
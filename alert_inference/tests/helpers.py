@@ -0,0 +1,14 @@
+"""
+Evidence enumeration shared by the inference tests
+"""
+
+import itertools
+
+TARGET = 'Alerte_Sécurité'
+
+
+def evidence_sets(network, observed):
+    """Every configuration of `observed`, each variable possibly unobserved"""
+    for states in itertools.product(*([None] + list(network.states[network.variables.index(name)])
+                                      for name in observed)):
+        yield {name: state for name, state in zip(observed, states) if state is not None}
@@ -0,0 +1,58 @@
+"""
+Batched evidence queries against one-by-one junction-tree queries
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from alert_inference import CompiledNetwork, query_batch
+from alert_inference.batch import codes_for_states, random_evidence, state_codes
+
+from .helpers import TARGET
+
+
+@pytest.mark.parametrize('deduplicate', [True, False])
+def test_query_batch_matches_query(model, deduplicate):
+    network = CompiledNetwork.from_model(model)
+    columns = [name for name in network.variables if name != TARGET]
+    events = random_evidence(network, columns, 500, seed=3)
+    result = query_batch(network, events, [TARGET], deduplicate=deduplicate, chunk=16)
+    for row, record in enumerate(events.to_dict('records')):
+        evidence = {k: v for k, v in record.items() if not pd.isna(v)}
+        assert np.allclose(result.posteriors[TARGET][row], network.query(evidence, [TARGET])[TARGET])
+
+
+def test_query_batch_state_indices_and_missing_values(model):
+    network = CompiledNetwork.from_model(model)
+    names = pd.DataFrame({'Logs_Suspects': ['Suspects', None, np.nan, 'Normal']})
+    indices = pd.DataFrame({'Logs_Suspects': [1, np.nan, None, 0]})
+    assert np.array_equal(query_batch(network, names, [TARGET]).posteriors[TARGET],
+                          query_batch(network, indices, [TARGET]).posteriors[TARGET])
+    with pytest.raises(ValueError, match='Unknown state'):
+        query_batch(network, pd.DataFrame({'Logs_Suspects': ['Maybe']}), [TARGET])
+
+
+def test_state_codes(model):
+    network = CompiledNetwork.from_model(model)
+    codes = state_codes(network, 'Logs_Suspects', pd.Series(['Normal', None, 'Suspects']))
+    assert codes.tolist() == [0, -1, 1]
+
+
+def test_query_batch_empty_frame(model):
+    # Regression: an empty DataFrame crashed instead of giving (0, card) arrays
+    network = CompiledNetwork.from_model(model)
+    result = query_batch(network, pd.DataFrame({'Logs_Suspects': []}), [TARGET])
+    assert result.posteriors[TARGET].shape == (0, 2)
+    assert result.log_evidence.shape == (0,)
+    assert result.frame(network).empty
+    assert query_batch(network, pd.DataFrame(), None).posteriors[TARGET].shape == (0, 2)
+
+
+def test_codes_for_states():
+    states = ('Normal', 'Suspects')
+    codes = codes_for_states(states, pd.Series(['Suspects', None, 'Normal']), 'Logs_Suspects')
+    assert codes.tolist() == [1, -1, 0]
+    assert codes_for_states(states, [1.0, np.nan], 'Logs_Suspects').tolist() == [1, -1]
+    with pytest.raises(ValueError, match="Unknown state .*2.0.* of Logs_Suspects"):
+        codes_for_states(states, [2.0], 'Logs_Suspects')
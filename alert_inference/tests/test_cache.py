@@ -0,0 +1,64 @@
+"""
+Cached posteriors against uncached junction-tree queries
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+from pgmpy.factors.discrete import TabularCPD
+
+from alert_inference import CachedInference
+from alert_inference.models import ACCES
+
+from .helpers import TARGET, evidence_sets
+
+
+def test_cached_inference_matches_query(model):
+    inference = CachedInference(model)
+    network = inference.network
+    inference.warm_up([TARGET])
+    observed = [name for name in network.variables if name != TARGET]
+    for evidence in itertools.islice(evidence_sets(network, observed), 0, None, 7):
+        assert np.allclose(inference.query([TARGET], evidence)[TARGET],
+                           network.query(evidence, [TARGET])[TARGET])
+    assert inference.stats()['misses'] == 0
+
+
+def test_hits_and_lru_eviction(model):
+    inference = CachedInference(model, max_entries=2)
+    first = inference.query([TARGET], {'Logs_Suspects': 'Suspects'})
+    assert inference.query([TARGET], {'Logs_Suspects': 'Suspects'})[TARGET] is first[TARGET]
+    with pytest.raises(ValueError):
+        first[TARGET][0] = 1.0
+    inference.query([TARGET], {'Logs_Suspects': 'Normal'})
+    inference.query([TARGET], {'Logs_Suspects': 'Suspects'})
+    inference.query([TARGET])
+    stats = inference.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['entries']) == (2, 3, 1, 2)
+    assert inference.key([TARGET], {'Logs_Suspects': 'Suspects'}) in inference._entries
+
+
+def test_changing_the_model_invalidates(model):
+    inference = CachedInference(model)
+    before = inference.query([TARGET])[TARGET]
+    model.add_cpds(TabularCPD('Accès_Réseau', 2, [[0.5], [0.5]], state_names=ACCES))
+    after = inference.query([TARGET])[TARGET]
+    assert after[1] > before[1]
+    assert inference.stats()['invalidations'] == 1
+
+
+def test_keys_hold_state_names(model):
+    inference = CachedInference(model)
+    expected = ((TARGET,), (('Logs_Suspects', 'Suspects'),))
+    assert inference.key([TARGET], {'Logs_Suspects': 'Suspects'}) == expected
+    assert inference.key([TARGET], {'Logs_Suspects': 1}) == expected
+    inference.warm_up([TARGET], ['Logs_Suspects'])
+    assert expected in inference._entries
+    with pytest.raises(ValueError, match='Not variables'):
+        inference.key(['Pare_Feu'])
+
+
+def test_model_methods_are_left_alone(model):
+    CachedInference(model)
+    assert 'add_cpds' not in vars(model) and 'remove_cpds' not in vars(model)
@@ -0,0 +1,95 @@
+"""
+CPDLearner against pgmpy's BayesianEstimator, and its saved counts
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from pgmpy.estimators import BayesianEstimator, MaximumLikelihoodEstimator
+
+from alert_inference import CPDLearner
+from alert_inference.learning import _max_difference, simulate_events
+from alert_inference.models import multiply_connected_security, polytree_security
+
+
+@pytest.fixture(scope='module')
+def events():
+    return simulate_events(multiply_connected_security(), 20_000, seed=1)
+
+
+def state_names(learner):
+    # pgmpy would otherwise sort the states of every variable
+    return dict(zip(learner.variables, map(list, learner.states)))
+
+
+@pytest.mark.parametrize('prior, options', [('BDeu', {'equivalent_sample_size': 10}), ('K2', {})])
+def test_matches_bayesian_estimator(events, prior, options):
+    learner = CPDLearner(multiply_connected_security(), prior=prior, **options)
+    learner.update_chunks(events[i:i + 3000] for i in range(0, len(events), 3000))
+    estimator = BayesianEstimator(multiply_connected_security(), events, state_names=state_names(learner))
+    reference = [estimator.estimate_cpd(name, prior_type=prior, **options) for name in learner.variables]
+    assert _max_difference(learner, reference) < 1e-12
+
+
+def test_maximum_likelihood(events):
+    learner = CPDLearner(multiply_connected_security(), prior=None)
+    learner.update(events)
+    reference = MaximumLikelihoodEstimator(multiply_connected_security(), events, state_names=state_names(learner))
+    assert _max_difference(learner, [reference.estimate_cpd(name) for name in learner.variables]) < 1e-12
+
+
+def test_count_column_weighs_rows(events):
+    columns = list(events.columns)
+    counted = events.value_counts().rename('n').reset_index()
+    plain, weighted = (CPDLearner(multiply_connected_security()) for _ in range(2))
+    plain.update(events)
+    weighted.update(counted[columns + ['n']], count_column='n')
+    for a, b in zip(plain.counts, weighted.counts):
+        assert np.allclose(a, b)
+
+
+def test_missing_entries_skip_only_their_families():
+    model = polytree_security()
+    events = simulate_events(model, 5000, missing=0.2, seed=2)
+    learner = CPDLearner(model, prior=None)
+    learner.update(events)
+    for v, name in enumerate(learner.variables):
+        family = [name] + [learner.variables[p] for p in learner.parents[v]]
+        assert learner.counts[v].sum() == events[family].notna().all(axis=1).sum()
+
+
+def test_load_keeps_the_saved_prior(events, tmp_path):
+    # Regression: load() rebuilt a 'cpds' prior from CPDs that apply() had
+    # already replaced with the learned ones
+    model = multiply_connected_security()
+    learner = CPDLearner(model, prior='cpds', equivalent_sample_size=100)
+    learner.update(events)
+    learner.apply()
+    path = str(tmp_path / 'counts.npz')
+    learner.save(path)
+    loaded = CPDLearner.load(path, model, prior='cpds', equivalent_sample_size=100)
+    assert loaded.rows == learner.rows
+    for v in range(len(learner.variables)):
+        assert np.array_equal(loaded.priors[v], learner.priors[v])
+        assert np.array_equal(loaded.probabilities(v), learner.probabilities(v))
+
+
+def test_load_rejects_another_network(events, tmp_path):
+    learner = CPDLearner(multiply_connected_security())
+    learner.update(events)
+    path = str(tmp_path / 'counts.npz')
+    learner.save(path)
+    with pytest.raises(ValueError, match='different network'):
+        CPDLearner.load(path, polytree_security())
+
+
+def test_csv_chunks_match_one_update(events, tmp_path):
+    path = tmp_path / 'events.csv'
+    frame = events.assign(extra=1)
+    frame.loc[::7, 'Logs_Suspects'] = None
+    frame.to_csv(path, index=False)
+    chunked, whole = (CPDLearner(multiply_connected_security()) for _ in range(2))
+    chunked.update_file(str(path), chunk_rows=999)
+    whole.update(pd.read_csv(path))
+    for a, b in zip(chunked.counts, whole.counts):
+        assert np.allclose(a, b)
@@ -0,0 +1,54 @@
+"""
+Samplers against the exact posterior of the junction tree
+"""
+
+import numpy as np
+import pytest
+
+from alert_inference import CompiledNetwork, SamplingNetwork, gibbs, likelihood_weighting
+from alert_inference.models import multiply_connected_security
+from alert_inference.sampling import random_network
+
+from .helpers import TARGET
+
+EVIDENCE = {'Logs_Suspects': 'Suspects', 'Anomalie_Système': 'Non'}
+
+
+@pytest.fixture(scope='module')
+def security():
+    model = multiply_connected_security()
+    exact = CompiledNetwork.from_model(model).query(EVIDENCE, [TARGET])[TARGET]
+    return SamplingNetwork.from_model(model), exact
+
+
+@pytest.mark.parametrize('method', [likelihood_weighting, gibbs])
+def test_estimate_within_standard_errors(security, method):
+    network, exact = security
+    result = method(network, [TARGET], EVIDENCE, accuracy=0.005, workers=1, seed=4)
+    assert result.converged
+    assert result.posteriors[TARGET].sum() == pytest.approx(1.0)
+    assert np.all(np.abs(result.posteriors[TARGET] - exact) <= 4 * result.standard_errors[TARGET])
+
+
+def test_gibbs_needs_agreeing_rounds():
+    # Regression: one short round with an optimistic ESS counted as
+    # converged, about 3 standard errors away from the exact posterior
+    from pgmpy.inference import VariableElimination
+
+    model = random_network(nodes=120, seed=1)
+    network = SamplingNetwork.from_model(model)
+    query = [network.variables[-1], network.variables[60]]
+    evidence = {network.variables[-2]: 1, network.variables[-10]: 0}
+    inference = VariableElimination(model)
+    result = gibbs(network, query, evidence, accuracy=0.005, time_budget=60.0, workers=1, seed=0)
+    assert result.converged and result.rounds >= 2
+    for name in query:
+        exact = inference.query([name], evidence=evidence, show_progress=False).values
+        assert np.all(np.abs(result.posteriors[name] - exact) <= 4 * result.standard_errors[name])
+
+
+def test_gibbs_needs_two_chains(security):
+    # Regression: one chain gave NaN R-hat and standard errors
+    network, _ = security
+    with pytest.raises(ValueError, match='at least 2 chains'):
+        gibbs(network, [TARGET], EVIDENCE, chains=1, workers=1)
@@ -0,0 +1,34 @@
+"""
+Headless Dempster-Shafer engine used by the Tp1 GUI.
+
+Nothing in this package imports tkinter, so it can be used from scripts,
+workers and batch jobs.
+"""
+
+from .approximation import STRATEGIES, Approximation, Approximator, mass_distance
+from .batch import batch_dempster_combination, conjunctive_combination, from_dense, to_dense
+from .decision import (
+    DECISION_RULES, Decision, DecisionPolicy, SingletonMeasures, pignistic_dense, singleton_measures,
+)
+from .fusion import FusionResult, LevelReport, fuse_all, fuse_sequential
+from .mass import MAX_FRAME_SIZE, MassFunction, dempster_combination
+from .rules import RULES, PairwiseKernel, combine, register_rule
+from .sparse import FocalIndex, SparseMassFunction, set_bits
+from .streaming import StreamingFuser
+from .transforms import (
+    belief, commonality, commonality_combination, mobius_subset, mobius_superset,
+    plausibility, zeta_subset, zeta_superset,
+)
+
+__all__ = [
+    'MAX_FRAME_SIZE', 'MassFunction', 'dempster_combination',
+    'STRATEGIES', 'Approximation', 'Approximator', 'mass_distance',
+    'DECISION_RULES', 'Decision', 'DecisionPolicy', 'SingletonMeasures', 'pignistic_dense',
+    'singleton_measures',
+    'FusionResult', 'LevelReport', 'fuse_all', 'fuse_sequential', 'StreamingFuser',
+    'RULES', 'PairwiseKernel', 'combine', 'register_rule',
+    'FocalIndex', 'SparseMassFunction', 'set_bits',
+    'batch_dempster_combination', 'conjunctive_combination', 'from_dense', 'to_dense',
+    'belief', 'commonality', 'commonality_combination', 'mobius_subset', 'mobius_superset',
+    'plausibility', 'zeta_subset', 'zeta_superset',
+]
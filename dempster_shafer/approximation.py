@@ -0,0 +1,152 @@
+"""
+Focal-set approximation to bound combination cost
+
+Repeated combination lets the number of focal elements grow toward 2**|Θ|.
+Each strategy below returns a mass function with at most `max_focal` focal
+elements together with the error it introduced, measured as the mass that
+was moved: ½ Σ |m(A) - m'(A)| over all subsets A.
+"""
+
+import heapq
+from typing import Callable, Dict, List, NamedTuple, Union
+
+from .mass import MassFunction
+from .sparse import SparseMassFunction
+
+AnyMass = Union[MassFunction, SparseMassFunction]
+
+
+class Approximation(NamedTuple):
+    """Approximated mass function and the error introduced"""
+    mass: AnyMass
+    error: float
+
+
+def mass_distance(m1: AnyMass, m2: AnyMass) -> float:
+    """½ Σ |m1(A) - m2(A)|, the amount of mass moved between m1 and m2"""
+    diff = dict(zip(m1.masks, m1.masses))
+    for mask, mass in zip(m2.masks, m2.masses):
+        diff[mask] = diff.get(mask, 0.0) - mass
+    return 0.5 * sum(abs(v) for v in diff.values())
+
+
+def _by_mass(m: AnyMass) -> List[int]:
+    """Focal indices sorted by decreasing mass"""
+    return sorted(range(len(m)), key=lambda i: -m.masses[i])
+
+
+def _approximation(original: AnyMass, focal: Dict[int, float]) -> Approximation:
+    approx = type(original)(original.frame, focal.keys(), focal.values())
+    return Approximation(approx, mass_distance(original, approx))
+
+
+def summarize(m: AnyMass, max_focal: int) -> Approximation:
+    """Keep the max_focal - 1 heaviest focal sets, move the rest to their union"""
+    if len(m) <= max_focal:
+        return Approximation(m, 0.0)
+    order = _by_mass(m)
+    focal = {}
+    for i in order[:max_focal - 1]:
+        focal[m.masks[i]] = m.masses[i]
+    union, rest = 0, 0.0
+    for i in order[max_focal - 1:]:
+        union |= m.masks[i]
+        rest += m.masses[i]
+    focal[union] = focal.get(union, 0.0) + rest
+    return _approximation(m, focal)
+
+
+def klx(m: AnyMass, max_focal: int, k: int = 1, x: float = 0.1) -> Approximation:
+    """Tessem's k-l-x: keep at least k and at most l = max_focal focal sets
+
+    The lightest focal sets are dropped while their total mass stays within
+    x, then the remaining masses are renormalized. The l bound is strict:
+    focal sets beyond it are dropped even if that exceeds x, so k may not
+    exceed it.
+    """
+    if k > max_focal:
+        raise ValueError(f"k = {k} exceeds max_focal = {max_focal}")
+    order = _by_mass(m)
+    keep = len(order)
+    dropped = 0.0
+    while keep > max(k, 1) and (keep > max_focal or dropped + m.masses[order[keep - 1]] <= x):
+        keep -= 1
+        dropped += m.masses[order[keep]]
+    if keep == len(order):
+        return Approximation(m, 0.0)
+
+    kept = sum(m.masses[i] for i in order[:keep])
+    scale = (kept + dropped) / kept if kept > 0 else 1.0
+    return _approximation(m, {m.masks[i]: m.masses[i] * scale for i in order[:keep]})
+
+
+def prune_threshold(m: AnyMass, max_focal: int, threshold: float = 0.01) -> Approximation:
+    """Move focal sets lighter than `threshold` to Θ, then summarize if still over budget"""
+    focal = {}
+    ignorance = 0.0
+    for mask, mass in zip(m.masks, m.masses):
+        if mass < threshold:
+            ignorance += mass
+        else:
+            focal[mask] = mass
+    if ignorance:
+        focal[m.theta] = focal.get(m.theta, 0.0) + ignorance
+    pruned = type(m)(m.frame, focal.keys(), focal.values())
+    if len(pruned) > max_focal:
+        pruned = summarize(pruned, max_focal).mass
+    return Approximation(pruned, mass_distance(m, pruned))
+
+
+def merge_smallest(m: AnyMass, max_focal: int) -> Approximation:
+    """Repeatedly merge the two lightest focal sets into their union"""
+    if len(m) <= max_focal:
+        return Approximation(m, 0.0)
+    focal = dict(zip(m.masks, m.masses))
+    heap = [(mass, mask) for mask, mass in focal.items()]
+    heapq.heapify(heap)
+    while len(focal) > max_focal:
+        mass1, mask1 = heapq.heappop(heap)
+        if focal.get(mask1) != mass1:
+            continue  # Stale entry, this focal set was merged into since
+        mass2, mask2 = heapq.heappop(heap)
+        while focal.get(mask2) != mass2:
+            mass2, mask2 = heapq.heappop(heap)
+        del focal[mask1], focal[mask2]
+        union = mask1 | mask2
+        focal[union] = focal.get(union, 0.0) + mass1 + mass2
+        heapq.heappush(heap, (focal[union], union))
+    return _approximation(m, focal)
+
+
+STRATEGIES: Dict[str, Callable[..., Approximation]] = {
+    'summarize': summarize,
+    'klx': klx,
+    'threshold': prune_threshold,
+    'merge': merge_smallest,
+}
+
+
+class Approximator:
+    """Configured approximation strategy with a strict max-focal budget
+
+    Instances are picklable, so they can be shipped to the fuse_all pool.
+    """
+
+    def __init__(self, strategy: str = 'summarize', max_focal: int = 32, **options):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown approximation strategy '{strategy}', "
+                             f"expected one of {sorted(STRATEGIES)}")
+        if max_focal < 1:
+            raise ValueError("max_focal must be at least 1")
+        if strategy == 'klx' and options.get('k', 1) > max_focal:
+            raise ValueError(f"k = {options['k']} exceeds max_focal = {max_focal}")
+        self.strategy = strategy
+        self.max_focal = max_focal
+        self.options = options
+
+    def __call__(self, m: AnyMass) -> Approximation:
+        return STRATEGIES[self.strategy](m, self.max_focal, **self.options)
+
+    def __repr__(self) -> str:
+        options = ''.join(f", {k}={v!r}" for k, v in self.options.items())
+        return f"Approximator({self.strategy!r}, max_focal={self.max_focal}{options})"
@@ -0,0 +1,175 @@
+"""
+Benchmarks for the Dempster-Shafer engine
+
+Run with:
+python -m dempster_shafer.benchmark
+python -m dempster_shafer bench
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .batch import batch_dempster_combination, to_dense
+from .decision import singleton_measures
+from .fusion import fuse_all, fuse_sequential
+from .mass import MassFunction, dempster_combination
+from .rules import RULES, combine
+
+
+def random_focal_sets(rng: random.Random, frame_size: int, focal_count: int) -> List[int]:
+    """Up to `focal_count` distinct non-empty focal bitmasks"""
+    theta = (1 << frame_size) - 1
+    return sorted({rng.randint(1, theta) for _ in range(focal_count)})
+
+
+def random_mass_function(rng: random.Random, frame_size: int, focal_count: int,
+                         masks: Optional[List[int]] = None) -> MassFunction:
+    """Random mass function, on `masks` if given, else on random focal sets"""
+    frame = [f"h{i}" for i in range(frame_size)]
+    if masks is None:
+        masks = random_focal_sets(rng, frame_size, focal_count)
+    weights = [rng.random() for _ in masks]
+    total = sum(weights)
+    return MassFunction(frame, masks, [w / total for w in weights])
+
+
+def bench_batch(n_tracks: int = 500, frame_size: int = 4, focal_count: int = 4,
+                repeat: int = 5, shared_focal: bool = True, seed: int = 0) -> Dict[str, float]:
+    """Compare the per-pair loop with batch_dempster_combination
+
+    With `shared_focal`, every track of a sensor uses the same focal sets
+    (a fixed sensor model with varying masses); otherwise each track draws
+    its own focal sets.
+    """
+    rng = random.Random(seed)
+    sensors = []
+    for _ in range(2):
+        masks = random_focal_sets(rng, frame_size, focal_count) if shared_focal else None
+        sensors.append([random_mass_function(rng, frame_size, focal_count, masks)
+                        for _ in range(n_tracks)])
+    m1, m2 = sensors
+    dense1, dense2 = to_dense(m1), to_dense(m2)
+
+    loop_times, batch_times, commonality_times = [], [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for a, b in zip(m1, m2):
+            dempster_combination(a, b)
+        loop_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        batch_dempster_combination(dense1, dense2)
+        batch_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        batch_dempster_combination(dense1, dense2, method='commonality')
+        commonality_times.append(time.perf_counter() - start)
+
+    loop, batch = min(loop_times), min(batch_times)
+    return {
+        'n_tracks': n_tracks,
+        'frame_size': frame_size,
+        'shared_focal': shared_focal,
+        'loop_s': loop,
+        'batch_s': batch,
+        'commonality_s': min(commonality_times),
+        'speedup': loop / batch,
+    }
+
+
+def bench_rules(frame_size: int = 8, focal_count: int = 32, n_pairs: int = 200,
+                repeat: int = 5, seed: int = 0) -> Dict[str, float]:
+    """Mean seconds per combination for every registered rule
+
+    The pure-Python MassFunction.combine loop is included as 'loop'.
+    """
+    rng = random.Random(seed)
+    pairs = [(random_mass_function(rng, frame_size, focal_count),
+              random_mass_function(rng, frame_size, focal_count)) for _ in range(n_pairs)]
+
+    timings = {}
+    candidates = [('loop', lambda a, b: dempster_combination(a, b))]
+    candidates += [(name, lambda a, b, name=name: combine(a, b, name)) for name in RULES]
+    for name, func in candidates:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for a, b in pairs:
+                func(a, b)
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best / n_pairs
+    return timings
+
+
+def bench_suite(frame_sizes: Sequence[int] = (4, 8, 16, 32),
+                focal_counts: Sequence[int] = (4, 16, 64), n_sources: int = 3,
+                n_problems: int = 200, rule: str = 'dempster',
+                seed: int = 0) -> List[Dict[str, float]]:
+    """End-to-end fusion latency over a grid of frame sizes and focal counts
+
+    Each problem fuses `n_sources` random mass functions and computes the
+    singleton Bel/Pl/BetP, as the CLI does. Every configuration draws its
+    problems from its own seeded generator, so rows are reproducible and
+    independent of which other configurations are run.
+    """
+    rows = []
+    for frame_size in frame_sizes:
+        for focal_count in focal_counts:
+            rng = random.Random(f"{seed}:{frame_size}:{focal_count}")
+            problems = [[random_mass_function(rng, frame_size, focal_count)
+                         for _ in range(n_sources)] for _ in range(n_problems)]
+
+            latencies = np.empty(n_problems)
+            for i, sources in enumerate(problems):
+                start = time.perf_counter()
+                if rule == 'dempster':
+                    fused = fuse_all(sources, parallel=False).mass
+                else:
+                    fused = fuse_sequential(sources, rule).mass
+                singleton_measures(fused)
+                latencies[i] = time.perf_counter() - start
+
+            rows.append({
+                'frame_size': frame_size,
+                'focal_count': focal_count,
+                'n_sources': n_sources,
+                'rule': rule,
+                'throughput': n_problems / latencies.sum(),
+                'p50_ms': float(np.percentile(latencies, 50)) * 1e3,
+                'p99_ms': float(np.percentile(latencies, 99)) * 1e3,
+            })
+    return rows
+
+
+def _print_rows(rows: List[Dict[str, float]]):
+    for row in rows:
+        focal = 'shared' if row['shared_focal'] else 'random'
+        print(f"N={row['n_tracks']:<6} |Θ|={row['frame_size']:<3} focal={focal:<7}"
+              f"loop={row['loop_s']*1e3:9.3f} ms  batch={row['batch_s']*1e3:9.3f} ms  "
+              f"commonality={row['commonality_s']*1e3:9.3f} ms  x{row['speedup']:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dempster-Shafer engine benchmarks")
+    parser.add_argument('--tracks', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--frame-sizes', type=int, nargs='+', default=[4, 6])
+    parser.add_argument('--focal', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print("Batch Dempster combination vs per-pair loop")
+    _print_rows([bench_batch(n, k, args.focal, args.repeat, shared)
+                 for shared in (True, False) for k in args.frame_sizes for n in args.tracks])
+
+    print()
+    print(f"Combination rules (|Θ|=8, {args.focal * 8} focal sets per source)")
+    for name, seconds in bench_rules(8, args.focal * 8, repeat=args.repeat).items():
+        print(f"{name:<14} {seconds*1e6:9.1f} µs/combination")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Command-line front end for the Dempster-Shafer engine
+
+Fuse mass functions from JSON or NDJSON files without starting the GUI:
+
+python -m dempster_shafer fuse sensors.json
+python -m dempster_shafer fuse tracks.ndjson --rule yager -o results.ndjson
+python -m dempster_shafer bench --frame-sizes 4 8 16 --focal 4 16 64
+
+A problem is one JSON object; a .json file holds one problem or a list of
+them, a .ndjson/.jsonl file holds one problem per line:
+
+{"id": "track-1",
+ "frame": ["Pedestrian", "Cyclist", "Vehicle", "Animal"],
+ "sources": [{"name": "camera",
+              "masses": [{"focal": ["Pedestrian"], "mass": 0.65}, ...]},
+             ...]}
+
+Every result is written as one JSON line with the overall conflict, the
+fused focal sets and Bel/Pl/BetP of every singleton. When the sources are
+in total conflict the result has "decision": null and an "error", and the
+command exits with status 1 once every problem is written.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+
+import numpy as np
+
+from .approximation import STRATEGIES, AnyMass, Approximator
+from .benchmark import bench_suite
+from .decision import DECISION_RULES, SingletonMeasures, singleton_measures
+from .fusion import fuse_all, fuse_sequential
+from .mass import MAX_FRAME_SIZE, MassFunction
+from .rules import RULES
+from .sparse import SparseMassFunction
+
+NDJSON_SUFFIXES = ('.ndjson', '.jsonl')
+
+
+def read_problems(stream: TextIO, ndjson: bool) -> Iterator[Dict]:
+    """Yield the problems of a JSON or NDJSON stream"""
+    if ndjson:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+        return
+    data = json.load(stream)
+    yield from data if isinstance(data, list) else [data]
+
+
+def parse_sources(problem: Dict) -> List[AnyMass]:
+    """Mass functions of a problem, sparse when the frame exceeds 64 elements"""
+    frame = problem['frame']
+    cls = MassFunction if len(frame) <= MAX_FRAME_SIZE else SparseMassFunction
+    sources = []
+    for source in problem['sources']:
+        masses = {}
+        for entry in source['masses']:
+            focal = frozenset(entry['focal'])
+            masses[focal] = masses.get(focal, 0.0) + float(entry['mass'])
+        sources.append(cls.from_dict(frame, masses))
+    if not sources:
+        raise ValueError(f"Problem {problem.get('id')!r} has no sources")
+    return sources
+
+
+def measures_of(m: AnyMass) -> SingletonMeasures:
+    """Singleton Bel/Pl/BetP, for both dense and sparse mass functions"""
+    if isinstance(m, MassFunction):
+        return singleton_measures(m)
+    betp = m.pignistic()
+    return SingletonMeasures(
+        bel=np.array([m.belief(1 << i) for i in range(len(m.frame))]),
+        pl=np.array([m.plausibility(1 << i) for i in range(len(m.frame))]),
+        betp=np.array([betp.get(elem, 0.0) for elem in m.frame]),
+    )
+
+
+def fuse_problem(problem: Dict, rule: str = 'dempster', decision: str = 'max_betp',
+                 approximation: Optional[Approximator] = None) -> Dict:
+    """Fuse one problem and return its JSON-serializable result"""
+    sources = parse_sources(problem)
+    if rule == 'dempster':
+        result = fuse_all(sources, parallel=False, approximation=approximation)
+    elif isinstance(sources[0], SparseMassFunction):
+        raise ValueError(f"Frames over {MAX_FRAME_SIZE} elements only support Dempster's rule")
+    else:
+        result = fuse_sequential(sources, rule, approximation)
+
+    fused = result.mass
+    measures = measures_of(fused)
+    output = {
+        'id': problem.get('id'),
+        'rule': rule,
+        'conflict': result.conflict,
+        'approximation_error': sum(sum(level.errors) for level in result.levels),
+        'focal': [{'focal': sorted(focal), 'mass': mass} for focal, mass in fused.items()],
+        'singletons': {
+            elem: {'bel': float(measures.bel[i]), 'pl': float(measures.pl[i]),
+                   'betp': float(measures.betp[i])}
+            for i, elem in enumerate(fused.frame)
+        },
+    }
+    # Under total conflict no mass is left on any hypothesis and every score is 0
+    if not any(mass > 0 for focal, mass in fused.items() if focal):
+        output['decision'] = None
+        output['error'] = f"Total conflict (K = {result.conflict:g}): the sources admit no common hypothesis"
+        return output
+    scores = getattr(measures, decision[len('max_'):])
+    best = int(np.argmax(scores))
+    output['decision'] = {'hypothesis': fused.frame[best], 'score': float(scores[best]),
+                          'rule': decision}
+    return output
+
+
+def _open_inputs(paths: Iterable[str]) -> Iterator[Dict]:
+    for path in paths:
+        ndjson = path.endswith(NDJSON_SUFFIXES)
+        if path == '-':
+            yield from read_problems(sys.stdin, ndjson=True)
+            continue
+        with open(path, encoding='utf-8') as stream:
+            yield from read_problems(stream, ndjson)
+
+
+def run_fuse(args: argparse.Namespace) -> int:
+    approximation = None
+    if args.approximate:
+        approximation = Approximator(args.approximate, args.max_focal)
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    failed = 0
+    try:
+        for problem in _open_inputs(args.inputs):
+            result = fuse_problem(problem, args.rule, args.decision, approximation)
+            out.write(json.dumps(result, ensure_ascii=False) + '\n')
+            if result['decision'] is None:
+                failed += 1
+                print(f"{result['id']}: {result['error']}", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failed else 0
+
+
+def run_bench(args: argparse.Namespace) -> int:
+    rows = bench_suite(args.frame_sizes, args.focal, n_sources=args.sources,
+                       n_problems=args.problems, rule=args.rule, seed=args.seed)
+    if args.json:
+        for row in rows:
+            print(json.dumps(row))
+        return 0
+    print(f"{'|Θ|':>4} {'focal':>6} {'problems/s':>11} {'p50 ms':>9} {'p99 ms':>9}")
+    for row in rows:
+        print(f"{row['frame_size']:>4} {row['focal_count']:>6} {row['throughput']:>11.1f} "
+              f"{row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m dempster_shafer',
+                                     description="Headless Dempster-Shafer fusion")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    fuse = commands.add_parser('fuse', help="fuse mass functions from JSON/NDJSON files")
+    fuse.add_argument('inputs', nargs='+', help="JSON or NDJSON files, '-' reads NDJSON from stdin")
+    fuse.add_argument('-o', '--output', help="write NDJSON results here instead of stdout")
+    fuse.add_argument('--rule', choices=sorted(RULES), default='dempster')
+    fuse.add_argument('--decision', choices=DECISION_RULES, default='max_betp')
+    fuse.add_argument('--approximate', choices=sorted(STRATEGIES),
+                      help="approximate every intermediate result to --max-focal focal sets")
+    fuse.add_argument('--max-focal', type=int, default=32)
+    fuse.set_defaults(run=run_fuse)
+
+    bench = commands.add_parser('bench', help="seeded fusion benchmark suite")
+    bench.add_argument('--frame-sizes', type=int, nargs='+', default=[4, 8, 16, 32])
+    bench.add_argument('--focal', type=int, nargs='+', default=[4, 16, 64])
+    bench.add_argument('--sources', type=int, default=3)
+    bench.add_argument('--problems', type=int, default=200)
+    bench.add_argument('--rule', choices=sorted(RULES), default='dempster')
+    bench.add_argument('--seed', type=int, default=0)
+    bench.add_argument('--json', action='store_true', help="print one JSON row per configuration")
+    bench.set_defaults(run=run_bench)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.run(args)
@@ -0,0 +1,122 @@
+"""
+Decision layer: Bel, Pl and pignistic probability of every singleton
+
+Singleton measures are computed in one vectorized pass over the focal
+arrays of a mass function and cached per fused state, so repeated decision
+queries on the same MassFunction cost a dictionary lookup and a comparison
+of its focal arrays.
+"""
+
+import weakref
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .mass import MassFunction
+from .transforms import frame_size_of
+
+DECISION_RULES = ('max_bel', 'max_pl', 'max_betp')
+
+
+class SingletonMeasures(NamedTuple):
+    """Bel({x}), Pl({x}) and BetP(x) for every frame element x, in frame order"""
+    bel: np.ndarray
+    pl: np.ndarray
+    betp: np.ndarray
+
+
+class Decision(NamedTuple):
+    """Chosen hypothesis, its score under the decision rule and the action"""
+    hypothesis: str
+    score: float
+    rule: str
+    action: Optional[str]
+
+
+# Frame, masks and masses at the time the measures were computed
+Snapshot = Tuple[Tuple[str, ...], bytes, bytes]
+
+_measures_cache: 'weakref.WeakKeyDictionary[MassFunction, Tuple[Snapshot, SingletonMeasures]]' = \
+    weakref.WeakKeyDictionary()
+
+
+def _snapshot(m: MassFunction) -> Snapshot:
+    return m.frame, bytes(m.masks), bytes(m.masses)
+
+
+def _membership(masks: np.ndarray, n: int) -> np.ndarray:
+    """(len(masks), n) 0/1 matrix, entry (i, x) set when element x ∈ focal set i"""
+    return ((masks[:, None] >> np.arange(n, dtype=np.uint64)) & np.uint64(1)).astype(float)
+
+
+def singleton_measures(m: MassFunction) -> SingletonMeasures:
+    """Bel, Pl and BetP of all singletons, cached for this mass function
+
+    BetP(x) = Σ m(A) / |A| over focal A ∋ x, renormalized by 1 - m(∅).
+    The cache entry is only used while the focal arrays are unchanged, so
+    a mass function edited in place gets fresh measures.
+    """
+    snapshot = _snapshot(m)
+    cached = _measures_cache.get(m)
+    if cached is not None and cached[0] == snapshot:
+        return cached[1]
+
+    n = len(m.frame)
+    masks = np.frombuffer(m.masks, dtype=np.uint64)
+    masses = np.frombuffer(m.masses)
+    members = _membership(masks, n)
+    sizes = members.sum(axis=1)
+    nonempty = sizes > 0
+
+    pl = masses @ members
+    bel = masses @ (members * (sizes == 1)[:, None])
+    betp = (masses[nonempty] / sizes[nonempty]) @ members[nonempty]
+    empty = masses[~nonempty].sum()
+    if empty < 1:
+        betp /= 1 - empty
+
+    measures = SingletonMeasures(bel, pl, betp)
+    _measures_cache[m] = snapshot, measures
+    return measures
+
+
+def pignistic_dense(masses: np.ndarray) -> np.ndarray:
+    """BetP of every singleton for dense (..., 2**n) mass arrays, shape (..., n)"""
+    n = frame_size_of(masses)
+    members = _membership(np.arange(1 << n, dtype=np.uint64), n)
+    sizes = members.sum(axis=1)
+    sizes[0] = 1.0  # The empty set is excluded by renormalization below
+    betp = (masses[..., 1:] / sizes[1:]) @ members[1:]
+    normalizer = 1 - masses[..., :1]
+    return betp / np.where(normalizer > 0, normalizer, 1.0)
+
+
+class DecisionPolicy:
+    """Decision rule plus a table mapping each hypothesis to an action
+
+    Hypotheses missing from `actions` get `default_action`.
+    """
+
+    def __init__(self, actions: Mapping[str, str], default_action: Optional[str] = None,
+                 rule: str = 'max_betp'):
+        if rule not in DECISION_RULES:
+            raise ValueError(f"Unknown decision rule '{rule}', expected one of {DECISION_RULES}")
+        self.actions: Dict[str, str] = dict(actions)
+        self.default_action = default_action
+        self.rule = rule
+
+    def scores(self, m: MassFunction, rule: Optional[str] = None) -> np.ndarray:
+        """Score of every singleton under the decision rule"""
+        measures = singleton_measures(m)
+        return getattr(measures, (rule or self.rule)[len('max_'):])
+
+    def decide(self, m: MassFunction, rule: Optional[str] = None) -> Decision:
+        """Pick the singleton maximizing the decision rule and look up its action"""
+        rule = rule or self.rule
+        if rule not in DECISION_RULES:
+            raise ValueError(f"Unknown decision rule '{rule}', expected one of {DECISION_RULES}")
+        scores = self.scores(m, rule)
+        best = int(np.argmax(scores))
+        hypothesis = m.frame[best]
+        return Decision(hypothesis, float(scores[best]), rule,
+                        self.actions.get(hypothesis, self.default_action))
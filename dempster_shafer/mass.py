@@ -0,0 +1,127 @@
+"""
+Bitmask-encoded mass functions
+
+Each focal set is stored as an integer whose bit i is set when frame[i]
+belongs to the set, so an intersection is a single `&` instead of a
+frozenset allocation. Focal sets and their masses live in two parallel
+arrays (array('Q') / array('d')).
+"""
+
+from array import array
+from typing import Dict, Iterable, Iterator, Sequence, Tuple, Union
+
+# Focal sets are stored as unsigned 64-bit words
+MAX_FRAME_SIZE = 64
+
+Hypothesis = Union[int, Iterable[str]]
+
+
+class MassFunction:
+    """Mass function over a frame of discernment with bitmask focal sets"""
+
+    # __weakref__ lets caches (e.g. decision.py) key on a fused state
+    __slots__ = ('frame', 'masks', 'masses', '_bits', '__weakref__')
+
+    def __init__(self, frame: Sequence[str], masks: Iterable[int] = (),
+                 masses: Iterable[float] = ()):
+        if len(frame) > MAX_FRAME_SIZE:
+            raise ValueError(f"Frame too large for 64-bit masks: {len(frame)} elements, "
+                             "use SparseMassFunction")
+        self.frame = tuple(frame)
+        self.masks = array('Q', masks)
+        self.masses = array('d', masses)
+        if len(self.masks) != len(self.masses):
+            raise ValueError("masks and masses must have the same length")
+        self._bits = {elem: 1 << i for i, elem in enumerate(self.frame)}
+
+    @classmethod
+    def from_dict(cls, frame: Sequence[str], mass_func: Dict) -> 'MassFunction':
+        """Build a mass function from a {frozenset: mass} dict"""
+        m = cls(frame)
+        combined = {}
+        for focal, mass in mass_func.items():
+            mask = m.encode(focal)
+            combined[mask] = combined.get(mask, 0.0) + mass
+        m.masks.extend(combined.keys())
+        m.masses.extend(combined.values())
+        return m
+
+    @property
+    def theta(self) -> int:
+        """Bitmask of the whole frame Θ"""
+        return (1 << len(self.frame)) - 1
+
+    def encode(self, focal: Iterable[str]) -> int:
+        """Convert a set of frame elements to its bitmask"""
+        mask = 0
+        for elem in focal:
+            try:
+                mask |= self._bits[elem]
+            except KeyError:
+                raise ValueError(f"'{elem}' is not in the frame of discernment") from None
+        return mask
+
+    def decode(self, mask: int) -> frozenset:
+        """Convert a bitmask back to a frozenset of frame elements"""
+        return frozenset(elem for i, elem in enumerate(self.frame) if mask >> i & 1)
+
+    def _as_mask(self, hypothesis: Hypothesis) -> int:
+        if isinstance(hypothesis, int):
+            return hypothesis
+        return self.encode(hypothesis)
+
+    def __len__(self) -> int:
+        return len(self.masks)
+
+    def items(self) -> Iterator[Tuple[frozenset, float]]:
+        """Iterate over (focal set, mass) pairs, like dict.items()"""
+        for mask, mass in zip(self.masks, self.masses):
+            yield self.decode(mask), mass
+
+    def to_dict(self) -> Dict[frozenset, float]:
+        """Return the mass function as a {frozenset: mass} dict"""
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        focal = ', '.join('{' + ', '.join(sorted(f)) + f'}}: {m:.4f}' for f, m in self.items())
+        return f"MassFunction({focal})"
+
+    def combine(self, other: 'MassFunction') -> Tuple['MassFunction', float]:
+        """Combine with another mass function using Dempster's rule"""
+        if self.frame != other.frame:
+            raise ValueError("Cannot combine mass functions over different frames")
+
+        combined = {}
+        conflict = 0.0
+        other_focal = list(zip(other.masks, other.masses))
+
+        for mask1, mass1 in zip(self.masks, self.masses):
+            for mask2, mass2 in other_focal:
+                intersection = mask1 & mask2
+                if intersection:
+                    combined[intersection] = combined.get(intersection, 0.0) + mass1 * mass2
+                else:  # Empty set
+                    conflict += mass1 * mass2
+
+        # Normalize
+        normalizer = 1 - conflict
+        masses = combined.values()
+        if normalizer > 0:
+            masses = [v / normalizer for v in masses]
+
+        return MassFunction(self.frame, combined.keys(), masses), conflict
+
+    def belief(self, hypothesis: Hypothesis) -> float:
+        """Bel(A) = sum of m(B) for every non-empty focal B ⊆ A"""
+        mask = self._as_mask(hypothesis)
+        return sum(m for b, m in zip(self.masks, self.masses) if b and b & ~mask == 0)
+
+    def plausibility(self, hypothesis: Hypothesis) -> float:
+        """Pl(A) = sum of m(B) for every focal B with B ∩ A ≠ ∅"""
+        mask = self._as_mask(hypothesis)
+        return sum(m for b, m in zip(self.masks, self.masses) if b & mask)
+
+
+def dempster_combination(m1: MassFunction, m2: MassFunction) -> Tuple[MassFunction, float]:
+    """Combine two mass functions using Dempster's rule"""
+    return m1.combine(m2)
@@ -0,0 +1,134 @@
+"""
+Pluggable combination rules sharing one pairwise-intersection kernel
+
+Every rule starts from the same vectorized kernel: the outer `&` of the two
+bitmask arrays and the outer product of the two mass arrays. Rules only
+differ in where they send each pair's mass, and the final accumulation is a
+single np.unique/bincount.
+"""
+
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+from .mass import MassFunction
+
+# Up to this frame size focal sets are accumulated in a dense 2**n bincount,
+# above it through a sort (np.unique)
+DENSE_ACCUMULATE_FRAME = 16
+
+
+class PairwiseKernel:
+    """All focal pairs (B, C) of two mass functions, flattened"""
+
+    __slots__ = ('frame', 'theta', 'masks1', 'masks2', 'masses1', 'masses2',
+                 'intersections', 'products', 'conflicting')
+
+    def __init__(self, m1: MassFunction, m2: MassFunction):
+        if m1.frame != m2.frame:
+            raise ValueError("Cannot combine mass functions over different frames")
+        self.frame = m1.frame
+        self.theta = np.uint64(m1.theta)
+        a = np.frombuffer(m1.masks, dtype=np.uint64)
+        b = np.frombuffer(m2.masks, dtype=np.uint64)
+        wa = np.frombuffer(m1.masses)
+        wb = np.frombuffer(m2.masses)
+
+        self.masks1 = np.repeat(a, len(b))
+        self.masks2 = np.tile(b, len(a))
+        self.masses1 = np.repeat(wa, len(b))
+        self.masses2 = np.tile(wb, len(a))
+        self.intersections = self.masks1 & self.masks2
+        self.products = self.masses1 * self.masses2
+        self.conflicting = self.intersections == 0
+
+    @property
+    def conflict(self) -> float:
+        """K = Σ m1(B)·m2(C) over B ∩ C = ∅"""
+        return float(self.products[self.conflicting].sum())
+
+    def accumulate(self, masks: np.ndarray, masses: np.ndarray) -> MassFunction:
+        """Sum masses sent to the same focal set into a MassFunction"""
+        if len(self.frame) <= DENSE_ACCUMULATE_FRAME:
+            totals = np.bincount(masks.astype(np.intp), weights=masses,
+                                 minlength=1 << len(self.frame))
+            focal = np.arange(len(totals))
+        else:
+            focal, inverse = np.unique(masks, return_inverse=True)
+            totals = np.bincount(inverse.ravel(), weights=masses, minlength=len(focal))
+        keep = totals != 0
+        return MassFunction(self.frame, focal[keep].tolist(), totals[keep].tolist())
+
+
+Rule = Callable[[PairwiseKernel], MassFunction]
+
+RULES: Dict[str, Rule] = {}
+
+
+def register_rule(name: str) -> Callable[[Rule], Rule]:
+    """Decorator adding a combination rule to RULES"""
+    def decorator(rule: Rule) -> Rule:
+        RULES[name] = rule
+        return rule
+    return decorator
+
+
+@register_rule('conjunctive')
+def conjunctive_rule(kernel: PairwiseKernel) -> MassFunction:
+    """Unnormalized conjunctive rule, the conflict stays on ∅"""
+    return kernel.accumulate(kernel.intersections, kernel.products)
+
+
+@register_rule('dempster')
+def dempster_rule(kernel: PairwiseKernel) -> MassFunction:
+    """Dempster's rule: conjunctive rule renormalized by 1 - K"""
+    keep = ~kernel.conflicting
+    normalizer = 1 - kernel.conflict
+    masses = kernel.products[keep]
+    if normalizer > 0:
+        masses = masses / normalizer
+    return kernel.accumulate(kernel.intersections[keep], masses)
+
+
+@register_rule('yager')
+def yager_rule(kernel: PairwiseKernel) -> MassFunction:
+    """Yager's rule: the conflict K is transferred to Θ"""
+    targets = np.where(kernel.conflicting, kernel.theta, kernel.intersections)
+    return kernel.accumulate(targets, kernel.products)
+
+
+@register_rule('dubois_prade')
+def dubois_prade_rule(kernel: PairwiseKernel) -> MassFunction:
+    """Dubois-Prade rule: a conflicting pair's mass goes to B ∪ C"""
+    targets = np.where(kernel.conflicting, kernel.masks1 | kernel.masks2, kernel.intersections)
+    return kernel.accumulate(targets, kernel.products)
+
+
+@register_rule('pcr5')
+def pcr5_rule(kernel: PairwiseKernel) -> MassFunction:
+    """PCR5: each conflicting product is split back to B and C proportionally
+
+    m1(B)·m2(C) with B ∩ C = ∅ gives m1(B)²·m2(C) / (m1(B) + m2(C)) to B
+    and m2(C)²·m1(B) / (m1(B) + m2(C)) to C.
+    """
+    c = kernel.conflicting
+    w1, w2 = kernel.masses1[c], kernel.masses2[c]
+    total = w1 + w2
+    total[total == 0] = 1.0
+    targets = np.concatenate([kernel.intersections[~c], kernel.masks1[c], kernel.masks2[c]])
+    masses = np.concatenate([kernel.products[~c], w1 * w1 * w2 / total, w2 * w2 * w1 / total])
+    return kernel.accumulate(targets, masses)
+
+
+def combine(m1: MassFunction, m2: MassFunction, rule: str = 'dempster') -> Tuple[MassFunction, float]:
+    """Combine two mass functions with a registered rule
+
+    Returns the combined mass function and the conflict K between the
+    sources (how each rule redistributes K is up to the rule).
+    """
+    try:
+        rule_func = RULES[rule]
+    except KeyError:
+        raise ValueError(f"Unknown combination rule '{rule}', expected one of {sorted(RULES)}") from None
+    kernel = PairwiseKernel(m1, m2)
+    return rule_func(kernel), kernel.conflict
@@ -0,0 +1,172 @@
+"""
+Sparse mass functions for large frames of discernment
+
+MassFunction packs focal sets into 64-bit words and the dense transforms
+need 2**|Θ| cells; neither works for a taxonomy of hundreds of classes.
+SparseMassFunction stores focal sets as arbitrary-width Python integers and
+only ever touches focal elements: combination uses an inverted index from
+frame elements to the focal sets containing them, so disjoint pairs are
+never visited, and Bel, Pl and BetP cost O(number of focal elements).
+"""
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+Hypothesis = Union[int, Iterable[str]]
+
+
+def set_bits(mask: int) -> Iterator[int]:
+    """Indices of the set bits of `mask`, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class FocalIndex:
+    """Inverted index: frame element -> bitset of focal positions containing it"""
+
+    __slots__ = ('postings',)
+
+    def __init__(self, masks: Sequence[int]):
+        self.postings: Dict[int, int] = {}
+        for position, mask in enumerate(masks):
+            for elem in set_bits(mask):
+                self.postings[elem] = self.postings.get(elem, 0) | 1 << position
+
+    def intersecting(self, mask: int) -> int:
+        """Bitset of the focal positions whose set meets `mask`"""
+        candidates = 0
+        postings = self.postings
+        for elem in set_bits(mask):
+            candidates |= postings.get(elem, 0)
+        return candidates
+
+
+class SparseMassFunction:
+    """Mass function over an arbitrarily large frame, focal sets as Python ints"""
+
+    __slots__ = ('frame', 'masks', 'masses', '_bits', '_index')
+
+    def __init__(self, frame: Sequence[str], masks: Iterable[int] = (),
+                 masses: Iterable[float] = ()):
+        self.frame = tuple(frame)
+        self.masks: List[int] = list(masks)
+        self.masses = array('d', masses)
+        if len(self.masks) != len(self.masses):
+            raise ValueError("masks and masses must have the same length")
+        self._bits = {elem: 1 << i for i, elem in enumerate(self.frame)}
+        self._index = None
+
+    @classmethod
+    def from_dict(cls, frame: Sequence[str], mass_func: Dict) -> 'SparseMassFunction':
+        """Build a mass function from a {frozenset: mass} dict"""
+        m = cls(frame)
+        combined = {}
+        for focal, mass in mass_func.items():
+            mask = m.encode(focal)
+            combined[mask] = combined.get(mask, 0.0) + mass
+        m.masks.extend(combined.keys())
+        m.masses.extend(combined.values())
+        return m
+
+    @property
+    def theta(self) -> int:
+        """Bitmask of the whole frame Θ"""
+        return (1 << len(self.frame)) - 1
+
+    @property
+    def index(self) -> FocalIndex:
+        """Inverted element index, built on first use"""
+        if self._index is None:
+            self._index = FocalIndex(self.masks)
+        return self._index
+
+    def encode(self, focal: Iterable[str]) -> int:
+        """Convert a set of frame elements to its bitmask"""
+        mask = 0
+        for elem in focal:
+            try:
+                mask |= self._bits[elem]
+            except KeyError:
+                raise ValueError(f"'{elem}' is not in the frame of discernment") from None
+        return mask
+
+    def decode(self, mask: int) -> frozenset:
+        """Convert a bitmask back to a frozenset of frame elements"""
+        return frozenset(self.frame[i] for i in set_bits(mask))
+
+    def _as_mask(self, hypothesis: Hypothesis) -> int:
+        if isinstance(hypothesis, int):
+            return hypothesis
+        return self.encode(hypothesis)
+
+    def __len__(self) -> int:
+        return len(self.masks)
+
+    def items(self) -> Iterator[Tuple[frozenset, float]]:
+        """Iterate over (focal set, mass) pairs, like dict.items()"""
+        for mask, mass in zip(self.masks, self.masses):
+            yield self.decode(mask), mass
+
+    def to_dict(self) -> Dict[frozenset, float]:
+        """Return the mass function as a {frozenset: mass} dict"""
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"SparseMassFunction(|Θ|={len(self.frame)}, {len(self)} focal sets)"
+
+    def combine(self, other: 'SparseMassFunction') -> Tuple['SparseMassFunction', float]:
+        """Combine with another mass function using Dempster's rule
+
+        Only pairs that share at least one frame element are visited; the
+        conflict is whatever product mass is left over.
+        """
+        if self.frame != other.frame:
+            raise ValueError("Cannot combine mass functions over different frames")
+
+        combined = {}
+        agreement = 0.0
+        index = other.index
+        other_masks, other_masses = other.masks, other.masses
+
+        for mask1, mass1 in zip(self.masks, self.masses):
+            for position in set_bits(index.intersecting(mask1)):
+                product = mass1 * other_masses[position]
+                intersection = mask1 & other_masks[position]
+                combined[intersection] = combined.get(intersection, 0.0) + product
+                agreement += product
+
+        conflict = max(0.0, sum(self.masses) * sum(other.masses) - agreement)
+
+        # Normalize
+        normalizer = 1 - conflict
+        masses = combined.values()
+        if normalizer > 0:
+            masses = [v / normalizer for v in masses]
+
+        return SparseMassFunction(self.frame, combined.keys(), masses), conflict
+
+    def belief(self, hypothesis: Hypothesis) -> float:
+        """Bel(A) = sum of m(B) for every non-empty focal B ⊆ A"""
+        mask = self._as_mask(hypothesis)
+        return sum(m for b, m in zip(self.masks, self.masses) if b and b & ~mask == 0)
+
+    def plausibility(self, hypothesis: Hypothesis) -> float:
+        """Pl(A) = sum of m(B) for every focal B with B ∩ A ≠ ∅"""
+        mask = self._as_mask(hypothesis)
+        return sum(m for b, m in zip(self.masks, self.masses) if b & mask)
+
+    def pignistic(self) -> Dict[str, float]:
+        """BetP(x) = Σ m(A) / |A| over focal A ∋ x, for elements with BetP > 0"""
+        betp: Dict[int, float] = {}
+        empty = 0.0
+        for mask, mass in zip(self.masks, self.masses):
+            if not mask:
+                empty += mass
+                continue
+            share = mass / mask.bit_count()
+            for elem in set_bits(mask):
+                betp[elem] = betp.get(elem, 0.0) + share
+        scale = 1 / (1 - empty) if empty < 1 else 1.0
+        return {self.frame[elem]: p * scale for elem, p in sorted(betp.items())}
@@ -0,0 +1,124 @@
+"""
+Streaming Dempster fusion with sliding-window retraction
+
+In commonality space Dempster's rule is a pointwise product, so the running
+state is Π Qᵢ and old evidence is retracted by dividing its Qᵢ back out.
+The product is kept as a sum of logs plus a count of zero factors per
+subset, which makes retraction exact even where some Qᵢ(A) = 0.
+
+The state is dense: every update and query costs O(n·2**n) for a frame of
+n elements, whatever the number of focal sets. Qᵢ(A) is non-zero on every
+subset of a focal set, so evidence with mass on Θ touches all 2**n cells
+anyway and a per-focal-set update would not be cheaper in the common case.
+Frames too large for that belong to SparseMassFunction and fuse_all.
+"""
+
+import time
+from collections import deque
+from typing import Deque, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .batch import from_dense, to_dense
+from .mass import MassFunction
+from .transforms import commonality, mobius_superset
+
+# Rebuild the running sums from the window every so many updates so that
+# floating-point error from repeated add/subtract cannot accumulate
+RESYNC_INTERVAL = 10000
+
+
+class _Evidence(NamedTuple):
+    timestamp: float
+    log_q: np.ndarray
+    zeros: np.ndarray
+
+
+class StreamingFuser:
+    """Running combination of a stream of mass functions over a sliding window
+
+    `window` keeps at most that many pieces of evidence and `max_age`
+    expires evidence older than that many seconds; with neither, every
+    update is kept (plain incremental fusion).
+    """
+
+    def __init__(self, frame: Sequence[str], window: Optional[int] = None,
+                 max_age: Optional[float] = None):
+        self.frame = tuple(frame)
+        self.window = window
+        self.max_age = max_age
+        self._evidence: Deque[_Evidence] = deque()
+        self._log_q = np.zeros(1 << len(self.frame))
+        self._zeros = np.zeros(1 << len(self.frame), dtype=np.int64)
+        self._updates = 0
+
+    def __len__(self) -> int:
+        return len(self._evidence)
+
+    def update(self, mass: MassFunction, timestamp: Optional[float] = None):
+        """Fold a new piece of evidence into the running state, in O(n·2**n)"""
+        if mass.frame != self.frame:
+            raise ValueError("Evidence frame does not match the fuser frame")
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        q = commonality(to_dense([mass])[0])
+        zeros = q <= 0
+        evidence = _Evidence(timestamp, np.log(np.where(zeros, 1.0, q)), zeros)
+
+        self._evidence.append(evidence)
+        self._log_q += evidence.log_q
+        self._zeros += evidence.zeros
+
+        if self.window is not None:
+            while len(self._evidence) > self.window:
+                self._retract(self._evidence.popleft())
+        self.expire(timestamp)
+
+        self._updates += 1
+        if self._updates % RESYNC_INTERVAL == 0:
+            self.resync()
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Retract evidence older than max_age, returning how many were dropped"""
+        if self.max_age is None:
+            return 0
+        if now is None:
+            now = time.monotonic()
+        dropped = 0
+        while self._evidence and now - self._evidence[0].timestamp > self.max_age:
+            self._retract(self._evidence.popleft())
+            dropped += 1
+        return dropped
+
+    def _retract(self, evidence: _Evidence):
+        self._log_q -= evidence.log_q
+        self._zeros -= evidence.zeros
+
+    def resync(self):
+        """Recompute the running sums exactly from the evidence in the window"""
+        self._log_q[:] = 0.0
+        self._zeros[:] = 0
+        for evidence in self._evidence:
+            self._log_q += evidence.log_q
+            self._zeros += evidence.zeros
+
+    def commonality(self) -> np.ndarray:
+        """Unnormalized commonality Π Qᵢ of the evidence in the window"""
+        return np.where(self._zeros == 0, np.exp(self._log_q), 0.0)
+
+    def dense(self) -> Tuple[np.ndarray, float]:
+        """Combined masses indexed by bitmask and the conflict K of the window"""
+        combined = mobius_superset(self.commonality())
+        # The Möbius transform leaves round-off residue on non-focal subsets
+        combined[np.abs(combined) < 1e-12] = 0.0
+        conflict = float(combined[0])
+        combined[0] = 0.0
+        if conflict < 1:
+            combined /= 1 - conflict
+        return combined, conflict
+
+    def state(self) -> Tuple[MassFunction, float]:
+        """Combined mass function and conflict K, like dempster_combination"""
+        combined, conflict = self.dense()
+        return from_dense(combined, self.frame), conflict
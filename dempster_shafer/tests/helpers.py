@@ -0,0 +1,38 @@
+"""
+Shared fixtures-as-functions for the engine tests
+"""
+
+import random
+
+import pytest
+
+from dempster_shafer.benchmark import random_mass_function
+
+
+def assert_same_mass(m1, m2, tol=1e-12):
+    """Same focal sets, masses within `tol`; works across dense and sparse"""
+    d1, d2 = m1.to_dict(), m2.to_dict()
+    assert set(d1) == set(d2)
+    for focal, mass in d1.items():
+        assert mass == pytest.approx(d2[focal], abs=tol)
+
+
+def random_pairs(frame_size, focal_count, count, seed=0):
+    rng = random.Random(seed)
+    return [(random_mass_function(rng, frame_size, focal_count),
+             random_mass_function(rng, frame_size, focal_count)) for _ in range(count)]
+
+
+def reference_combination(m1, m2):
+    """Dempster's rule on {frozenset: mass} dicts, as the GUI computed it"""
+    combined, conflict = {}, 0.0
+    for focal1, mass1 in m1.items():
+        for focal2, mass2 in m2.items():
+            intersection = focal1 & focal2
+            if intersection:
+                combined[intersection] = combined.get(intersection, 0.0) + mass1 * mass2
+            else:
+                conflict += mass1 * mass2
+    if conflict < 1:
+        combined = {focal: mass / (1 - conflict) for focal, mass in combined.items()}
+    return combined, conflict
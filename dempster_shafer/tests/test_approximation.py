@@ -0,0 +1,46 @@
+"""
+Focal budgets of the approximation strategies
+"""
+
+import random
+
+import pytest
+
+from dempster_shafer import STRATEGIES, Approximator, mass_distance
+from dempster_shafer.approximation import klx
+from dempster_shafer.benchmark import random_mass_function
+
+
+@pytest.fixture
+def wide_mass():
+    return random_mass_function(random.Random(0), 8, 64)
+
+
+@pytest.mark.parametrize('strategy', sorted(STRATEGIES))
+@pytest.mark.parametrize('max_focal', [1, 5, 20])
+def test_budget_is_strict(wide_mass, strategy, max_focal):
+    approx = Approximator(strategy, max_focal)(wide_mass)
+    assert len(approx.mass) <= max_focal
+    assert sum(approx.mass.masses) == pytest.approx(1.0)
+    assert approx.error == pytest.approx(mass_distance(wide_mass, approx.mass))
+
+
+def test_within_budget_is_unchanged(wide_mass):
+    # klx and threshold also trim light focal sets under budget
+    for strategy in ('summarize', 'merge'):
+        approx = Approximator(strategy, len(wide_mass))(wide_mass)
+        assert approx.error == 0.0
+        assert approx.mass.to_dict() == pytest.approx(wide_mass.to_dict())
+
+
+def test_klx_keeps_at_least_k(wide_mass):
+    approx = klx(wide_mass, max_focal=20, k=10, x=1.0)
+    assert len(approx.mass) == 10
+
+
+def test_klx_rejects_k_over_max_focal(wide_mass):
+    # Regression: the loop stopped at k, returning more than max_focal sets
+    with pytest.raises(ValueError, match='exceeds max_focal'):
+        klx(wide_mass, max_focal=5, k=8)
+    with pytest.raises(ValueError, match='exceeds max_focal'):
+        Approximator('klx', 5, k=8)
@@ -0,0 +1,47 @@
+"""
+Batch Dempster combination over dense arrays against the reference loop
+"""
+
+import numpy as np
+import pytest
+
+from dempster_shafer import batch, batch_dempster_combination, conjunctive_combination, from_dense, to_dense
+
+from .helpers import assert_same_mass, random_pairs
+
+
+@pytest.mark.parametrize('method', ['pairwise', 'commonality'])
+def test_batch_matches_reference(method):
+    pairs = random_pairs(5, 6, 50)
+    combined, conflict = batch_dempster_combination(to_dense([a for a, _ in pairs]),
+                                                    to_dense([b for _, b in pairs]), method)
+    for row, k, (m1, m2) in zip(combined, conflict, pairs):
+        reference, reference_conflict = m1.combine(m2)
+        assert k == pytest.approx(reference_conflict, abs=1e-12)
+        assert_same_mass(from_dense(np.where(np.abs(row) > 1e-15, row, 0.0), m1.frame), reference)
+
+
+def test_dense_round_trip():
+    pairs = random_pairs(4, 5, 10)
+    for m, _ in pairs:
+        assert_same_mass(from_dense(to_dense([m])[0], m.frame), m)
+
+
+def test_conjunctive_combination_is_chunked(monkeypatch):
+    # Regression: the pairwise products used to go through a dense one-hot
+    # (pairs, 2**n) matrix; chunks must add up to the unchunked result
+    pairs = random_pairs(6, 12, 40, seed=1)
+    m1, m2 = to_dense([a for a, _ in pairs]), to_dense([b for _, b in pairs])
+    whole = conjunctive_combination(m1, m2)
+    monkeypatch.setattr(batch, 'MAX_PAIRWISE_ELEMENTS', 7)
+    assert np.allclose(conjunctive_combination(m1, m2), whole, atol=1e-15)
+
+
+def test_conjunctive_combination_large_frame():
+    rng = np.random.default_rng(0)
+    n = 10
+    m1, m2 = (rng.dirichlet(np.ones(1 << n), size=4) for _ in range(2))
+    ours = conjunctive_combination(m1, m2)
+    _, conflict = batch_dempster_combination(m1, m2, 'commonality')
+    assert np.allclose(ours[:, 0], conflict, atol=1e-12)
+    assert np.allclose(ours.sum(axis=1), 1.0)
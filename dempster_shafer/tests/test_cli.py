@@ -0,0 +1,55 @@
+"""
+fuse command results, including total conflict
+"""
+
+import json
+
+from dempster_shafer.cli import fuse_problem, main
+
+FRAME = ['Pedestrian', 'Cyclist', 'Vehicle']
+
+
+def problem(*sources, id='track-1'):
+    return {'id': id, 'frame': FRAME,
+            'sources': [{'name': f"s{i}", 'masses': [{'focal': focal, 'mass': mass} for focal, mass in masses]}
+                        for i, masses in enumerate(sources)]}
+
+
+AGREEING = problem([(['Pedestrian'], 0.6), (FRAME, 0.4)], [(['Pedestrian', 'Cyclist'], 0.7), (FRAME, 0.3)])
+CONFLICTING = problem([(['Pedestrian'], 1.0)], [(['Vehicle'], 1.0)], id='track-2')
+
+
+def test_decision():
+    result = fuse_problem(AGREEING)
+    assert result['decision']['hypothesis'] == 'Pedestrian'
+    assert result['conflict'] == 0.0
+    assert 'error' not in result
+    assert abs(sum(entry['mass'] for entry in result['focal']) - 1.0) < 1e-12
+
+
+def test_total_conflict_has_no_decision():
+    # Regression: an empty fused mass gave an arbitrary argmax over zeros
+    result = fuse_problem(CONFLICTING)
+    assert result['conflict'] == 1.0
+    assert result['decision'] is None
+    assert 'Total conflict' in result['error']
+    json.dumps(result)
+
+
+def test_yager_keeps_a_decision_under_total_conflict():
+    result = fuse_problem(CONFLICTING, rule='yager')
+    assert result['decision'] is not None
+    assert result['focal'] == [{'focal': sorted(FRAME), 'mass': 1.0}]
+
+
+def test_exit_status(tmp_path, capsys):
+    path = tmp_path / 'problems.ndjson'
+    path.write_text(json.dumps(AGREEING) + '\n' + json.dumps(CONFLICTING) + '\n')
+    assert main(['fuse', str(path)]) == 1
+    captured = capsys.readouterr()
+    lines = [json.loads(line) for line in captured.out.splitlines()]
+    assert [line['id'] for line in lines] == ['track-1', 'track-2']
+    assert 'track-2' in captured.err
+
+    path.write_text(json.dumps(AGREEING) + '\n')
+    assert main(['fuse', str(path)]) == 0
@@ -0,0 +1,53 @@
+"""
+Singleton measures and decisions against the MassFunction queries
+"""
+
+import numpy as np
+import pytest
+
+from dempster_shafer import DecisionPolicy, MassFunction, pignistic_dense, singleton_measures, to_dense
+
+from .helpers import random_pairs
+
+FRAME = ['Pedestrian', 'Cyclist', 'Vehicle']
+
+
+def test_measures_match_mass_function():
+    for m, _ in random_pairs(6, 12, 20):
+        measures = singleton_measures(m)
+        for i in range(len(m.frame)):
+            assert measures.bel[i] == pytest.approx(m.belief(1 << i))
+            assert measures.pl[i] == pytest.approx(m.plausibility(1 << i))
+        assert measures.betp.sum() == pytest.approx(1.0)
+
+
+def test_measures_follow_in_place_updates():
+    # Regression: the cache was keyed on the object and returned stale measures
+    m = MassFunction.from_dict(FRAME, {frozenset({'Pedestrian'}): 1.0})
+    assert singleton_measures(m) is singleton_measures(m)
+    assert singleton_measures(m).bel[0] == 1.0
+    m.masses[0] = 0.4
+    m.masks.append(m.encode({'Vehicle'}))
+    m.masses.append(0.6)
+    measures = singleton_measures(m)
+    assert measures.bel.tolist() == pytest.approx([0.4, 0.0, 0.6])
+
+
+def test_pignistic_dense_matches_singleton_measures():
+    masses = [m for m, _ in random_pairs(5, 8, 10)]
+    dense = pignistic_dense(to_dense(masses))
+    assert np.allclose(dense, [singleton_measures(m).betp for m in masses])
+
+
+def test_policy_maps_hypotheses_to_actions():
+    m = MassFunction.from_dict(FRAME, {frozenset({'Pedestrian'}): 0.5,
+                                       frozenset({'Pedestrian', 'Cyclist'}): 0.3,
+                                       frozenset({'Vehicle'}): 0.2})
+    policy = DecisionPolicy({'Pedestrian': 'brake'}, default_action='continue')
+    decision = policy.decide(m)
+    assert decision.hypothesis == 'Pedestrian' and decision.action == 'brake'
+    assert decision.score == pytest.approx(0.65)
+    assert policy.decide(m, 'max_bel').score == pytest.approx(0.5)
+    assert DecisionPolicy({}, 'continue').decide(m).action == 'continue'
+    with pytest.raises(ValueError, match='Unknown decision rule'):
+        DecisionPolicy({}, rule='min_betp')
@@ -0,0 +1,71 @@
+"""
+Balanced-tree fusion against a left fold of the reference loop
+"""
+
+import random
+
+import pytest
+
+from dempster_shafer import MassFunction, SparseMassFunction, fuse_all, fuse_sequential
+from dempster_shafer.benchmark import random_mass_function
+from dempster_shafer.cli import fuse_problem
+from dempster_shafer.fusion import _combine_pair
+
+from .helpers import assert_same_mass, random_pairs
+
+
+def test_fuse_all_matches_sequential_reference():
+    rng = random.Random(2)
+    sources = [random_mass_function(rng, 6, 8) for _ in range(7)]
+    result = fuse_all(sources, parallel=False)
+    reference, consistency = sources[0], 1.0
+    for source in sources[1:]:
+        reference, conflict = reference.combine(source)
+        consistency *= 1 - conflict
+    assert_same_mass(result.mass, reference, tol=1e-10)
+    assert result.conflict == pytest.approx(1 - consistency, abs=1e-12)
+    assert [level.level for level in result.levels] == [1, 2, 3]
+    assert fuse_sequential(sources).conflict == pytest.approx(result.conflict, abs=1e-12)
+
+
+def test_fuse_all_needs_a_source():
+    with pytest.raises(ValueError, match='at least one source'):
+        fuse_all([])
+
+
+def test_combine_pair_uses_the_kernel(monkeypatch):
+    # Regression: fuse_all's pairs went through the pure-Python loop
+    pairs = random_pairs(8, 32, 5)
+    references = [m1.combine(m2) for m1, m2 in pairs]
+
+    def loop(self, other):
+        raise AssertionError("MassFunction.combine called")
+
+    monkeypatch.setattr(MassFunction, 'combine', loop)
+    for pair, (reference, reference_conflict) in zip(pairs, references):
+        mass, conflict, error = _combine_pair(pair)
+        assert isinstance(mass, MassFunction) and error == 0.0
+        assert conflict == pytest.approx(reference_conflict, abs=1e-12)
+        assert_same_mass(mass, reference)
+
+
+def test_fuse_all_over_a_large_frame():
+    # Regression: sparse pairs went to the 64-bit kernel and overflowed
+    frame = [f"class{i}" for i in range(80)]
+    rng = random.Random(3)
+    sources = []
+    for _ in range(5):
+        focal = {frozenset(rng.sample(frame, rng.randint(40, 79))): 0.6, frozenset(frame): 0.4}
+        sources.append(SparseMassFunction.from_dict(frame, focal))
+    result = fuse_all(sources, parallel=False)
+    reference = fuse_sequential(sources)
+    assert isinstance(result.mass, SparseMassFunction)
+    assert result.conflict == pytest.approx(reference.conflict, abs=1e-12)
+    assert_same_mass(result.mass, reference.mass, tol=1e-10)
+
+    problem = {'id': 'taxonomy', 'frame': frame, 'sources': [
+        {'masses': [{'focal': sorted(focal), 'mass': mass} for focal, mass in m.items()]}
+        for m in sources]}
+    output = fuse_problem(problem)
+    assert output['conflict'] == pytest.approx(result.conflict, abs=1e-12)
+    assert output['decision']['hypothesis'] in frame
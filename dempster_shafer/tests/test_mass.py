@@ -0,0 +1,59 @@
+"""
+Bitmask MassFunction against the frozenset implementation of the GUI
+"""
+
+import pytest
+
+from dempster_shafer import MAX_FRAME_SIZE, MassFunction, dempster_combination
+
+from .helpers import random_pairs, reference_combination
+
+FRAME = ['Pedestrian', 'Cyclist', 'Vehicle', 'Animal']
+
+
+def test_encode_decode_round_trip():
+    m = MassFunction(FRAME)
+    for focal in (set(), {'Cyclist'}, {'Pedestrian', 'Animal'}, set(FRAME)):
+        assert m.decode(m.encode(focal)) == frozenset(focal)
+    assert m.encode(FRAME) == m.theta == 0b1111
+    with pytest.raises(ValueError, match='not in the frame'):
+        m.encode({'Truck'})
+
+
+def test_from_dict_merges_duplicate_focal_sets():
+    m = MassFunction.from_dict(FRAME, {frozenset({'Vehicle'}): 0.3, ('Vehicle',): 0.2,
+                                       frozenset(FRAME): 0.5})
+    assert m.to_dict() == pytest.approx({frozenset({'Vehicle'}): 0.5, frozenset(FRAME): 0.5})
+
+
+def test_combination_matches_reference():
+    for m1, m2 in random_pairs(6, 12, 50):
+        combined, conflict = dempster_combination(m1, m2)
+        reference, reference_conflict = reference_combination(m1.to_dict(), m2.to_dict())
+        assert conflict == pytest.approx(reference_conflict, abs=1e-12)
+        assert combined.to_dict() == pytest.approx(reference, abs=1e-12)
+
+
+def test_belief_and_plausibility_match_reference():
+    for m, _ in random_pairs(5, 10, 20):
+        focal = m.to_dict()
+        for mask in range(1 << 5):
+            hypothesis = m.decode(mask)
+            assert m.belief(mask) == pytest.approx(
+                sum(v for b, v in focal.items() if b and b <= hypothesis))
+            assert m.plausibility(hypothesis) == pytest.approx(
+                sum(v for b, v in focal.items() if b & hypothesis))
+
+
+def test_total_conflict_is_left_unnormalized():
+    m1 = MassFunction.from_dict(FRAME, {frozenset({'Pedestrian'}): 1.0})
+    m2 = MassFunction.from_dict(FRAME, {frozenset({'Vehicle'}): 1.0})
+    combined, conflict = m1.combine(m2)
+    assert conflict == 1.0 and len(combined) == 0
+
+
+def test_frame_checks():
+    with pytest.raises(ValueError, match='different frames'):
+        MassFunction(FRAME).combine(MassFunction(FRAME[:3]))
+    with pytest.raises(ValueError, match='SparseMassFunction'):
+        MassFunction([f"h{i}" for i in range(MAX_FRAME_SIZE + 1)])
@@ -0,0 +1,63 @@
+"""
+Combination rules on the pairwise kernel against the reference loop
+"""
+
+import pytest
+
+from dempster_shafer import RULES, MassFunction, combine, register_rule
+
+from .helpers import assert_same_mass, random_pairs
+
+FRAME = ['a', 'b', 'c']
+
+
+@pytest.mark.parametrize('frame_size, focal_count', [(3, 4), (8, 32), (20, 64)])
+def test_dempster_kernel_matches_reference(frame_size, focal_count):
+    for m1, m2 in random_pairs(frame_size, focal_count, 20):
+        ours, conflict = combine(m1, m2, 'dempster')
+        reference, reference_conflict = m1.combine(m2)
+        assert conflict == pytest.approx(reference_conflict, abs=1e-12)
+        assert_same_mass(ours, reference)
+
+
+def test_conjunctive_kernel_keeps_conflict_on_empty_set():
+    for m1, m2 in random_pairs(6, 16, 20):
+        ours, conflict = combine(m1, m2, 'conjunctive')
+        assert ours.to_dict().get(frozenset(), 0.0) == pytest.approx(conflict, abs=1e-12)
+        assert sum(ours.masses) == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize('rule', ['yager', 'dubois_prade', 'pcr5'])
+def test_rules_conserve_mass(rule):
+    for m1, m2 in random_pairs(5, 8, 20):
+        ours, _ = combine(m1, m2, rule)
+        assert sum(ours.masses) == pytest.approx(1.0)
+        assert frozenset() not in ours.to_dict()
+
+
+def test_conflict_redistribution():
+    m1 = MassFunction.from_dict(FRAME, {frozenset('a'): 0.6, frozenset(FRAME): 0.4})
+    m2 = MassFunction.from_dict(FRAME, {frozenset('b'): 0.5, frozenset(FRAME): 0.5})
+    # K = 0.6 · 0.5
+    yager, conflict = combine(m1, m2, 'yager')
+    assert conflict == pytest.approx(0.3)
+    assert yager.to_dict()[frozenset(FRAME)] == pytest.approx(0.2 + 0.3)
+    dubois_prade, _ = combine(m1, m2, 'dubois_prade')
+    assert dubois_prade.to_dict()[frozenset('ab')] == pytest.approx(0.3)
+    pcr5, _ = combine(m1, m2, 'pcr5')
+    assert pcr5.to_dict()[frozenset('a')] == pytest.approx(0.3 + 0.6 * 0.6 * 0.5 / 1.1)
+    assert pcr5.to_dict()[frozenset('b')] == pytest.approx(0.2 + 0.5 * 0.5 * 0.6 / 1.1)
+
+
+def test_register_rule(monkeypatch):
+    monkeypatch.setitem(RULES, 'first', None)
+
+    @register_rule('first')
+    def first(kernel):
+        return kernel.accumulate(kernel.masks1, kernel.products)
+
+    m1, m2 = random_pairs(4, 4, 1)[0]
+    ours, _ = combine(m1, m2, 'first')
+    assert_same_mass(ours, m1)
+    with pytest.raises(ValueError, match='Unknown combination rule'):
+        combine(m1, m2, 'nope')
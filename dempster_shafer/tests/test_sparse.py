@@ -0,0 +1,61 @@
+"""
+SparseMassFunction against the dense MassFunction and the reference loop
+"""
+
+import random
+
+import pytest
+
+from dempster_shafer import FocalIndex, SparseMassFunction, set_bits
+
+from .helpers import assert_same_mass, random_pairs, reference_combination
+
+
+def sparse(m):
+    return SparseMassFunction.from_dict(m.frame, m.to_dict())
+
+
+def test_set_bits():
+    assert list(set_bits(0)) == []
+    assert list(set_bits(0b101001)) == [0, 3, 5]
+    assert list(set_bits(1 << 200)) == [200]
+
+
+def test_focal_index_finds_intersecting_sets():
+    masks = [0b0011, 0b0100, 0b1100, 0]
+    index = FocalIndex(masks)
+    for query in range(16):
+        expected = sum(1 << p for p, mask in enumerate(masks) if mask & query)
+        assert index.intersecting(query) == expected
+
+
+def test_sparse_matches_dense():
+    for m1, m2 in random_pairs(10, 16, 20):
+        ours, conflict = sparse(m1).combine(sparse(m2))
+        reference, reference_conflict = m1.combine(m2)
+        assert conflict == pytest.approx(reference_conflict, abs=1e-12)
+        assert_same_mass(ours, reference)
+        assert ours.belief(0b1111) == pytest.approx(reference.belief(0b1111))
+        assert ours.plausibility(0b1) == pytest.approx(reference.plausibility(0b1))
+
+
+def test_large_frame_matches_reference():
+    frame = [f"class{i}" for i in range(300)]
+    rng = random.Random(5)
+    m1, m2 = ({frozenset(rng.sample(frame, rng.randint(1, 150))): rng.random() for _ in range(8)}
+              for _ in range(2))
+    m1, m2 = ({focal: mass / sum(m.values()) for focal, mass in m.items()} for m in (m1, m2))
+    ours, conflict = SparseMassFunction.from_dict(frame, m1).combine(
+        SparseMassFunction.from_dict(frame, m2))
+    reference, reference_conflict = reference_combination(m1, m2)
+    assert conflict == pytest.approx(reference_conflict, abs=1e-12)
+    assert ours.to_dict() == pytest.approx(reference, abs=1e-12)
+
+
+def test_pignistic_sums_to_one():
+    for m, _ in random_pairs(6, 10, 10):
+        betp = sparse(m).pignistic()
+        assert sum(betp.values()) == pytest.approx(1.0)
+        for elem, p in betp.items():
+            share = sum(v / len(focal) for focal, v in m.to_dict().items() if elem in focal)
+            assert p == pytest.approx(share / (1 - m.to_dict().get(frozenset(), 0.0)))
@@ -0,0 +1,53 @@
+"""
+Sliding-window streaming fusion against batch combination of the window
+"""
+
+import pytest
+
+from dempster_shafer import StreamingFuser, fuse_sequential, streaming
+
+from .helpers import assert_same_mass, random_pairs
+
+
+@pytest.fixture
+def stream():
+    return [m for pair in random_pairs(5, 6, 15, seed=4) for m in pair]
+
+
+def test_window_matches_batch_combination(stream):
+    fuser = StreamingFuser(stream[0].frame, window=4)
+    for t, mass in enumerate(stream):
+        fuser.update(mass, timestamp=float(t))
+        window = stream[max(0, t - 3):t + 1]
+        assert len(fuser) == len(window)
+        reference = fuse_sequential(window)
+        combined, conflict = fuser.state()
+        assert conflict == pytest.approx(reference.conflict, abs=1e-9)
+        if conflict < 1 - 1e-9:
+            assert_same_mass(combined, reference.mass, tol=1e-9)
+
+
+def test_max_age_expires_old_evidence(stream):
+    fuser = StreamingFuser(stream[0].frame, max_age=2.5)
+    for t, mass in enumerate(stream[:6]):
+        fuser.update(mass, timestamp=float(t))
+    assert len(fuser) == 3
+    assert fuser.expire(now=100.0) == 3 and len(fuser) == 0
+
+
+def test_retraction_is_exact_through_zeros(stream, monkeypatch):
+    # Commonalities are 0 off the focal sets; divided-out zeros must not leave NaNs
+    monkeypatch.setattr(streaming, 'RESYNC_INTERVAL', 7)
+    fuser = StreamingFuser(stream[0].frame, window=2)
+    for t, mass in enumerate(stream):
+        fuser.update(mass, timestamp=float(t))
+    combined, conflict = fuser.state()
+    reference = fuse_sequential(stream[-2:])
+    assert conflict == pytest.approx(reference.conflict, abs=1e-9)
+    assert_same_mass(combined, reference.mass, tol=1e-9)
+
+
+def test_rejects_other_frames(stream):
+    fuser = StreamingFuser(stream[0].frame[:-1])
+    with pytest.raises(ValueError, match='frame'):
+        fuser.update(stream[0])
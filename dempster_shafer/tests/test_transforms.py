@@ -0,0 +1,50 @@
+"""
+Zeta/Möbius transforms against direct sums over the power set
+"""
+
+import numpy as np
+import pytest
+
+from dempster_shafer import (
+    belief, commonality, mobius_subset, mobius_superset, plausibility, to_dense, zeta_subset,
+    zeta_superset,
+)
+from dempster_shafer.transforms import frame_size_of
+
+from .helpers import random_pairs
+
+N = 5
+
+
+@pytest.fixture
+def masses():
+    return to_dense([m for pair in random_pairs(N, 8, 10) for m in pair])
+
+
+def direct(m, keep):
+    """Σ m(B) over every B with keep(A, B), for every A"""
+    size = 1 << N
+    return np.array([[sum(row[b] for b in range(size) if keep(a, b)) for a in range(size)]
+                     for row in m])
+
+
+def test_transforms_match_direct_sums(masses):
+    assert np.allclose(belief(masses), direct(masses, lambda a, b: b and b & ~a == 0))
+    assert np.allclose(plausibility(masses), direct(masses, lambda a, b: b & a))
+    assert np.allclose(commonality(masses), direct(masses, lambda a, b: a & ~b == 0))
+
+
+def test_mobius_inverts_zeta(masses):
+    assert np.allclose(mobius_subset(zeta_subset(masses)), masses)
+    assert np.allclose(mobius_superset(zeta_superset(masses)), masses)
+
+
+def test_transforms_keep_batch_axes(masses):
+    stacked = masses.reshape(4, 5, -1)
+    assert np.allclose(belief(stacked).reshape(masses.shape), belief(masses))
+
+
+def test_frame_size_of_rejects_other_widths():
+    assert frame_size_of(np.zeros((3, 32))) == 5
+    with pytest.raises(ValueError, match='2\\*\\*n'):
+        frame_size_of(np.zeros(24))